@@ -4,6 +4,7 @@ import requests
 import yfinance as yf  # เพิ่ม yfinance สำหรับดึงราคาหุ้นไทย
 from supabase import create_client
 from io import StringIO
+from db_utils import fetch_all_rows, upsert_in_chunks
 
 # --- ⚙️ CONFIG & ENVIRONMENT ---
 supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
@@ -148,8 +149,36 @@ def get_user_manual_list(filename, type_name):
     return tickers
 
 # ---------------------------------------------------------
-# MAIN
+# 5. Sync แบบ Diff (เขียนเฉพาะแถวที่เปลี่ยน)
 # ---------------------------------------------------------
+def diff_universe(existing_rows, incoming):
+    """เทียบรายชื่อใหม่กับในตาราง แยกเป็น หุ้นใหม่ / market_type เปลี่ยน / เหมือนเดิม
+
+    แถวที่มีอยู่แล้วจะคงสถานะเดิมไว้ (holding, signal_buy ฯลฯ ไม่ถูกรีเซ็ต)
+    """
+    existing = {row['ticker']: row for row in existing_rows}
+    new_rows, changed_rows = [], []
+    unchanged = 0
+
+    for item in incoming:
+        current = existing.get(item['ticker'])
+        if current is None:
+            new_rows.append({
+                "ticker": item['ticker'],
+                "market_type": item['market_type'],
+                "status": "watching"
+            })
+        elif current.get('market_type') != item['market_type']:
+            changed_rows.append({
+                "ticker": item['ticker'],
+                "market_type": item['market_type'],
+                "status": current.get('status') or "watching"
+            })
+        else:
+            unchanged += 1
+
+    return new_rows, changed_rows, unchanged
+
 # ---------------------------------------------------------
 # MAIN
 # ---------------------------------------------------------
@@ -179,20 +208,20 @@ def main():
         return
 
     print(f"\n💾 Syncing {len(final_clean_data)} unique tickers to Supabase...")
-    
-    count = 0
-    for item in final_clean_data:
-        try:
-            supabase.table(TABLE_NAME).upsert({
-                "ticker": item['ticker'],
-                "market_type": item['market_type'],
-                "status": "watching"
-            }, on_conflict="ticker").execute()
-            count += 1
-            if count % 100 == 0: print(f"   ...synced {count}")
-        except: pass
 
-    print(f"✅ SUCCESS: Synced {count} unique tickers.")
+    # อ่านตารางปัจจุบันครั้งเดียว แล้วเทียบหา Diff
+    try:
+        existing_rows = fetch_all_rows(supabase, TABLE_NAME, "ticker,market_type,status")
+    except Exception as e:
+        print(f"❌ Database Error: {e}")
+        return
+
+    new_rows, changed_rows, unchanged = diff_universe(existing_rows, final_clean_data)
+    print(f"   🆕 New: {len(new_rows)} | 🔁 Changed type: {len(changed_rows)} | 💤 Unchanged: {unchanged}")
+
+    count = upsert_in_chunks(supabase, TABLE_NAME, new_rows + changed_rows, on_conflict="ticker")
+
+    print(f"✅ SUCCESS: Synced {count} changed tickers ({unchanged} already up to date).")
 
 if __name__ == "__main__":
     main()
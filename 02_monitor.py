@@ -1,11 +1,12 @@
 import os
-import sys
-import yfinance as yf
+import argparse
+import asyncio
 from supabase import create_client
-import requests
+import discord_dispatch
 import datetime
-import time
-import pandas as pd
+from market_data import get_history
+from db_utils import fetch_all_rows, update_rows, delete_in_chunks
+import signal_engine
 
 # --- ⚙️ CONFIGURATION ---
 print("⚙️ Initializing Monitor (Signal Scanner)...")
@@ -20,9 +21,7 @@ TABLE_NAME = "ipo_trades_uat" if IS_TEST_MODE else "ipo_trades"
 
 def notify(msg):
     prefix = "🔭 **[MONITOR]** " if IS_TEST_MODE else "📡 **[SIGNAL]** "
-    try:
-        requests.post(DISCORD_URL, json={"content": prefix + msg})
-    except: pass
+    discord_dispatch.send(DISCORD_URL, {"content": prefix + msg})
 
 def send_signal_embeds(baskets, is_test_mode, target_market):
     embeds = []
@@ -84,14 +83,7 @@ def send_signal_embeds(baskets, is_test_mode, target_market):
                 "content": prefix,
                 "embeds": current_message_embeds
             }
-            try:
-                res = requests.post(DISCORD_URL, json=payload)
-                if res.status_code >= 400:
-                    print(f"❌ Discord API Error: {res.status_code} - {res.text}")
-            except Exception as e:
-                print(f"❌ Failed to send Discord Embed: {e}")
-            
-            time.sleep(1.5)
+            discord_dispatch.send(DISCORD_URL, payload)
             current_message_embeds = []
             current_message_len = len(prefix)
         
@@ -103,74 +95,37 @@ def send_signal_embeds(baskets, is_test_mode, target_market):
             "content": prefix,
             "embeds": current_message_embeds
         }
-        try:
-            requests.post(DISCORD_URL, json=payload)
-        except: pass
-
-def calculate_rsi(data, window=14):
-    try:
-        if len(data) < window + 1: return 50.0
-        delta = data.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi_series = 100 - (100 / (1 + rs))
-        val = rsi_series.iloc[-1]
-        return float(val) if not pd.isna(val) else 50.0
-    except:
-        return 50.0
+        discord_dispatch.send(DISCORD_URL, payload)
 
-def run_monitor(target_market="ALL"):
-    print(f"🚀 Scanning for Signals on Table: '{TABLE_NAME}' | Market: {target_market}")
-    
-    all_stocks = []
-    offset = 0
-    limit = 1000
-    
-    try:
-        # 🧩 อัปเกรด: ระบบ Pagination ดึงข้อมูลทีละ 1000 แถว ทะลวงกำแพงลิมิตของ Supabase
-        while True:
-            res = supabase.table(TABLE_NAME).select("*").range(offset, offset + limit - 1).execute()
-            data = res.data
-            
-            if not data:
-                break # ถ้าดึงมาแล้วไม่มีข้อมูล แสดงว่าหมดตารางแล้ว ให้หยุดลูป
-                
-            all_stocks.extend(data)
-            
-            # ถ้าข้อมูลที่ดึงมาได้น้อยกว่า limit แสดงว่าเป็นหน้าสุดท้ายแล้ว
-            if len(data) < limit:
-                break
-                
-            offset += limit # ขยับหน้าถัดไป
-            
-        stocks = all_stocks
-        print(f"📦 Total stocks fetched from Database: {len(stocks)}")
-        
-    except Exception as e:
-        print(f"❌ Database Error: {e}")
-        return
-
-    if not stocks:
-        print("⚠️ Warning: Table is empty.")
-        return
+# คอลัมน์ที่ Monitor อาจเขียนกลับ (แต่ละแถวส่งเฉพาะคอลัมน์ที่ update_payload แตะจริง)
+WRITE_COLUMNS = ["last_price", "base_high", "highest_price", "buy_price", "status"]
+# คอลัมน์ที่ Monitor อ่าน (ไม่ select("*") ทั้งแถว)
+SCAN_COLUMNS = "ticker,market_type," + ",".join(WRITE_COLUMNS)
 
-    filtered_stocks = []
-    for item in stocks:
-        is_thai = '.BK' in item['ticker']
-        if target_market == "TH" and not is_thai: continue
-        if target_market == "US" and is_thai: continue
-        filtered_stocks.append(item)
-    
-    stocks = filtered_stocks
-    print(f"📊 Filtering applied. Found {len(stocks)} stocks matching market '{target_market}' to scan.")
+def build_write_row(item, payload):
+    """แถวสำหรับ Upsert = ticker + เฉพาะคอลัมน์ใน payload
 
-    updates_count = 0
-    signal_count = 0
-    error_count = 0
-    deleted_count = 0 
+    ไม่เติมค่าเดิมจาก Snapshot ตอนเริ่มสแกน (เช่น status / buy_price) กันทับค่าที่ Trader เพิ่งเขียนระหว่างนั้น
+    """
+    return {"ticker": item['ticker'], **payload}
 
-    signal_baskets = {
+def row_changed(item, row):
+    """เช็คว่าค่าใหม่ต่างจากใน DB จริงไหม (ไม่นับ last_update)"""
+    for col in WRITE_COLUMNS:
+        if col not in row:
+            continue
+        old, new = item.get(col), row[col]
+        if isinstance(old, (int, float)) and isinstance(new, (int, float)):
+            if abs(float(old) - float(new)) > 1e-9 * max(abs(float(old)), abs(float(new)), 1.0):
+                return True
+        elif old != new:
+            return True
+    return False
+
+SCAN_CHUNK_SIZE = 200  # จำนวนหุ้นต่อก้อนในโหมด --async
+
+def new_baskets():
+    return {
         "breakout_high": [],
         "breakout_medium": [],
         "breakout_low": [],
@@ -181,163 +136,202 @@ def run_monitor(target_market="ALL"):
         "sl": []
     }
 
-    print("-" * 50)
-    
+def load_scan_list(target_market):
+    """ดึงรายชื่อหุ้นที่ต้องสแกนจาก DB (กรองตลาด/สถานะฝั่ง Server)"""
+    def scan_filters(query):
+        # 🎯 กรองฝั่ง Server: ตลาดที่ต้องการ + ข้ามหุ้นที่ขายแล้ว/รอขาย (status ว่างยังสแกนเหมือนเดิม)
+        if target_market == "TH":
+            query = query.like("ticker", "%.BK%")
+        elif target_market == "US":
+            query = query.not_.like("ticker", "%.BK%")
+        return query.or_("status.is.null,status.not.in.(sold,signal_sell)")
+
+    try:
+        stocks = fetch_all_rows(supabase, TABLE_NAME, SCAN_COLUMNS, key="ticker", filters=scan_filters)
+        print(f"📦 Total stocks fetched from Database: {len(stocks)} (market '{target_market}', excluding sold/signal_sell)")
+    except Exception as e:
+        print(f"❌ Database Error: {e}")
+        return None
+
+    if not stocks:
+        print("⚠️ Warning: No stocks to scan.")
+        return None
+    return stocks
+
+def analyze_stocks(stocks, price_history, failed_tickers):
+    """คำนวณสัญญาณของหุ้นชุดหนึ่ง (ไม่แตะ DB/Discord) คืนค่าตะกร้าสัญญาณ + แถวที่ต้องเขียน/ลบ"""
+    result = {
+        "baskets": new_baskets(),
+        "writes": [],
+        "delisted": [],
+        "updates": 0,
+        "signals": 0,
+        "errors": 0,
+    }
+    signal_baskets = result["baskets"]
+
+    valid_items = []
     for item in stocks:
         ticker = item['ticker']
-        status = item.get('status', 'watching')
-        m_type = item.get('market_type', 'UNKNOWN')
-        
-        if status in ['sold', 'signal_sell']: 
+        if ticker in failed_tickers:
+            print(f"🔍 Scanning: {ticker} ❌ Download failed (Skipping...)")
+            result["errors"] += 1
+            continue
+        hist = price_history.get(ticker)
+        if hist is None or hist.empty:
+            print(f"🔍 Scanning: {ticker} ❌ No price data (Delisted or Not Found) -> 🗑️ Auto-Deleting...")
+            result["delisted"].append(ticker)
+            result["errors"] += 1
             continue
+        valid_items.append(item)
+
+    if not valid_items:
+        signals = None
+    else:
+        # 🧮 คำนวณทุกสัญญาณของทั้งชุดในรอบเดียว (NumPy)
+        tickers = [item['ticker'] for item in valid_items]
+        signals = signal_engine.evaluate(
+            signal_engine.build_panel(price_history, tickers),
+            tickers,
+            status=[item.get('status', 'watching') for item in valid_items],
+            market_type=[item.get('market_type', 'UNKNOWN') for item in valid_items],
+            buy_price=[item.get('buy_price') for item in valid_items],
+            highest_price=[item.get('highest_price') for item in valid_items],
+            last_price=[item.get('last_price') for item in valid_items],
+        )
+
+    for i, item in enumerate(valid_items):
+        ticker = item['ticker']
+        status = item.get('status', 'watching')
 
         print(f"🔍 Scanning: {ticker} ({status})", end=" ")
 
+        if signals['error'][i]:
+            print(f"❌ Error analyzing {ticker}: division by zero (Skipping...)")
+            result["errors"] += 1
+            continue
+
         try:
-            stock = yf.Ticker(ticker)
-            hist = stock.history(period="6mo")
-            
-            if hist.empty:
-                print("❌ No price data (Delisted or Not Found) -> 🗑️ Auto-Deleting...")
-                supabase.table(TABLE_NAME).delete().eq("ticker", ticker).execute()
-                error_count += 1
-                deleted_count += 1
-                continue
-            
-            current_price = float(hist['Close'].iloc[-1])
-            rsi_val = calculate_rsi(hist['Close'])
-            
+            current_price = float(signals['current'][i])
+            rsi_val = float(signals['rsi'][i])
+            base_high = float(signals['base_high'][i])
+
             vol_alert = ""
-            if len(hist) > 20:
-                avg_vol = hist['Volume'].iloc[:-1].tail(20).mean()
-                curr_vol = float(hist['Volume'].iloc[-1])
-                if avg_vol > 0:
-                    vol_ratio = curr_vol / avg_vol
-                    if vol_ratio >= 1.5:
-                        vol_alert = f" | 📊 Vol {vol_ratio:.1f}x"
+            if signals['vol_alert'][i]:
+                vol_alert = f" | 📊 Vol {signals['vol_ratio'][i]:.1f}x"
             
             gf_ticker = ticker.replace('.BK', ':BKK')
             gf_link = f"[GF](https://www.google.com/finance?q={gf_ticker})"
             ticker_link = f"[{ticker}](https://finance.yahoo.com/quote/{ticker}) {gf_link}"
 
-            daily_pct = 0.0
-            diff_daily = 0.0
-            if len(hist) >= 2:
-                prev_close = float(hist['Close'].iloc[-2])
-                daily_pct = ((current_price - prev_close) / prev_close) * 100
-                diff_daily = current_price - prev_close
-            
-            if len(hist) > 5:
-                base_high = float(hist['High'].iloc[:-5].max())
-            elif len(hist) > 1:
-                base_high = float(hist['High'].iloc[:-1].max())
-            else:
-                base_high = float(hist['High'].max())
-            
-            highest_price_db = float(item.get('highest_price') or 0)
-            last_price_db = float(item.get('last_price') or current_price)
-            
             update_payload = {
                 "last_price": current_price,
                 "base_high": base_high,
-                "highest_price": max(current_price, highest_price_db),
+                "highest_price": float(signals['highest_price'][i]),
                 "last_update": datetime.datetime.now().isoformat()
             }
 
-            is_thai = '.BK' in ticker
-            tp_pct = 0.05 if is_thai else 0.10  
-            sl_pct = 0.03 if is_thai else 0.05  
-            
+            if signals['reset_buy'][i]:
+                update_payload['buy_price'] = 0
+                update_payload['highest_price'] = 0
+            if signals['new_status'][i]:
+                update_payload['status'] = signals['new_status'][i]
+
+            baskets = signals['baskets']
             signal_triggered = False
 
-            if status == 'watching':
-                if float(item.get('buy_price') or 0) > 0:
-                    update_payload['buy_price'] = 0
-                    update_payload['highest_price'] = 0
-
-                if any(x in m_type for x in ['LONG', 'BASE', 'MOONSHOT', 'FAVOURITE']):
-                    is_breakout = False
-                    
-                    if base_high > 0 and current_price > base_high:
-                        is_breakout = True
-                        increase_pct = ((current_price - base_high) / base_high) * 100
-                        diff_price = current_price - base_high
-                        
-                        update_payload['status'] = 'signal_buy'
-                        stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} > Base {base_high:.2f} (+{increase_pct:.2f}%){vol_alert}"
-                        
-                        item_data = {"price": current_price, "pct": increase_pct, "text": stock_info_text, "ticker": ticker}
-                        
-                        if increase_pct >= 3.0:
-                            signal_baskets["breakout_high"].append(item_data)
-                        elif increase_pct >= 1.0:
-                            signal_baskets["breakout_medium"].append(item_data)
-                        else:
-                            signal_baskets["breakout_low"].append(item_data)
-                        
-                        signal_triggered = True
-
-                    if not is_breakout and daily_pct >= 4.0:
-                        update_payload['status'] = 'signal_buy'
-                        stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} (🚀 Today +{daily_pct:.2f}%){vol_alert}"
-                        item_data = {"price": current_price, "pct": daily_pct, "text": stock_info_text, "ticker": ticker}
-                        signal_baskets["momentum"].append(item_data)
-                        signal_triggered = True
-
-                elif 'SHORT' in m_type:
-                    if rsi_val < 30:
-                        update_payload['status'] = 'signal_buy'
-                        item_data = {"price": current_price, "pct": -rsi_val, "text": f"**{ticker_link}** | Price {current_price:.2f} | RSI: {rsi_val:.1f}", "ticker": ticker}
-                        signal_baskets["oversold"].append(item_data)
-                        signal_triggered = True
-
-            elif status == 'signal_buy':
-                is_new_high = highest_price_db > 0 and current_price >= (highest_price_db * 1.03)
-                is_strong_rebound = last_price_db > 0 and current_price >= (last_price_db * 1.05)
-                
-                if is_new_high or is_strong_rebound:
-                    trigger_reason = "🚀 ทำนิวไฮใหม่!" if is_new_high else "🔥 ฟื้นตัวเด้งแรง!"
-                    total_increase_pct = ((current_price - base_high) / base_high) * 100
-                    
-                    stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} ({trigger_reason}){vol_alert} | ห่างจากฐาน +{total_increase_pct:.2f}%"
-                    item_data = {"price": current_price, "pct": total_increase_pct, "text": stock_info_text, "ticker": ticker}
-                    signal_baskets["continuing_up"].append(item_data)
-                    signal_triggered = True
-
-            elif status == 'holding':
-                buy_price = float(item.get('buy_price') or 0)
-                if buy_price > 0:
-                    if current_price >= buy_price * (1 + tp_pct):
-                        update_payload['status'] = 'signal_sell'
-                        profit_pct = ((current_price - buy_price) / buy_price) * 100
-                        profit_amt = current_price - buy_price
-                        stock_info_text = f"**{ticker_link}** | Buy {buy_price:.2f} ➔ Sell {current_price:.2f} (💰 +{profit_pct:.2f}% | + {profit_amt:.2f}$)"
-                        item_data = {"price": current_price, "pct": profit_pct, "text": stock_info_text, "ticker": ticker}
-                        signal_baskets["tp"].append(item_data)
-                        signal_triggered = True
-                        
-                    elif current_price <= buy_price * (1 - sl_pct):
-                        update_payload['status'] = 'signal_sell'
-                        loss_pct = ((buy_price - current_price) / buy_price) * 100
-                        loss_amt = buy_price - current_price
-                        stock_info_text = f"**{ticker_link}** | Buy {buy_price:.2f} ➔ Sell {current_price:.2f} (❌ -{loss_pct:.2f}% | - {loss_amt:.2f}$)"
-                        item_data = {"price": current_price, "pct": -loss_pct, "text": stock_info_text, "ticker": ticker}
-                        signal_baskets["sl"].append(item_data)
-                        signal_triggered = True
-
-            supabase.table(TABLE_NAME).update(update_payload).eq("ticker", ticker).execute()
+            if baskets['breakout_high'][i] or baskets['breakout_medium'][i] or baskets['breakout_low'][i]:
+                increase_pct = float(signals['increase_pct'][i])
+                stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} > Base {base_high:.2f} (+{increase_pct:.2f}%){vol_alert}"
+                item_data = {"price": current_price, "pct": increase_pct, "text": stock_info_text, "ticker": ticker}
+                if baskets['breakout_high'][i]:
+                    signal_baskets["breakout_high"].append(item_data)
+                elif baskets['breakout_medium'][i]:
+                    signal_baskets["breakout_medium"].append(item_data)
+                else:
+                    signal_baskets["breakout_low"].append(item_data)
+                signal_triggered = True
+
+            elif baskets['momentum'][i]:
+                daily_pct = float(signals['daily_pct'][i])
+                stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} (🚀 Today +{daily_pct:.2f}%){vol_alert}"
+                item_data = {"price": current_price, "pct": daily_pct, "text": stock_info_text, "ticker": ticker}
+                signal_baskets["momentum"].append(item_data)
+                signal_triggered = True
+
+            elif baskets['oversold'][i]:
+                item_data = {"price": current_price, "pct": -rsi_val, "text": f"**{ticker_link}** | Price {current_price:.2f} | RSI: {rsi_val:.1f}", "ticker": ticker}
+                signal_baskets["oversold"].append(item_data)
+                signal_triggered = True
+
+            elif baskets['continuing_up'][i]:
+                trigger_reason = "🚀 ทำนิวไฮใหม่!" if signals['is_new_high'][i] else "🔥 ฟื้นตัวเด้งแรง!"
+                total_increase_pct = float(signals['increase_pct'][i])
+                stock_info_text = f"**{ticker_link}** | Price {current_price:.2f} ({trigger_reason}){vol_alert} | ห่างจากฐาน +{total_increase_pct:.2f}%"
+                item_data = {"price": current_price, "pct": total_increase_pct, "text": stock_info_text, "ticker": ticker}
+                signal_baskets["continuing_up"].append(item_data)
+                signal_triggered = True
+
+            elif baskets['tp'][i]:
+                buy_price = float(signals['buy_price'][i])
+                profit_pct = float(signals['profit_pct'][i])
+                profit_amt = current_price - buy_price
+                stock_info_text = f"**{ticker_link}** | Buy {buy_price:.2f} ➔ Sell {current_price:.2f} (💰 +{profit_pct:.2f}% | + {profit_amt:.2f}$)"
+                item_data = {"price": current_price, "pct": profit_pct, "text": stock_info_text, "ticker": ticker}
+                signal_baskets["tp"].append(item_data)
+                signal_triggered = True
+
+            elif baskets['sl'][i]:
+                buy_price = float(signals['buy_price'][i])
+                loss_pct = ((buy_price - current_price) / buy_price) * 100
+                loss_amt = buy_price - current_price
+                stock_info_text = f"**{ticker_link}** | Buy {buy_price:.2f} ➔ Sell {current_price:.2f} (❌ -{loss_pct:.2f}% | - {loss_amt:.2f}$)"
+                item_data = {"price": current_price, "pct": -loss_pct, "text": stock_info_text, "ticker": ticker}
+                signal_baskets["sl"].append(item_data)
+                signal_triggered = True
+
+            # 📝 เก็บไว้เขียนรวดเดียวตอนจบ (เฉพาะแถวที่ค่าเปลี่ยนจริง)
+            write_row = build_write_row(item, update_payload)
+            if row_changed(item, write_row):
+                result["writes"].append(write_row)
             
-            updates_count += 1
-            if signal_triggered: signal_count += 1
+            result["updates"] += 1
+            if signal_triggered: result["signals"] += 1
             
             print(f"✅ Price: {current_price:.2f} | RSI: {rsi_val:.1f}" + (" [SIGNAL!!]" if signal_triggered else ""))
 
-            time.sleep(0.1)
-
         except Exception as e:
             print(f"❌ Error analyzing {ticker}: {e} (Skipping...)")
-            error_count += 1
-
+            result["errors"] += 1
+
+    return result
+
+def merge_results(results):
+    """รวมผลหลายก้อนตามลำดับก้อน (ลำดับในตะกร้าจึงเหมือนโหมดปกติทุกประการ)"""
+    merged = {"baskets": new_baskets(), "writes": [], "delisted": [], "updates": 0, "signals": 0, "errors": 0}
+    for result in results:
+        for name, items in result["baskets"].items():
+            merged["baskets"][name].extend(items)
+        for key in ["writes", "delisted"]:
+            merged[key].extend(result[key])
+        for key in ["updates", "signals", "errors"]:
+            merged[key] += result[key]
+    return merged
+
+def flush_results(writes, delisted):
+    """เขียนแถวที่เปลี่ยน + ลบหุ้นที่หายไปแบบเป็นก้อน คืนค่าจำนวนที่ลบได้"""
+    if writes:
+        print(f"💾 Writing {len(writes)} changed rows...")
+        # UPDATE เฉพาะคอลัมน์ที่แตะ และเฉพาะหุ้นที่ยังอยู่ (หุ้นที่ Scraper/Trader ลบไประหว่างสแกนจะไม่ถูกสร้างกลับ)
+        update_rows(supabase, TABLE_NAME, writes, key="ticker")
+    if delisted:
+        print(f"🗑️ Deleting {len(delisted)} delisted tickers...")
+        return delete_in_chunks(supabase, TABLE_NAME, "ticker", delisted)
+    return 0
+
+def publish_results(result, deleted_count, target_market):
+    """ส่งสรุปสัญญาณ + Copy List เข้า Discord"""
+    signal_baskets = result["baskets"]
     send_signal_embeds(signal_baskets, IS_TEST_MODE, target_market)
 
     actionable_baskets = ["breakout_high", "breakout_medium", "breakout_low", "continuing_up", "momentum", "oversold"]
@@ -347,27 +341,128 @@ def run_monitor(target_market="ALL"):
         for item in signal_baskets[b]:
             copy_list.append(item['ticker'])
             
-    copy_list = list(set(copy_list))
+    copy_list = list(dict.fromkeys(copy_list))
     
     if copy_list:
         ticker_str = "\n".join(copy_list)
         copy_msg = f"📋 **Copy List:**\n```text\n{ticker_str}\n```"
         
-        try:
-            requests.post(DISCORD_URL, json={"content": copy_msg})
-        except: pass
+        discord_dispatch.send(DISCORD_URL, {"content": copy_msg})
 
     market_label = ""
     if target_market == "TH": market_label = " (THAI)"
     elif target_market == "US": market_label = " (US)"
     
-    summary = f"📊 **Scan Complete{market_label}**: Checked {updates_count}, Signals {signal_count}, Auto-Deleted {deleted_count} Invalid Stocks."
+    summary = f"📊 **Scan Complete{market_label}**: Checked {result['updates']}, Signals {result['signals']}, Auto-Deleted {deleted_count} Invalid Stocks."
     print("-" * 50 + f"\n{summary}")
-    if IS_TEST_MODE and signal_count > 0:
+    if IS_TEST_MODE and result['signals'] > 0:
         notify(summary)
 
+def run_monitor(target_market="ALL"):
+    print(f"🚀 Scanning for Signals on Table: '{TABLE_NAME}' | Market: {target_market}")
+    
+    stocks = load_scan_list(target_market)
+    if not stocks:
+        return
+
+    # 📥 โหลดราคาย้อนหลังของทั้งชุดทีเดียว (แบ่งก้อนหลายหุ้นต่อ request) แทนการยิงทีละตัว
+    scan_tickers = [item['ticker'] for item in stocks]
+    print(f"📥 Loading 6mo history for {len(scan_tickers)} tickers (local cache + incremental download)...")
+    price_history, failed_tickers = get_history(scan_tickers, "6mo")
+
+    print("-" * 50)
+    result = analyze_stocks(stocks, price_history, set(failed_tickers))
+
+    print("-" * 50)
+    print(f"💾 Changed rows: {len(result['writes'])} (skipped {result['updates'] - len(result['writes'])} unchanged)")
+    deleted_count = flush_results(result["writes"], result["delisted"])
+
+    publish_results(result, deleted_count, target_market)
+
+async def run_pipeline(tasks):
+    """รอทุกช่วงของ Pipeline ถ้าช่วงใดล้ม ยกเลิกช่วงที่เหลือแล้วโยน Error เดิมต่อ
+
+    (ไม่งั้นคิวที่จำกัดขนาดจะเต็ม ช่วงอื่นรอ put()/get() กันไปจนงานหมดเวลา โดยไม่มีอะไรส่งออก)
+    """
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        if task.exception() is not None:
+            raise task.exception()
+
+async def run_monitor_async(target_market="ALL", concurrency=4):
+    """โหมด Pipeline: โหลดราคา -> คำนวณ -> เขียน DB ทำงานซ้อนกันทีละก้อน
+
+    คิวแต่ละช่วงจำกัดขนาดไว้ที่ concurrency ถ้าช่วงถัดไปตามไม่ทัน ช่วงก่อนหน้าจะรอ (Backpressure)
+    ผลลัพธ์ถูกรวมตามลำดับก้อนก่อนส่ง Discord จึงได้ข้อความเหมือนโหมดปกติ
+    """
+    print(f"🚀 [ASYNC x{concurrency}] Scanning for Signals on Table: '{TABLE_NAME}' | Market: {target_market}")
+
+    stocks = await asyncio.to_thread(load_scan_list, target_market)
+    if not stocks:
+        return
+
+    chunks = [stocks[i:i + SCAN_CHUNK_SIZE] for i in range(0, len(stocks), SCAN_CHUNK_SIZE)]
+    print(f"📥 Pipelining {len(stocks)} tickers in {len(chunks)} chunks...")
+
+    fetch_slots = asyncio.Semaphore(concurrency)
+    analyze_queue = asyncio.Queue(maxsize=concurrency)
+    write_queue = asyncio.Queue(maxsize=concurrency)
+    results = [None] * len(chunks)
+    deleted_counts = []
+
+    async def fetch(idx, chunk):
+        tickers = [item['ticker'] for item in chunk]
+        # ถือ slot ไว้จนกว่าคิวถัดไปจะรับงาน -> มีก้อนค้างในหน่วยความจำไม่เกิน concurrency
+        async with fetch_slots:
+            try:
+                history, failed = await asyncio.to_thread(get_history, tickers, "6mo")
+            except Exception as e:
+                print(f"❌ Chunk {idx + 1} download error: {e}")
+                history, failed = {}, tickers
+            await analyze_queue.put((idx, chunk, history, set(failed)))
+
+    async def producer():
+        await asyncio.gather(*(fetch(idx, chunk) for idx, chunk in enumerate(chunks)))
+        await analyze_queue.put(None)
+
+    async def analyzer():
+        while True:
+            job = await analyze_queue.get()
+            if job is None:
+                break
+            idx, chunk, history, failed = job
+            results[idx] = analyze_stocks(chunk, history, failed)
+            await write_queue.put(results[idx])
+        for _ in range(concurrency):
+            await write_queue.put(None)
+
+    async def writer():
+        while True:
+            result = await write_queue.get()
+            if result is None:
+                break
+            deleted_counts.append(await asyncio.to_thread(flush_results, result["writes"], result["delisted"]))
+
+    tasks = [asyncio.create_task(producer()), asyncio.create_task(analyzer())]
+    tasks += [asyncio.create_task(writer()) for _ in range(concurrency)]
+    await run_pipeline(tasks)
+
+    result = merge_results(results)
+    print("-" * 50)
+    await asyncio.to_thread(publish_results, result, sum(deleted_counts), target_market)
+
 if __name__ == "__main__":
-    market_arg = "ALL"
-    if len(sys.argv) > 1:
-        market_arg = sys.argv[1].upper()
-    run_monitor(market_arg)
+    parser = argparse.ArgumentParser(description="Signal Scanner")
+    parser.add_argument("market", nargs="?", default="ALL", help="ALL / TH / US")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="รันแบบ Pipeline (โหลด/คำนวณ/เขียน DB ซ้อนกัน)")
+    parser.add_argument("--concurrency", type=int, default=4, help="จำนวนก้อนที่ทำงานพร้อมกันในโหมด --async")
+    args = parser.parse_args()
+
+    market_arg = args.market.upper()
+    if args.use_async:
+        asyncio.run(run_monitor_async(market_arg, max(1, args.concurrency)))
+    else:
+        run_monitor(market_arg)
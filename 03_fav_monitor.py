@@ -1,8 +1,9 @@
 import os
-import yfinance as yf
-import pandas as pd
-import requests
+import numpy as np
+import discord_dispatch
 from supabase import create_client
+from market_data import get_panel
+import indicators
 
 # --- ⚙️ CONFIGURATION ---
 supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
@@ -21,19 +22,29 @@ def notify(msg):
         return
 
     prefix = "🧪 [TEST] " if IS_TEST_MODE else ""
-    try:
-        response = requests.post(DISCORD_URL, json={"content": prefix + msg})
-        if response.status_code not in [200, 204]:
-             print(f"❌ Discord Error {response.status_code}: {response.text}")
-    except Exception as e:
-        print(f"❌ Connection Error: {e}")
+    discord_dispatch.send(DISCORD_URL, {"content": prefix + msg})
+
+SMA_FAST, SMA_SLOW = 50, 200
+INDICATOR_STATE = "favourite"  # ชื่อชุดสถานะ Indicator ใน Local Cache
+BREAKOUT_DAYS = 20
+
+def latest_bars(panel, tickers):
+    """ราคาปิดล่าสุด + High สูงสุดของ BREAKOUT_DAYS แท่งก่อนหน้า ของทุกหุ้นพร้อมกัน (เรียงตาม tickers, ไม่มีข้อมูล = NaN)"""
+    close_now = np.full(len(tickers), np.nan)
+    high_prev = np.full(len(tickers), np.nan)
+    if panel.empty:
+        return close_now, high_prev
+    # เลื่อนแท่งที่มีข้อมูลของแต่ละหุ้นลงไปชิดแถวล่าง (แถวสุดท้าย = แท่งล่าสุดของหุ้นตัวนั้น)
+    order = np.argsort(~np.isnan(panel['Close']), axis=0, kind='stable')
+    close = np.take_along_axis(panel['Close'], order, axis=0)
+    high = np.take_along_axis(panel['High'], order, axis=0)
 
-def calculate_rsi(data, window=14):
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    position = {t: j for j, t in enumerate(panel.tickers)}
+    col = np.array([position.get(t, -1) for t in tickers])
+    has = col >= 0
+    close_now[has] = close[-1, col[has]]
+    high_prev[has] = np.fmax.reduce(high[-(BREAKOUT_DAYS + 1):-1, col[has]], axis=0)
+    return close_now, high_prev
 
 def run_sniper_bot():
     mode_text = "🧪 TEST MODE (UAT Table)" if IS_TEST_MODE else "🟢 PROD MODE (Real Table)"
@@ -53,60 +64,49 @@ def run_sniper_bot():
 
     print(f"🎯 Tracking {len(fav_stocks)} favourites...")
 
-    for item in fav_stocks:
-        ticker = item['ticker']
-        
-        # 2. ดึงกราฟย้อนหลัง
-        try:
-            stock = yf.Ticker(ticker)
-            df = stock.history(period="1y")
-            
-            if len(df) < 200: 
-                print(f"   Skip {ticker}: Not enough data.")
-                continue
-
-            # 3. คำนวณ Indicators
-            close_price = df['Close'].iloc[-1]
-            
-            # RSI (14)
-            df['RSI'] = calculate_rsi(df['Close'])
-            rsi_now = df['RSI'].iloc[-1]
-            
-            # SMA (50, 200)
-            df['SMA50'] = df['Close'].rolling(window=50).mean()
-            df['SMA200'] = df['Close'].rolling(window=200).mean()
-            
-            sma50_now = df['SMA50'].iloc[-1]
-            sma200_now = df['SMA200'].iloc[-1]
-            sma50_prev = df['SMA50'].iloc[-2]
-            sma200_prev = df['SMA200'].iloc[-2]
-
-            # --- 4. SIGNALS ---
-            signals = []
-            
-            if rsi_now < 30:
-                signals.append(f"📉 **RSI Oversold ({rsi_now:.2f})** - Buy the Dip!")
-            
-            if sma50_prev < sma200_prev and sma50_now > sma200_now:
-                signals.append(f"🌟 **GOLDEN CROSS** - Bullish Trend Started!")
-                
-            high_20d = df['High'][-21:-1].max()
-            if close_price > high_20d:
-                 signals.append(f"🚀 **Breakout 20-Day High** (Price > {high_20d:.2f})")
-
-            # แจ้งเตือน
-            if signals:
-                msg = f"⭐ **FAVOURITE ALERT: {ticker}** ⭐\n"
-                msg += f"Price: ${close_price:.2f}\n"
-                msg += "\n".join(signals)
-                msg += f"\n-----------------------"
-                notify(msg)
-                print(f"✅ Alert sent for {ticker}")
-            else:
-                print(f"   {ticker}: No signal (RSI={rsi_now:.1f})")
-
-        except Exception as e:
-            print(f"❌ Error analyzing {ticker}: {e}")
+    # 2. ดึงเฉพาะราคาช่วงล่าสุดของทุกตัวในครั้งเดียว (Panel Close/High จาก Cache) แล้วอัปเดตสถานะ RSI/SMA ทีละแท่ง
+    #    ตัวที่สถานะต่อไม่ได้ (ไม่เคยมี / มีแท่งหาย / ราคาถูกปรับย้อนหลัง) จะโหลด 1 ปีมาสร้างใหม่
+    tickers = [item['ticker'] for item in fav_stocks]
+    panel, failed = get_panel(tickers, "2mo", fields=('Close', 'High'))
+    states = indicators.update_states(panel, INDICATOR_STATE, (SMA_FAST, SMA_SLOW), full_period="1y")
+
+    # 3. Indicators + สัญญาณของทุกหุ้นพร้อมกันแบบ Array
+    ind = indicators.snapshot(states, tickers, (SMA_FAST, SMA_SLOW))
+    close_now, high_20d = latest_bars(panel, tickers)
+    ready = ind['count'] >= SMA_SLOW
+    oversold = ready & (ind['rsi'] < 30)
+    golden_cross = ready & (ind[f'sma{SMA_FAST}_prev'] < ind[f'sma{SMA_SLOW}_prev']) \
+        & (ind[f'sma{SMA_FAST}'] > ind[f'sma{SMA_SLOW}'])
+    breakout = ready & (close_now > high_20d)
+
+    # --- 4. SIGNALS ---
+    failed = set(failed)
+    for i, ticker in enumerate(tickers):
+        if ticker in failed:
+            print(f"   Skip {ticker}: Download failed.")
+            continue
+        if not ready[i]:
+            print(f"   Skip {ticker}: Not enough data.")
+            continue
+
+        signals = []
+        if oversold[i]:
+            signals.append(f"📉 **RSI Oversold ({ind['rsi'][i]:.2f})** - Buy the Dip!")
+        if golden_cross[i]:
+            signals.append(f"🌟 **GOLDEN CROSS** - Bullish Trend Started!")
+        if breakout[i]:
+            signals.append(f"🚀 **Breakout 20-Day High** (Price > {high_20d[i]:.2f})")
+
+        # แจ้งเตือน
+        if signals:
+            msg = f"⭐ **FAVOURITE ALERT: {ticker}** ⭐\n"
+            msg += f"Price: ${close_now[i]:.2f}\n"
+            msg += "\n".join(signals)
+            msg += f"\n-----------------------"
+            notify(msg)
+            print(f"✅ Alert sent for {ticker}")
+        else:
+            print(f"   {ticker}: No signal (RSI={ind['rsi'][i]:.1f})")
 
 if __name__ == "__main__":
     run_sniper_bot()
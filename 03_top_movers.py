@@ -4,6 +4,7 @@ import os
 import sys
 from io import StringIO
 import re
+import discord_dispatch
 
 # --- ⚙️ Igenamiteranyirizo (Configuration) ---
 # Kohereza kuri Discord ukoresheje Webhook
@@ -99,11 +100,8 @@ def send_to_discord(tickers, market_name):
         "content": f"🏆 **TOP MOVERS: {market_name}**\n```text\n{ticker_str}\n```"
     }
     
-    try:
-        res = requests.post(DISCORD_URL, json=msg)
-        if res.status_code in [200, 204]:
-            print(f"✅ Byoherejwe kuri Discord ({market_name}).")
-    except: pass
+    if discord_dispatch.send(DISCORD_URL, msg):
+        print(f"✅ Byoherejwe kuri Discord ({market_name}).")
 
 if __name__ == "__main__":
     print("🚀 Gutangira gushaka imigabane...")
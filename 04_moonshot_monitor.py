@@ -1,8 +1,12 @@
 import os
-import yfinance as yf
+import argparse
+import time
+import numpy as np
 import pandas as pd
-import requests
+import yfinance as yf
+import discord_dispatch
 from supabase import create_client
+from market_data import get_history
 
 # --- ⚙️ CONFIGURATION ---
 supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
@@ -18,20 +22,35 @@ TABLE_NAME = "ipo_trades_uat" if IS_TEST_MODE else "ipo_trades"
 PRICE_JUMP_THRESHOLD = 5.0
 VOLUME_SPIKE_THRESHOLD = 2.5
 
+# โหมด --stream
+BB_WINDOW = 20
+VOLUME_WINDOW = 21          # ≈ 1mo ของแท่งรายวัน (ค่าเฉลี่ย Volume แบบเดียวกับโหมดปกติ)
+MIN_BARS = 5
+STREAM_POLL_SECONDS = 60
+STREAM_BATCH_SIZE = 200     # จำนวนหุ้นต่อการเรียก yf.download หนึ่งครั้ง
+STREAM_RELOAD_MINUTES = 15  # โหลดรายชื่อ MOONSHOT ใหม่ทุกกี่นาที (มีเพิ่ม/ลบระหว่างวัน)
+SESSION_HOURS = {"US": (9 * 60 + 30, 16 * 60), ".BK": (10 * 60, 16 * 60 + 30)}  # นาทีเปิด/ปิดตลาด (เวลาท้องถิ่น)
+MIN_SESSION_FRACTION = 0.1  # ต้นตลาด Volume ยังน้อย -> อย่าหารค่าเฉลี่ยจนเล็กเกินไป
+
 def notify(msg):
     prefix = "🧪 [TEST] " if IS_TEST_MODE else ""
-    requests.post(DISCORD_URL, json={"content": prefix + msg})
+    discord_dispatch.send(DISCORD_URL, {"content": prefix + msg})
+
+def load_moonshots():
+    try:
+        res = supabase.table(TABLE_NAME).select("*").eq("market_type", "MOONSHOT").execute()
+        return res.data
+    except Exception as e:
+        print(f"❌ DB Error ({TABLE_NAME}): {e}")
+        return None
 
 def run_rocket_radar():
     mode_text = "🧪 TEST MODE (UAT Table)" if IS_TEST_MODE else "🟢 PROD MODE (Real Table)"
     print(f"🚀 Starting Moonshot Radar... [{mode_text}]")
     
     # 1. ดึงหุ้น Moonshot จากตารางที่ถูกต้อง
-    try:
-        res = supabase.table(TABLE_NAME).select("*").eq("market_type", "MOONSHOT").execute()
-        moon_stocks = res.data
-    except Exception as e:
-        print(f"❌ DB Error ({TABLE_NAME}): {e}")
+    moon_stocks = load_moonshots()
+    if moon_stocks is None:
         return
 
     if not moon_stocks:
@@ -40,14 +59,15 @@ def run_rocket_radar():
 
     print(f"📡 Scanning {len(moon_stocks)} moonshots for activity...")
 
+    price_history, _ = get_history([item['ticker'] for item in moon_stocks], "1mo")
+
     for item in moon_stocks:
         ticker = item['ticker']
         
         try:
-            stock = yf.Ticker(ticker)
-            df = stock.history(period="1mo")
+            df = price_history.get(ticker)
             
-            if len(df) < 5: continue
+            if df is None or len(df) < 5: continue
 
             last_close = df['Close'].iloc[-1]
             prev_close = df['Close'].iloc[-2]
@@ -88,5 +108,243 @@ def run_rocket_radar():
         except Exception as e:
             print(f"❌ Error scanning {ticker}: {e}")
 
+# ---------------------------------------------------------
+# 📡 โหมด --stream: ดึงแท่ง Intraday เป็นรอบๆ แล้วอัปเดต Indicator ทีละแท่ง
+# ---------------------------------------------------------
+class RingBuffer:
+    """หน้าต่างค่ารายวันล่าสุดของทุกหุ้น (หุ้น x ช่อง) ช่องของวันล่าสุดแก้ไขได้ตลอดวันจากแท่ง Intraday
+
+    เก็บผลรวม / ผลรวมกำลังสองไว้ แล้วบวกลบเฉพาะค่าที่เปลี่ยน (ไม่คำนวณ rolling ใหม่ทุกแท่ง)
+    ขึ้นวันใหม่ค่อยเลื่อนช่องและรวมใหม่ทั้งหน้าต่าง (กันความคลาดเคลื่อนของ float สะสม)
+    """
+
+    def __init__(self, n, size):
+        self.size = size
+        self.values = np.full((n, size), np.nan)
+        self.head = np.zeros(n, dtype=np.int64)   # ช่องของวันล่าสุด
+        self.count = np.zeros(n)
+        self.sum = np.zeros(n)
+        self.sumsq = np.zeros(n)
+
+    def _rebuild(self, rows):
+        window = self.values[rows]
+        self.count[rows] = np.sum(~np.isnan(window), axis=1)
+        self.sum[rows] = np.nansum(window, axis=1)
+        self.sumsq[rows] = np.nansum(window ** 2, axis=1)
+
+    def roll(self, rows):
+        """เริ่มช่องของวันใหม่ (ช่องเก่าสุดหลุดออก)"""
+        self.head[rows] = (self.head[rows] + 1) % self.size
+        self.values[rows, self.head[rows]] = np.nan
+        self._rebuild(rows)
+
+    def set_last(self, rows, values):
+        """แทนค่าช่องวันล่าสุด (แท่ง Intraday ใหม่ของวันเดิม)"""
+        old = self.values[rows, self.head[rows]]
+        had = ~np.isnan(old)
+        old = np.where(had, old, 0.0)
+        self.count[rows] += 1 - had
+        self.sum[rows] += values - old
+        self.sumsq[rows] += values ** 2 - old ** 2
+        self.values[rows, self.head[rows]] = values
+
+    def seed(self, row, values):
+        """ใส่ค่าย้อนหลัง (เก่า -> ใหม่) ของหุ้นหนึ่งตัว ค่าสุดท้ายอยู่ช่อง head"""
+        values = np.asarray(values, dtype=float)[-self.size:]
+        slots = (self.head[row] - np.arange(len(values))[::-1]) % self.size
+        self.values[row, slots] = values
+        self._rebuild(np.array([row]))
+
+    def last(self, back=0):
+        n = len(self.head)
+        return self.values[np.arange(n), (self.head - back) % self.size]
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum / self.count
+
+    def std(self):
+        """ส่วนเบี่ยงเบนมาตรฐานแบบ ddof=1 (เหมือน rolling().std() ของ pandas)"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.sumsq - self.sum ** 2 / self.count) / (self.count - 1)
+        return np.sqrt(np.maximum(var, 0.0))
+
+
+class MoonshotStream:
+    """สถานะรายวันของหุ้น Moonshot ทุกตัว: ราคาปิด 20 วัน (Bollinger) + Volume 1 เดือน (RVOL)"""
+
+    def __init__(self, tickers, history):
+        self.tickers = list(tickers)
+        self.position = {t: i for i, t in enumerate(self.tickers)}
+        self.closes = RingBuffer(len(self.tickers), BB_WINDOW)
+        self.volumes = RingBuffer(len(self.tickers), VOLUME_WINDOW)
+        self.days = np.full(len(self.tickers), "", dtype=object)
+        self.fraction = np.ones(len(self.tickers))   # สัดส่วนวันทำการของแท่งวันล่าสุด (ประวัติ = ครบวัน)
+        for i, ticker in enumerate(self.tickers):
+            df = history.get(ticker)
+            if df is None or df.empty:
+                continue
+            self.closes.seed(i, df['Close'].to_numpy(dtype=float))
+            self.volumes.seed(i, df['Volume'].fillna(0).to_numpy(dtype=float))
+            self.days[i] = df.index[-1].strftime('%Y-%m-%d')
+
+    def update(self, bars):
+        """bars = {ticker: (วันที่, ราคาล่าสุด, Volume สะสมของวัน, สัดส่วนวันทำการ)} คืนจำนวนหุ้นที่อัปเดต"""
+        bars = {t: b for t, b in bars.items() if t in self.position}
+        if not bars:
+            return 0
+        rows = np.array([self.position[t] for t in bars])
+        days = np.array([b[0] for b in bars.values()], dtype=object)
+        new_day = days != self.days[rows]
+        self.closes.roll(rows[new_day])
+        self.volumes.roll(rows[new_day])
+        self.closes.set_last(rows, np.array([b[1] for b in bars.values()], dtype=float))
+        self.volumes.set_last(rows, np.array([b[2] for b in bars.values()], dtype=float))
+        self.days[rows] = days
+        self.fraction[rows] = [b[3] for b in bars.values()]
+        return len(rows)
+
+    def signals(self):
+        """สัญญาณของทุกหุ้นพร้อมกัน (สูตรเดียวกับ run_rocket_radar โดยแท่งวันนี้ = ราคา/Volume สะสมล่าสุด)
+
+        Volume วันนี้ยังสะสมไม่ครบวัน -> เทียบกับค่าเฉลี่ยที่คูณสัดส่วนเวลาที่ผ่านไปของวันทำการ
+        (ไม่งั้น RVOL ช่วงเช้าจะใกล้ 0 และ Spike แจ้งได้แค่ช่วงท้ายตลาด)
+        """
+        last, prev = self.closes.last(), self.closes.last(1)
+        avg_vol = self.volumes.mean() * self.fraction
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct_change = (last - prev) / prev * 100
+            rvol = np.where(avg_vol > 0, self.volumes.last() / avg_vol, 0.0)
+        upper_band = self.closes.mean() + 2 * self.closes.std()
+        ready = self.closes.count >= MIN_BARS
+        return {
+            "price": last,
+            "pct_change": pct_change,
+            "rvol": rvol,
+            "jump": ready & (pct_change >= PRICE_JUMP_THRESHOLD),
+            "spike": ready & (rvol >= VOLUME_SPIKE_THRESHOLD),
+            "breakout": ready & (self.closes.count >= BB_WINDOW) & (last > upper_band),
+        }
+
+
+def session_fraction(ticker, ts):
+    """สัดส่วนเวลาที่ผ่านไปของวันทำการ ณ แท่ง ts (เวลาท้องถิ่นของตลาด) 0.1 - 1.0"""
+    open_min, close_min = SESSION_HOURS[".BK"] if ticker.endswith(".BK") else SESSION_HOURS["US"]
+    elapsed = ts.hour * 60 + ts.minute + 1 - open_min  # +1 = นับแท่งนาทีนี้ด้วย
+    return float(np.clip(elapsed / (close_min - open_min), MIN_SESSION_FRACTION, 1.0))
+
+
+def fetch_intraday(tickers):
+    """แท่ง 1 นาทีของวันนี้แบบหลายหุ้นต่อคำขอ
+
+    คืนค่า {ticker: (วันที่, ราคาล่าสุด, Volume สะสมของวัน, สัดส่วนเวลาที่ผ่านไปของวันทำการ)}
+    """
+    bars = {}
+    for i in range(0, len(tickers), STREAM_BATCH_SIZE):
+        chunk = tickers[i:i + STREAM_BATCH_SIZE]
+        try:
+            data = yf.download(chunk, period="1d", interval="1m", group_by='ticker', auto_adjust=True,
+                               progress=False, threads=True)
+        except Exception as e:
+            print(f"⚠️ Intraday fetch error: {e}")
+            continue
+        if data is None or data.empty:
+            continue
+        for ticker in chunk:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker]
+            elif len(chunk) == 1:
+                df = data
+            else:
+                continue
+            df = df.dropna(subset=['Close'])
+            if df.empty:
+                continue
+            day = df.index[-1].strftime('%Y-%m-%d')
+            today = df[df.index.strftime('%Y-%m-%d') == day]
+            bars[ticker] = (day, float(today['Close'].iloc[-1]), float(today['Volume'].fillna(0).sum()),
+                            session_fraction(ticker, today.index[-1]))
+    return bars
+
+
+def load_stream():
+    """โหลดรายชื่อ MOONSHOT + ประวัติ 1 เดือน คืนค่า (รายชื่อ, MoonshotStream) หรือ None ถ้าโหลดไม่ได้"""
+    moon_stocks = load_moonshots()
+    if not moon_stocks:
+        return None
+    tickers = list(dict.fromkeys(item['ticker'] for item in moon_stocks))
+    price_history, _ = get_history(tickers, "1mo")
+    return tickers, MoonshotStream(tickers, price_history)
+
+
+def run_stream(poll_seconds=STREAM_POLL_SECONDS, minutes=0, reload_minutes=STREAM_RELOAD_MINUTES):
+    """รันต่อเนื่อง: ดึงแท่ง Intraday ของทุกตัวทุก poll_seconds แจ้งเตือนแต่ละสัญญาณครั้งเดียวต่อหุ้นต่อวัน
+
+    โหลดรายชื่อ MOONSHOT ใหม่ทุก reload_minutes / minutes = 0 คือรันจนกว่าจะกด Ctrl+C
+    """
+    mode_text = "🧪 TEST MODE (UAT Table)" if IS_TEST_MODE else "🟢 PROD MODE (Real Table)"
+    print(f"📡 Starting Moonshot Stream (every {poll_seconds}s)... [{mode_text}]")
+
+    loaded = load_stream()
+    if not loaded:
+        print(f"⚠️ No Moonshot stocks found in '{TABLE_NAME}'.")
+        return
+    tickers, stream = loaded
+    next_reload = time.monotonic() + reload_minutes * 60
+    fired = set()   # (ticker, สัญญาณ, วันที่) ที่แจ้งไปแล้ว
+    labels = {
+        "jump": lambda s, i: f"🔥 **PRICE EXPLOSION**: +{s['pct_change'][i]:.2f}% today!",
+        "spike": lambda s, i: f"🌊 **VOLUME SPIKE**: {s['rvol'][i]:.1f}x average volume!",
+        "breakout": lambda s, i: f"⚡ **BOLLINGER BREAKOUT**: Price smashed upper band!",
+    }
+
+    deadline = time.monotonic() + minutes * 60 if minutes else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            started = time.monotonic()
+            if started >= next_reload:
+                next_reload = started + reload_minutes * 60
+                loaded = load_stream()
+                if loaded and set(loaded[0]) != set(tickers):
+                    print(f"   🔄 Moonshot list changed: {len(tickers)} -> {len(loaded[0])} tickers")
+                    tickers, stream = loaded
+
+            updated = stream.update(fetch_intraday(tickers))
+            # เก็บเฉพาะของวันปัจจุบันของหุ้นที่ยังอยู่ในรายชื่อ (ขึ้นวันใหม่ / ถูกถอดออก -> ล้างทิ้ง)
+            live = set(zip(tickers, stream.days))
+            fired = {f for f in fired if (f[0], f[2]) in live}
+            sig = stream.signals()
+
+            sent = 0
+            for i in np.flatnonzero(sig["jump"] | sig["spike"] | sig["breakout"]):
+                ticker, day = tickers[i], stream.days[i]
+                alerts = [labels[k](sig, i) for k in labels if sig[k][i] and (ticker, k, day) not in fired]
+                if not alerts:
+                    continue
+                fired.update((ticker, k, day) for k in labels if sig[k][i])
+                msg = f"🚀 **MOONSHOT ALERT: {ticker}** 🚀\n"
+                msg += f"Price: ${sig['price'][i]:.2f}\n"
+                msg += "\n".join(alerts)
+                msg += f"\n-----------------------"
+                notify(msg)
+                sent += 1
+            print(f"   📡 {time.strftime('%H:%M:%S')} updated {updated}/{len(tickers)} | alerts {sent}")
+
+            time.sleep(max(0.0, poll_seconds - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("🛑 Stream stopped.")
+
 if __name__ == "__main__":
-    run_rocket_radar()
+    parser = argparse.ArgumentParser(description="Moonshot Radar")
+    parser.add_argument("--stream", action="store_true", help="รันต่อเนื่อง ดึงแท่ง Intraday เป็นรอบๆ แล้วแจ้งเตือนทันที")
+    parser.add_argument("--poll", type=int, default=STREAM_POLL_SECONDS, help="วินาทีต่อรอบในโหมด --stream")
+    parser.add_argument("--minutes", type=int, default=0, help="หยุดโหมด --stream หลังผ่านไปกี่นาที (0 = ไม่หยุด)")
+    parser.add_argument("--reload", type=int, default=STREAM_RELOAD_MINUTES, help="โหลดรายชื่อ MOONSHOT ใหม่ทุกกี่นาทีในโหมด --stream")
+    args = parser.parse_args()
+
+    if args.stream:
+        run_stream(args.poll, args.minutes, args.reload)
+    else:
+        run_rocket_radar()
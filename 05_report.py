@@ -1,6 +1,8 @@
 import os
 from supabase import create_client
-import requests
+import discord_dispatch
+from db_utils import fetch_all_rows
+import trade_analytics
 from datetime import datetime, timedelta
 
 # --- ⚙️ CONFIGURATION ---
@@ -9,55 +11,98 @@ DISCORD_URL = os.getenv("DISCORD_WEBHOOK")
 
 IS_TEST_MODE = os.getenv("TEST_MODE", "Off").strip().lower() == "on"
 TABLE_NAME = "ipo_trades_uat" if IS_TEST_MODE else "ipo_trades"
+TABLE_HISTORY = "trade_history"
+REPORT_FUNCTION = "weekly_report"   # ฟังก์ชันใน sql/weekly_report.sql
+REPORT_DAYS = 7
 
 def send_to_discord(embed):
     payload = {
         "embeds": [embed]
     }
-    requests.post(DISCORD_URL, json=payload)
+    discord_dispatch.send(DISCORD_URL, payload)
+
+def summarize_trades(rows, active):
+    """สรุปรายการที่ปิดแล้วแบบเดียวกับฟังก์ชัน weekly_report ใน sql/weekly_report.sql (ใช้เมื่อยังไม่ได้ติดตั้ง)"""
+    stats = {"active": active, "completed": len(rows), "total_profit": 0.0, "wins": 0, "losses": 0,
+             "best_ticker": None, "best_gain": None}
+    for r in rows:
+        pct = r.get('profit_pct')
+        if pct is None and (r.get('buy_price') or 0) > 0:
+            pct = ((r.get('sell_price') or 0) / r['buy_price'] - 1) * 100
+        if pct is None:
+            continue
+        stats["total_profit"] += pct
+        if pct > 0: stats["wins"] += 1
+        else: stats["losses"] += 1
+        if stats["best_gain"] is None or pct > stats["best_gain"]:
+            stats["best_ticker"], stats["best_gain"] = r['ticker'], pct
+    return stats
+
+def fetch_weekly_stats(since):
+    """ตัวเลขสรุปของรายการที่ปิดตั้งแต่ since: RPC weekly_report (สรุปฝั่ง Server) ไม่มีค่อยสรุปเองจากเฉพาะแถวในช่วงนั้น"""
+    try:
+        stats = supabase.rpc(REPORT_FUNCTION, {"since": since, "trades_table": TABLE_NAME}).execute().data
+        if stats:
+            return stats
+    except Exception as e:
+        print(f"⚠️ RPC {REPORT_FUNCTION} unavailable ({e}) -> summarizing in Python")
+
+    rows = fetch_all_rows(supabase, TABLE_HISTORY, "id, ticker, buy_price, sell_price, profit_pct", key="id",
+                          filters=lambda q: q.eq("status", "CLOSED").gte("sell_date", since))
+    active = supabase.table(TABLE_NAME).select("id", count="exact", head=True)\
+        .in_("status", ["holding", "bought"]).execute().count or 0
+    return summarize_trades(rows, active)
+
+def _fmt(value, pattern):
+    return pattern.format(value) if value is not None else "N/A"
+
+def analytics_fields(a):
+    """ฟิลด์ Embed ของสถิติสะสมทั้งหมดจาก trade_analytics (ไม่มีรายการปิด = ไม่แสดง)"""
+    if not a.get("trades"):
+        return []
+    fields = [
+        {"name": "📉 Max Drawdown (All-time)", "value": f"{a['max_drawdown_pct']:.2f}% | รวม {a['total_pct']:+.2f}%", "inline": True},
+        {"name": "📐 Sharpe / Sortino", "value": f"{_fmt(a['sharpe'], '{:.2f}')} / {_fmt(a['sortino'], '{:.2f}')}", "inline": True},
+        {"name": "🎯 Expectancy", "value": f"{a['expectancy_pct']:+.2f}% ต่อเทรด ({a['trades']} trades)", "inline": True},
+        {"name": "⏱️ Avg. Holding", "value": _fmt(a['avg_hold_days'], "{:.1f} days"), "inline": True},
+    ]
+    for key, title in (("by_market_type", "🗂️ By Market Type"), ("by_note", "🧾 By Entry/Exit Note")):
+        lines = [f"{g['name']}: {g['trades']} | Win {g['win_rate']:.0f}% | Avg {g['avg_pct']:+.2f}%" for g in a[key]]
+        if lines:
+            fields.append({"name": title, "value": "\n".join(lines)[:1024], "inline": False})
+    return fields
 
 def generate_weekly_report():
-    print(f"📊 Generating Weekly Report from {TABLE_NAME}...")
-    
-    # ดึงข้อมูลหุ้นที่ขายไปแล้วในรอบ 7 วันล่าสุด
-    one_week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-    res = supabase.table(TABLE_NAME).select("*").eq("status", "sold").execute()
-    sold_stocks = res.data
+    print(f"📊 Generating Weekly Report from {TABLE_HISTORY} ({TABLE_NAME})...")
     
-    # ดึงข้อมูลหุ้นที่ยังถืออยู่
-    active_res = supabase.table(TABLE_NAME).select("*").eq("status", "bought").execute()
-    active_stocks = active_res.data
-
-    total_profit = 0
-    win_count = 0
-    loss_count = 0
-    best_trade = {"ticker": "N/A", "gain": -999}
+    # สรุปเฉพาะหุ้นที่ขายไปแล้วในรอบ 7 วันล่าสุด (นับฝั่ง Server ได้แค่ตัวเลขกลับมา)
+    one_week_ago = (datetime.now() - timedelta(days=REPORT_DAYS)).isoformat()
+    stats = fetch_weekly_stats(one_week_ago)
+    completed = stats["completed"]
+    best_trade = {"ticker": stats.get("best_ticker") or "N/A",
+                  "gain": stats["best_gain"] if stats.get("best_gain") is not None else -999}
 
-    for s in sold_stocks:
-        buy = s.get('buy_price', 0)
-        sell = s.get('sell_price', 0)
-        if buy > 0:
-            profit_pct = ((sell / buy) - 1) * 100
-            total_profit += profit_pct
-            if profit_pct > 0: win_count += 1
-            else: loss_count += 1
-            
-            if profit_pct > best_trade['gain']:
-                best_trade = {"ticker": s['ticker'], "gain": profit_pct}
+    # 📐 สถิติสะสมทั้งหมด (Cache ในเครื่อง ดึงเฉพาะรายการปิดใหม่)
+    try:
+        analytics = trade_analytics.get_analytics(supabase)
+    except Exception as e:
+        print(f"⚠️ Analytics error: {e}")
+        analytics = {"trades": 0}
 
     # สร้าง Embed Message สำหรับ Discord
     embed = {
         "title": "📈 Weekly Trading Summary",
         "color": 3066993, # สีฟ้า
         "fields": [
-            {"name": "💼 Active Holdings", "value": f"{len(active_stocks)} tickers", "inline": True},
-            {"name": "✅ Completed Trades", "value": f"{len(sold_stocks)} trades", "inline": True},
-            {"name": "📊 Avg. Profit/Loss", "value": f"{total_profit/max(len(sold_stocks),1):.2f}%", "inline": False},
+            {"name": "💼 Active Holdings", "value": f"{stats['active']} tickers", "inline": True},
+            {"name": "✅ Completed Trades", "value": f"{completed} trades", "inline": True},
+            {"name": "📊 Avg. Profit/Loss", "value": f"{stats['total_profit']/max(completed,1):.2f}%", "inline": False},
             {"name": "🏆 Best Trade", "value": f"{best_trade['ticker']} ({best_trade['gain']:.2f}%)", "inline": True},
-            {"name": "⚖️ Win Rate", "value": f"{(win_count/max(len(sold_stocks),1))*100:.1f}%", "inline": True}
+            {"name": "⚖️ Win Rate", "value": f"{(stats['wins']/max(completed,1))*100:.1f}%", "inline": True}
         ],
         "footer": {"text": f"Report generated on {datetime.now().strftime('%Y-%m-%d')}"}
     }
+    embed["fields"].extend(analytics_fields(analytics))
 
     send_to_discord(embed)
     print("✅ Report sent to Discord.")
@@ -1,9 +1,9 @@
 import os
 import yfinance as yf
 from supabase import create_client
-import requests
+import discord_dispatch
+from db_utils import upsert_in_chunks, update_rows, is_missing_function
 import datetime
-import time
 import pandas as pd
 
 # --- ⚙️ CONFIGURATION ---
@@ -17,27 +17,142 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 IS_TEST_MODE = os.getenv("TEST_MODE", "Off").strip().lower() == "on"
 TABLE_TRADES = "ipo_trades_uat" if IS_TEST_MODE else "ipo_trades"
 TABLE_HISTORY = "trade_history"
+TRADE_FUNCTION = "record_trades"   # ฟังก์ชันใน sql/record_trades.sql (บันทึกทั้งรอบในธุรกรรมเดียว)
 
 def notify(msg):
     prefix = "🧪 [TEST-TRADER] " if IS_TEST_MODE else "💵 [REAL-TRADER] "
+    discord_dispatch.send(DISCORD_URL, {"content": prefix + msg})
+
+def _last_closes(data, tickers):
+    """ราคาปิดแท่งล่าสุดของแต่ละหุ้นจากผล yf.download(group_by='ticker')"""
+    if data is None or data.empty:
+        return {}
+    if isinstance(data.columns, pd.MultiIndex):
+        closes = {t: data[t]['Close'] for t in data.columns.get_level_values(0).unique() if 'Close' in data[t]}
+    elif len(tickers) == 1 and 'Close' in data:
+        closes = {tickers[0]: data['Close']}
+    else:
+        return {}
+    prices = {}
+    for ticker, close in closes.items():
+        close = close.dropna()
+        if not close.empty:
+            prices[ticker] = float(close.iloc[-1])
+    return prices
+
+def get_realtime_prices(tickers):
+    """ดึงราคาล่าสุดแบบ Real-time (Re-quote) ของทั้งคิวด้วย yf.download ครั้งเดียว
+
+    ใช้แท่ง 1 นาทีของวันนี้ ตัวที่ดึง intraday ไม่ได้ (เช่น ตลาดปิด) ค่อยขอแท่งรายวันล่าสุดรวมกันอีกครั้ง
+    yfinance ยังยิง HTTP ทีละหุ้นอยู่ภายใน (จำนวน Request เท่าเดิม) ที่ประหยัดคือการเรียกทีละตัว + sleep ฝั่ง Python
+    คืนค่า {ticker: ราคา} (ตัวที่หาไม่ได้จะไม่อยู่ใน dict)
+    """
+    prices = {}
+    remaining = list(dict.fromkeys(tickers))
+    for kwargs in ({"period": "1d", "interval": "1m"}, {"period": "1d"}):
+        if not remaining:
+            break
+        try:
+            data = yf.download(remaining, group_by='ticker', auto_adjust=True, progress=False, threads=True, **kwargs)
+            prices.update(_last_closes(data, remaining))
+        except Exception as e:
+            print(f"⚠️ Quote fetch error ({kwargs}): {e}")
+        remaining = [t for t in remaining if t not in prices]
+    return prices
+
+def _record_trades_bulk(buys, sells, queue_rows):
+    """ทางสำรองเมื่อยังไม่มี RPC: เขียนทั้งรอบแบบเป็นก้อนผ่าน REST (ไม่กี่ Round Trip ต่อรอบ ไม่ใช่ต่อเทรด)"""
+    now = buys[0]['at'] if buys else sells[0]['at']
+
+    # 1. เปิดรายการซื้อทั้งหมดในคำสั่งเดียว (ได้ id กลับมาผูกกับ Watchlist)
+    opened = {}
+    if buys:
+        res = supabase.table(TABLE_HISTORY).insert([{
+            "ticker": b['ticker'],
+            "market_type": b['market_type'],
+            "buy_price": b['price'],
+            "buy_date": b['at'],
+            "status": "OPEN",
+            "note": "Breakout Buy Signal"
+        } for b in buys]).execute()
+        opened = {b['id']: row['id'] for b, row in zip(buys, res.data or [])}
+
+    # 2. แถวเก่าที่ยังไม่มี open_trade_id: หารายการ OPEN ล่าสุดของทุกตัวในคำสั่งเดียว
+    trade_ids = {s['id']: s['open_trade_id'] for s in sells if s['open_trade_id']}
+    legacy = [s['ticker'] for s in sells if not s['open_trade_id']]
+    if legacy:
+        res = supabase.table(TABLE_HISTORY).select("id, ticker, buy_date")\
+            .in_("ticker", legacy).eq("status", "OPEN").order("buy_date", desc=True).execute()
+        latest = {}
+        for row in res.data or []:
+            latest.setdefault(row['ticker'], row['id'])
+        trade_ids.update({s['id']: latest[s['ticker']] for s in sells if not s['open_trade_id'] and s['ticker'] in latest})
+
+    # 3. ปิดรายการขาย: อ่านแถวเต็มครั้งเดียวแล้ว Upsert กลับ (Upsert แถวไม่ครบคอลัมน์จะทับค่าเป็น NULL)
+    closing = {s['id']: s for s in sells if s['id'] in trade_ids}
+    if closing:
+        res = supabase.table(TABLE_HISTORY).select("*").in_("id", [trade_ids[i] for i in closing]).execute()
+        history = {row['id']: row for row in res.data or []}
+        closed = [dict(history[trade_ids[i]], **{
+            "sell_price": s['price'],
+            "sell_date": s['at'],
+            "profit_amount": s['profit_amount'],
+            "profit_pct": s['profit_pct'],
+            "status": "CLOSED",
+            "note": "Signal Sell (TP/SL)"
+        }) for i, s in closing.items() if trade_ids[i] in history]
+        if upsert_in_chunks(supabase, TABLE_HISTORY, closed, on_conflict="id") < len(closed):
+            raise RuntimeError("trade_history close update incomplete")
+
+    # กรณีไม่เจอประวัติเก่า (อาจจะซื้อก่อนมีระบบนี้) ให้ insert ใหม่แบบจบในตัว
+    forced = [s for s in sells if s['id'] not in trade_ids]
+    if forced:
+        supabase.table(TABLE_HISTORY).insert([{
+            "ticker": s['ticker'],
+            "buy_price": s['buy_price'],
+            "sell_price": s['price'],
+            "sell_date": s['at'],
+            "profit_pct": s['profit_pct'],
+            "status": "CLOSED",
+            "note": "Force Close (No Open Record)"
+        } for s in forced]).execute()
+
+    # 4. อัปเดตสถานะใน Watchlist ทั้งรอบ: เขียนเฉพาะคอลัมน์ที่ Trader เป็นเจ้าของ
+    #    (ไม่ส่งค่าอื่นจาก Snapshot ตอนเริ่มรอบกลับไปทับสิ่งที่ Monitor เพิ่งเขียน)
+    writes = []
+    for b in buys:
+        row = {"id": b['id'], "ticker": b['ticker'], "status": "holding", "buy_price": b['price'], "last_update": now}
+        if 'open_trade_id' in queue_rows[b['id']]:  # คอลัมน์มีเมื่อรัน sql/record_trades.sql แล้วเท่านั้น
+            row['open_trade_id'] = opened.get(b['id'])
+        writes.append(row)
+    for s in sells:
+        row = {"id": s['id'], "ticker": s['ticker'], "status": "sold", "sell_price": s['price'], "last_update": now}
+        if 'open_trade_id' in queue_rows[s['id']]:
+            row['open_trade_id'] = None
+        writes.append(row)
+    if update_rows(supabase, TABLE_TRADES, writes, key="id") < len(writes):
+        raise RuntimeError("watchlist status update incomplete")
+
+def record_trades(buys, sells, queue_rows):
+    """บันทึกผลการเทรดทั้งรอบ: RPC record_trades (ธุรกรรมเดียว ไม่มีทางบันทึกค้างครึ่งเดียว)
+
+    ถ้ายังไม่ได้ติดตั้งฟังก์ชัน (sql/record_trades.sql) ค่อยเขียนแบบเป็นก้อนผ่าน REST แทน คืนค่า True ถ้าสำเร็จ
+    """
     try:
-        requests.post(DISCORD_URL, json={"content": prefix + msg})
-    except: pass
-
-def get_realtime_price(ticker):
-    """ดึงราคาล่าสุดแบบ Real-time (Re-quote)"""
+        supabase.rpc(TRADE_FUNCTION, {"trades_table": TABLE_TRADES, "buys": buys, "sells": sells}).execute()
+        return True
+    except Exception as e:
+        if not is_missing_function(e):
+            # RPC ล้มทั้งก้อน (Rollback) สัญญาณยังอยู่ในคิว รอบหน้าจะทำใหม่
+            print(f"❌ Failed to record trades: {e}")
+            return False
+        print(f"⚠️ RPC {TRADE_FUNCTION} not installed -> bulk REST fallback (run sql/record_trades.sql)")
     try:
-        stock = yf.Ticker(ticker)
-        # ใช้ 1d, 1m เพื่อเอา candle ล่าสุด
-        data = stock.history(period="1d", interval="1m")
-        if data.empty:
-            # ถ้าดึง intraday ไม่ได้ (เช่น ตลาดปิด) ให้เอาล่าสุดของวัน
-            data = stock.history(period="1d")
-        
-        if data.empty: return None
-        return float(data['Close'].iloc[-1])
-    except:
-        return None
+        _record_trades_bulk(buys, sells, queue_rows)
+        return True
+    except Exception as e:
+        print(f"❌ Failed to record trades: {e}")
+        return False
 
 def execute_trade():
     print(f"🚀 Trader Process Started on tables: {TABLE_TRADES} & {TABLE_HISTORY}")
@@ -56,94 +171,52 @@ def execute_trade():
 
     print(f"🔔 Signals Found! Buy: {len(buy_queue)} | Sell: {len(sell_queue)}")
 
+    # 📡 ขอราคาล่าสุดของทั้งคิวซื้อ/ขายด้วยการเรียกครั้งเดียว (แทนการถามทีละตัว + sleep)
+    quotes = get_realtime_prices([item['ticker'] for item in buy_queue + sell_queue])
+    now = datetime.datetime.now().isoformat()
+    buys, sells = [], []
+
     # --- 🔵 PROCESS BUY SIGNALS ---
     for item in buy_queue:
         ticker = item['ticker']
-        print(f"🛒 Executing BUY: {ticker}...", end=" ")
-        
-        real_price = get_realtime_price(ticker)
+        real_price = quotes.get(ticker)
         if not real_price:
-            print("❌ Failed to fetch price. Skip.")
+            print(f"🛒 BUY {ticker}: ❌ Failed to fetch price. Skip.")
             continue
-
-        # บันทึกลง Trade History
-        trade_record = {
-            "ticker": ticker,
-            "market_type": item.get('market_type'),
-            "buy_price": real_price,
-            "buy_date": datetime.datetime.now().isoformat(),
-            "status": "OPEN",
-            "note": "Breakout Buy Signal"
-        }
-        supabase.table(TABLE_HISTORY).insert(trade_record).execute()
-
-        # อัปเดตสถานะใน Watchlist ว่า "ถือของแล้ว" (holding)
-        supabase.table(TABLE_TRADES).update({
-            "status": "holding",
-            "buy_price": real_price, # อัปเดตราคาทุนจริง
-            "last_update": datetime.datetime.now().isoformat()
-        }).eq("id", item['id']).execute()
-        
-        print(f"✅ DONE @ {real_price:.2f}")
-        notify(f"🛒 **EXECUTED BUY**: {ticker}\nPrice: {real_price:.2f}")
-        time.sleep(1)
+        buys.append({"id": item['id'], "ticker": ticker, "market_type": item.get('market_type'),
+                     "price": real_price, "at": now})
 
     # --- 🔴 PROCESS SELL SIGNALS ---
     for item in sell_queue:
         ticker = item['ticker']
-        print(f"💰 Executing SELL: {ticker}...", end=" ")
-        
-        real_price = get_realtime_price(ticker)
+        real_price = quotes.get(ticker)
         if not real_price:
-            print("❌ Failed to fetch price. Skip.")
+            print(f"💰 SELL {ticker}: ❌ Failed to fetch price. Skip.")
             continue
 
         # คำนวณกำไร/ขาดทุน
         buy_price = item.get('buy_price') or real_price # กันเหนียวถ้าไม่มี buy_price
         profit_amount = real_price - buy_price
         profit_pct = (profit_amount / buy_price) * 100
+        sells.append({"id": item['id'], "ticker": ticker, "buy_price": buy_price, "price": real_price,
+                      "profit_amount": profit_amount, "profit_pct": profit_pct,
+                      "open_trade_id": item.get('open_trade_id'), "at": now})
+
+    if not buys and not sells:
+        return
+
+    # 💾 บันทึกทั้งรอบในครั้งเดียว แจ้งเตือนเฉพาะเมื่อบันทึกสำเร็จแล้ว
+    print(f"💾 Recording {len(buys)} buys & {len(sells)} sells...")
+    if not record_trades(buys, sells, {item['id']: item for item in buy_queue + sell_queue}):
+        return
+
+    for b in buys:
+        print(f"🛒 BUY {b['ticker']}: ✅ DONE @ {b['price']:.2f}")
+        notify(f"🛒 **EXECUTED BUY**: {b['ticker']}\nPrice: {b['price']:.2f}")
 
-        # ปิดรายการใน Trade History (หา record ล่าสุดที่ยัง OPEN ของตัวนี้)
-        # Note: ในทางปฏิบัติเราควร link ID แต่เพื่อความง่าย เราจะหาตัวล่าสุดที่ OPEN
-        history_res = supabase.table(TABLE_HISTORY)\
-            .select("id")\
-            .eq("ticker", ticker)\
-            .eq("status", "OPEN")\
-            .order("buy_date", desc=True)\
-            .limit(1).execute()
-        
-        if history_res.data:
-            trade_id = history_res.data[0]['id']
-            supabase.table(TABLE_HISTORY).update({
-                "sell_price": real_price,
-                "sell_date": datetime.datetime.now().isoformat(),
-                "profit_amount": profit_amount,
-                "profit_pct": profit_pct,
-                "status": "CLOSED",
-                "note": "Signal Sell (TP/SL)"
-            }).eq("id", trade_id).execute()
-        else:
-            # กรณีไม่เจอประวัติเก่า (อาจจะซื้อก่อนมีระบบนี้) ให้ insert ใหม่แบบจบในตัว
-            supabase.table(TABLE_HISTORY).insert({
-                "ticker": ticker,
-                "buy_price": buy_price,
-                "sell_price": real_price,
-                "sell_date": datetime.datetime.now().isoformat(),
-                "profit_pct": profit_pct,
-                "status": "CLOSED",
-                "note": "Force Close (No Open Record)"
-            }).execute()
-
-        # อัปเดตสถานะใน Watchlist กลับเป็น watching หรือ sold
-        supabase.table(TABLE_TRADES).update({
-            "status": "sold", # หรือ watching ถ้าอยากเล่นรอบใหม่
-            "sell_price": real_price,
-            "last_update": datetime.datetime.now().isoformat()
-        }).eq("id", item['id']).execute()
-
-        print(f"✅ SOLD @ {real_price:.2f} ({profit_pct:+.2f}%)")
-        notify(f"💰 **EXECUTED SELL**: {ticker}\nPrice: {real_price:.2f}\nP/L: {profit_pct:+.2f}%")
-        time.sleep(1)
+    for s in sells:
+        print(f"💰 SELL {s['ticker']}: ✅ SOLD @ {s['price']:.2f} ({s['profit_pct']:+.2f}%)")
+        notify(f"💰 **EXECUTED SELL**: {s['ticker']}\nPrice: {s['price']:.2f}\nP/L: {s['profit_pct']:+.2f}%")
 
 if __name__ == "__main__":
     execute_trade()
@@ -1,9 +1,10 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import requests
 import os
-import time
 import logging
+import discord_dispatch
+from market_data import get_panel
+from market_scan import compute_metrics, select_rows, format_pct
 
 # ปิดการแจ้งเตือนขยะจาก yfinance
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
@@ -20,15 +21,6 @@ CUSTOM_WATCHLIST = ['LITE', 'AAOI', 'AAPL', 'TSLA', 'PLTR', 'SNDK', 'MU', 'AXTI'
                     'AMD', 'NVDA','LRCX','WDC','STX','KLAC','GLW','TSEM','QBTS','QUBT','RGTI','IONQ','CAR','SIVEF','POET','ONDS','NVTS','HUT','LUNR','SKYQ',
                     'AOSL','ALGT','CIFR','ALAB','TSM','OKLO','SMR','NNE','LEU','ASPI','LTBR','UCAR','NBIS','RKLB','EOSE','GLW','HOOD','VRT','SOFI','CRWV','META','AOSL']
 
-def format_pct(current, previous, hide_pct=False):
-    """คำนวณ % และใส่ 🟢 หุ้นขึ้น หรือ 🔴 หุ้นลง"""
-    if pd.isna(current) or pd.isna(previous) or previous == 0: 
-        return "⚪0.0" if hide_pct else "⚪0.0%"
-    diff = ((current - previous) / previous) * 100
-    emoji = "🟢" if diff >= 0 else "🔴"
-    sym = "" if hide_pct else "%"
-    return f"{emoji}{abs(diff):.1f}{sym}"
-
 def send_to_discord(df, title, webhook_url, history_header="D-1 to D-10 Trend"):
     """ฟังก์ชันจัดการส่งข้อความเข้า Discord แบบกระชับ"""
     if df.empty: return
@@ -59,100 +51,38 @@ def send_to_discord(df, title, webhook_url, history_header="D-1 to D-10 Trend"):
         messages_to_send.append(current_msg)
 
     for msg in messages_to_send:
-        requests.post(webhook_url, json={"content": msg})
-        time.sleep(1)
+        discord_dispatch.send(webhook_url, {"content": msg})
 
-def main():
-    print("🚀 เริ่มดึงข้อมูลเฉพาะหุ้นใน Custom Watchlist...")
-    
-    # ลบชื่อหุ้นที่ซ้ำกันออก (ถ้ามี)
-    tickers = list(set(CUSTOM_WATCHLIST))
-    
-    if not tickers:
-        print("ไม่พบรายชื่อหุ้นใน Watchlist กรุณาเพิ่มชื่อหุ้นลงในตัวแปร CUSTOM_WATCHLIST")
-        return
-        
-    print(f"พบรายชื่อหุ้นที่ต้องการดึงข้อมูล {len(tickers)} ตัว")
+def build_results(metrics, tickers):
+    """แปลงตารางตัวเลขกลาง (market_scan.compute_metrics) เป็นตารางรายงาน Watchlist (ไม่กรองราคา/Volume)
 
-    # ป้องกันบั๊กของ yfinance กรณีดึงหุ้นตัวเดียวแล้ว Dataframe Format เปลี่ยน
-    if len(tickers) == 1: 
-        tickers.append('SPY') 
+    สร้างข้อความ 🟢/🔴 ของทุกแถวจาก Array ในครั้งเดียว
+    """
+    scan = select_rows(metrics, tickers, watchlist=tickers, require_volume=False)
+    closes, price = scan['Closes'], np.asarray(scan['Price'], dtype=float)
 
-    # โหลดข้อมูลย้อนหลัง
-    data = yf.download(tickers, period="20d", interval="1d", threads=True, progress=False)
-    
-    if 'Close' not in data or len(data['Close']) < 12: 
-        print("ดึงข้อมูลจาก Yahoo Finance ไม่สำเร็จ")
-        return
-        
-    close_data = data['Close']
-    
-    try:
-        global_dates = close_data.index[-12:]
-    except IndexError:
-        print("ข้อมูลวันที่ไม่ครบถ้วน")
-        return
-        
-    results = []
-    
-    for ticker in tickers:
-        # ข้าม SPY ที่เราใส่ไปกันบั๊ก (ถ้ามันไม่ได้อยู่ใน List จริงๆ)
-        if ticker == 'SPY' and 'SPY' not in CUSTOM_WATCHLIST:
-            continue
-            
-        try:
-            if ticker not in close_data.columns: continue
-            
-            curr_price = close_data.loc[global_dates[-1], ticker]
-            prev_price = close_data.loc[global_dates[-2], ticker]
-            
-            if pd.isna(curr_price) or pd.isna(prev_price): continue
-            
-            # เก็บค่า % จริงๆ สำหรับเอาไว้ใช้ Sort
-            today_pct_val = ((curr_price - prev_price) / prev_price) * 100
-
-            up_days = 0
-            down_days = 0
-            for j in range(1, 11): 
-                curr_h = close_data.loc[global_dates[-j], ticker]
-                prev_h = close_data.loc[global_dates[-(j+1)], ticker]
-                if curr_h > prev_h: up_days += 1
-                elif curr_h < prev_h: down_days += 1
-            
-            price_10d_ago = close_data.loc[global_dates[-11], ticker]
-            sum10d_str = f"🟢{up_days}🔴{down_days}({format_pct(curr_price, price_10d_ago)})"
-            
-            history_pcts = []
-            valid_history = True
-            for j in range(2, 12):
-                curr_hist = close_data.loc[global_dates[-j], ticker]
-                prev_hist = close_data.loc[global_dates[-(j+1)], ticker]
-                if pd.isna(curr_hist) or pd.isna(prev_hist):
-                    valid_history = False
-                    break
-                history_pcts.append(format_pct(curr_hist, prev_hist, hide_pct=True))
-            
-            if not valid_history: continue
-            
-            results.append({
-                'Ticker': ticker,
-                'Price': curr_price,
-                'Today': format_pct(curr_price, prev_price),
-                'SortVal': today_pct_val, # ใช้ค่าเปอร์เซ็นต์จริง (บวกลบตามจริง)
-                'Sum10D': sum10d_str,
-                'History': "".join(history_pcts)
-            })
-        except Exception as e:
-            print(f"Error processing {ticker}: {e}")
-            continue
-
-    if not results:
+    sum10_pct = format_pct(price, closes[:, 1])
+    sum10d = [f"🟢{up}🔴{down}({pct})" for up, down, pct in zip(scan['Up'], scan['Down'], sum10_pct)]
+    history = format_pct(closes[:, 10:0:-1], closes[:, 9::-1], percent=False)
+
+    return pd.DataFrame({
+        'Ticker': list(scan['Ticker']),
+        'Price': price,
+        'Today': format_pct(price, scan['Prev']).tolist(),
+        'SortVal': np.asarray(scan['SortVal'], dtype=float), # ใช้ค่าเปอร์เซ็นต์จริง (บวกลบตามจริง)
+        'Sum10D': sum10d,
+        'History': ["".join(row) for row in history]
+    })
+
+def publish(results):
+    """เรียงจากบวกมากที่สุดไปหาลบมากที่สุด แล้วส่งเข้า Discord"""
+    if results.empty:
         print("ไม่สามารถคำนวณข้อมูลหุ้นใดๆ ได้")
         return
         
     # 📌 แก้ไขตรงนี้: เปลี่ยนจากการจัดเรียงด้วย AbsSortVal เป็น SortVal 
     # จะทำให้มันเรียงจาก บวกมากที่สุด ไปหา ลบมากที่สุด ตามลำดับ
-    watchlist_df = pd.DataFrame(results).sort_values(by='SortVal', ascending=False)
+    watchlist_df = results.sort_values(by='SortVal', ascending=False)
     
     if not DISCORD_WEBHOOK_URL:
         print("Error: ไม่พบ Webhook URL")
@@ -164,5 +94,26 @@ def main():
     
     print("✅ ทำงานเสร็จสมบูรณ์!")
 
+def main():
+    print("🚀 เริ่มดึงข้อมูลเฉพาะหุ้นใน Custom Watchlist...")
+    
+    # ลบชื่อหุ้นที่ซ้ำกันออก (ถ้ามี)
+    tickers = list(set(CUSTOM_WATCHLIST))
+    
+    if not tickers:
+        print("ไม่พบรายชื่อหุ้นใน Watchlist กรุณาเพิ่มชื่อหุ้นลงในตัวแปร CUSTOM_WATCHLIST")
+        return
+        
+    print(f"พบรายชื่อหุ้นที่ต้องการดึงข้อมูล {len(tickers)} ตัว")
+
+    # โหลดข้อมูลย้อนหลัง
+    panel, _ = get_panel(tickers, "20d")
+    metrics = compute_metrics(panel)
+    if metrics is None:
+        print("ดึงข้อมูลจาก Yahoo Finance ไม่สำเร็จ")
+        return
+
+    publish(build_results(metrics, tickers))
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,55 @@
+import logging
+import Top_gainer_all_v2 as gainer
+import Top_mover_v2 as mover
+import Custom_list as custom
+from market_data import get_panel
+from market_scan import compute_metrics
+from universe import get_sec_tickers
+import liquidity
+
+# ปิดการแจ้งเตือนขยะจาก yfinance
+logging.getLogger('yfinance').setLevel(logging.CRITICAL)
+
+# ---------------------------------------------------------
+# 🧭 สแกนรอบเดียว ส่ง 3 รายงาน: Top Gainer / Top Mover / Custom Watchlist
+# โหลดราคา 20 วันของทุกหุ้นที่ทั้งสามรายงานใช้ครั้งเดียว -> คำนวณตารางกลางครั้งเดียว
+# -> แต่ละรายงานคัดหุ้น/เรียง/จัดรูปแบบตามแบบของตัวเอง (Webhook แยกห้องเหมือนเดิม)
+# ---------------------------------------------------------
+def main():
+    print("🚀 เริ่มสแกนรวม (Top Gainer + Top Mover + Custom Watchlist) ในรอบเดียว...")
+    sec_tickers = get_sec_tickers()
+    gainer_universe = list(set(gainer.CUSTOM_WATCHLIST) | sec_tickers)
+    mover_universe = list(set(mover.CUSTOM_WATCHLIST) | sec_tickers)
+    custom_universe = list(set(custom.CUSTOM_WATCHLIST))
+
+    universe = list(dict.fromkeys(gainer_universe + mover_universe + custom_universe))
+    print(f"พบรายชื่อหุ้นรวมทั้งหมด {len(universe)} ตัว (SEC {len(sec_tickers)} + Watchlist)")
+
+    # 💧 ข้ามหุ้นที่ไม่มีสภาพคล่องมานานแล้ว (Watchlist ทุกรายงานโหลดเสมอ)
+    # เกณฑ์ของ Gainer/Mover เท่ากัน ใช้เกณฑ์ที่หลวมกว่าเผื่อมีการปรับแยกกันในอนาคต
+    watchlists = gainer.CUSTOM_WATCHLIST + mover.CUSTOM_WATCHLIST + custom.CUSTOM_WATCHLIST
+    download = liquidity.prefilter(universe, keep=watchlists)
+
+    # 📥 โหลดครั้งเดียว ใช้ร่วมกันทั้ง 3 รายงาน
+    panel, failed = get_panel(download, "20d")
+    metrics = compute_metrics(panel)
+    if metrics is None:
+        print("ดึงข้อมูลจาก Yahoo Finance ไม่สำเร็จ")
+        return
+    liquidity.record(metrics, download,
+                     min(gainer.MIN_PRICE, mover.MIN_PRICE),
+                     min(gainer.MIN_DOLLAR_VOLUME, mover.MIN_DOLLAR_VOLUME), failed=failed)
+
+    print("\n📈 [1/3] Top Gainers")
+    gainer.publish(gainer.build_results(metrics, gainer_universe))
+
+    print("\n🔀 [2/3] Top Movers")
+    mover.publish(mover.build_results(metrics, mover_universe))
+
+    print("\n📌 [3/3] Custom Watchlist")
+    custom.publish(custom.build_results(metrics, custom_universe))
+
+    print("✅ สแกนรวมเสร็จ ส่งครบทั้ง 3 รายงาน")
+
+if __name__ == "__main__":
+    main()
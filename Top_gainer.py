@@ -2,6 +2,7 @@ import yfinance as yf
 import pandas as pd
 import requests
 import json
+import discord_dispatch
 import requests
 
 # --- ตั้งค่า Webhook ของคุณที่นี่ ---
@@ -30,12 +31,10 @@ def send_to_discord(df):
     message += "```"
 
     payload = {"content": message}
-    response = requests.post(DISCORD_WEBHOOK_URL, json=payload)
-    
-    if response.status_code == 204:
+    if discord_dispatch.send(DISCORD_WEBHOOK_URL, payload):
         print("\n[Success] ส่งข้อมูลเข้า Discord เรียบร้อยแล้ว!")
     else:
-        print(f"\n[Error] ไม่สามารถส่งข้อมูลได้: {response.status_code}, {response.text}")
+        print("\n[Error] ไม่สามารถส่งข้อมูลได้")
 
 def get_top_50_gainers_with_history():
     print("กำลังดึงข้อมูลและวิเคราะห์หุ้น US...")
@@ -5,6 +5,7 @@ import os
 import time
 import logging
 import io
+import discord_dispatch
 
 # ปิดการแจ้งเตือนขยะจาก yfinance
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
@@ -103,8 +104,7 @@ def send_to_discord(df, title, webhook_url):
         messages_to_send.append(current_msg)
 
     for msg in messages_to_send:
-        requests.post(webhook_url, json={"content": msg})
-        time.sleep(1)
+        discord_dispatch.send(webhook_url, {"content": msg})
 
 def main():
     print("🚀 เริ่มสแกนหุ้นทั้งตลาดสหรัฐฯ (Fully Automatic)...")
@@ -274,7 +274,7 @@ def main():
     send_to_discord(top_gainers, title_top, DISCORD_WEBHOOK_URL)
     
     print("ส่งข้อมูล Sector Summary...")
-    requests.post(DISCORD_WEBHOOK_URL, json={"content": sector_msg_content})
+    discord_dispatch.send(DISCORD_WEBHOOK_URL, {"content": sector_msg_content})
         
     print("✅ สแกนทั้งตลาด ดึงกลุ่ม Sector และส่งเข้า Discord เรียบร้อย!")
 
@@ -1,10 +1,13 @@
-import yfinance as yf
+import numpy as np
 import pandas as pd
-import requests
 import os
-import time
 import logging
-import io
+import discord_dispatch
+from market_data import get_panel
+from market_scan import compute_metrics, select_rows, top_n, format_pct
+from universe import get_sec_tickers
+from sector_cache import lookup_sectors
+import liquidity
 
 # ปิดการแจ้งเตือนขยะจาก yfinance
 logging.getLogger('yfinance').setLevel(logging.CRITICAL)
@@ -24,56 +27,8 @@ MIN_DOLLAR_VOLUME = 15_000_000  # มูลค่าซื้อขายเฉ
 CUSTOM_WATCHLIST = ['LITE', 'AAOI', 'AAPL', 'TSLA', 'PLTR']
 
 def get_all_us_tickers():
-    """ดึงรายชื่อหุ้นทั้งหมดจาก SEC (ก.ล.ต. สหรัฐฯ) เพื่อสแกนทั้งตลาด 100%"""
-    valid_tickers = set(CUSTOM_WATCHLIST)
-    headers = {'User-Agent': 'US_Stock_Scanner user@example.com'}
-    url = "https://www.sec.gov/files/company_tickers.json"
-    try:
-        response = requests.get(url, headers=headers)
-        for item in response.json().values():
-            ticker = item['ticker'].replace('.', '-')
-            if len(ticker) <= 4 or '-' in ticker:
-                valid_tickers.add(ticker)
-    except Exception as e:
-        print(f"SEC Fetch Error: {e}")
-        
-    return list(valid_tickers)
-
-def get_market_sectors():
-    """ดึงข้อมูล Sector พื้นฐานจาก S&P 500, 400, 600 (ครอบคลุมหุ้นหลัก 1500 ตัว)"""
-    sector_map = {}
-    urls = [
-        'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies',
-        'https://en.wikipedia.org/wiki/List_of_S%26P_400_companies',
-        'https://en.wikipedia.org/wiki/List_of_S%26P_600_companies'
-    ]
-    headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-    for url in urls:
-        try:
-            html = requests.get(url, headers=headers, timeout=10).text
-            df = pd.read_html(io.StringIO(html))[0]
-            
-            ticker_col = next((col for col in ['Symbol', 'Ticker Symbol', 'Ticker'] if col in df.columns), None)
-            sector_col = next((col for col in ['GICS Sector', 'Sector'] if col in df.columns), None)
-                    
-            if ticker_col and sector_col:
-                mapping = dict(zip(df[ticker_col].astype(str).str.replace('.', '-', regex=False), df[sector_col]))
-                sector_map.update(mapping)
-        except Exception as e:
-            print(f"Error fetching sectors from {url}: {e}")
-    return sector_map
-
-def format_pct(current, previous, show_percent=True, decimals=1):
-    """คำนวณ % และใส่ 🟢 หุ้นขึ้น หรือ 🔴 หุ้นลง (สามารถซ่อนทศนิยมและ % ได้เพื่อประหยัดพื้นที่)"""
-    if pd.isna(current) or pd.isna(previous) or previous == 0: 
-        val_str = f"0.{'0'*decimals}" if decimals > 0 else "0"
-        return f"⚪{val_str}%" if show_percent else f"⚪{val_str}"
-    
-    diff = ((current - previous) / previous) * 100
-    emoji = "🟢" if diff >= 0 else "🔴"
-    val_str = f"{abs(diff):.{decimals}f}"
-    
-    return f"{emoji}{val_str}%" if show_percent else f"{emoji}{val_str}"
+    """ดึงรายชื่อหุ้นทั้งหมดจาก SEC (ก.ล.ต. สหรัฐฯ) เพื่อสแกนทั้งตลาด 100% (รวม Watchlist)"""
+    return list(set(CUSTOM_WATCHLIST) | get_sec_tickers())
 
 def send_to_discord(df, title, webhook_url, history_header="D-1 to D-10"):
     """ฟังก์ชันจัดการส่งข้อความเข้า Discord แบบตัดก้อนอัตโนมัติ"""
@@ -104,113 +59,45 @@ def send_to_discord(df, title, webhook_url, history_header="D-1 to D-10"):
         messages_to_send.append(current_msg)
 
     for msg in messages_to_send:
-        requests.post(webhook_url, json={"content": msg})
-        time.sleep(1)
-
-def main():
-    print("🚀 เริ่มสแกนหุ้นทั้งตลาดสหรัฐฯ (Fully Automatic)...")
-    tickers = get_all_us_tickers()
-    
-    if not tickers:
-        print("ไม่สามารถดึงรายชื่อหุ้นได้")
-        return
-        
-    print(f"พบรายชื่อหุ้นในระบบทั้งหมด {len(tickers)} ตัว")
-    print("กำลังดาวน์โหลดข้อมูล (แบ่งเป็นรอบๆ เพื่อป้องกัน Yahoo บล็อก)...")
-
-    results = []
-    chunk_size = 100 
-    
-    for i in range(0, len(tickers), chunk_size):
-        chunk = tickers[i:i + chunk_size]
-        if len(chunk) == 1: chunk.append('AAPL')
-
-        # โหลดข้อมูลย้อนหลัง 20 วัน
-        data = yf.download(chunk, period="20d", interval="1d", threads=True, progress=False)
-        
-        if 'Close' not in data or len(data['Close']) < 12: continue
-            
-        close_data = data['Close']
-        volume_data = data['Volume']
-        
-        # 🛡️ ล็อกวันที่จากแกนเวลา (Index) ดึง 12 วันทำการล่าสุด
-        try:
-            global_dates = close_data.index[-12:]
-        except IndexError:
-            continue
-        
-        for ticker in chunk:
-            try:
-                if ticker not in close_data.columns: continue
-                
-                curr_price = close_data.loc[global_dates[-1], ticker]
-                prev_price = close_data.loc[global_dates[-2], ticker]
-                
-                if pd.isna(curr_price) or pd.isna(prev_price): continue
-                    
-                avg_vol_5d = volume_data[ticker].tail(5).mean()
-                if pd.isna(avg_vol_5d): continue
-                
-                # --- 🛡️ FILTER LOGIC ---
-                is_watchlist = ticker in CUSTOM_WATCHLIST
-                if not is_watchlist:
-                    if curr_price < MIN_PRICE: continue
-                    dollar_vol = curr_price * avg_vol_5d
-                    if dollar_vol < MIN_DOLLAR_VOLUME: continue
-                # ------------------------
-                
-                today_pct_val = ((curr_price - prev_price) / prev_price) * 100
-
-                # --- 🎯 คำนวณ สรุป 10 วันหลังสุด ---
-                up_days = 0
-                down_days = 0
-                for j in range(1, 11): 
-                    curr_h = close_data.loc[global_dates[-j], ticker]
-                    prev_h = close_data.loc[global_dates[-(j+1)], ticker]
-                    if curr_h > prev_h: up_days += 1
-                    elif curr_h < prev_h: down_days += 1
-                
-                price_10d_ago = close_data.loc[global_dates[-11], ticker]
-                
-                # บีบช่องว่างออก และตัดทศนิยมออกเพื่อให้แคบที่สุด เช่น 🟢5🔴4(🟢337)
-                sum10_pct = format_pct(curr_price, price_10d_ago, show_percent=False, decimals=0)
-                sum10d_str = f"🟢{up_days}🔴{down_days}({sum10_pct})"
-                
-                # --- ดึง % ย้อนหลัง 10 วันรายวัน ---
-                history_pcts = []
-                valid_history = True
-                for j in range(2, 12):
-                    curr_hist = close_data.loc[global_dates[-j], ticker]
-                    prev_hist = close_data.loc[global_dates[-(j+1)], ticker]
-                    if pd.isna(curr_hist) or pd.isna(prev_hist):
-                        valid_history = False
-                        break
-                    # ตัดทั้ง % และ ตัดจุดทศนิยมทิ้งไปเลย (decimals=0) เพื่อประหยัดที่สุด
-                    history_pcts.append(format_pct(curr_hist, prev_hist, show_percent=False, decimals=0))
-                
-                if not valid_history: continue
-                
-                results.append({
-                    'Ticker': ticker,
-                    'Price': curr_price,
-                    # Today ให้ซ่อน % แต่เหลือทศนิยม 1 ตำแหน่ง
-                    'Today': format_pct(curr_price, prev_price, show_percent=False, decimals=1),
-                    'SortVal': today_pct_val,
-                    'Sum10D': sum10d_str,
-                    # นำประวัติมาต่อกันโดยไม่ใส่เว้นวรรค
-                    'History': "".join(history_pcts),
-                    'IsWatchlist': is_watchlist
-                })
-            except Exception:
-                continue
-                
-        time.sleep(1)
+        discord_dispatch.send(webhook_url, {"content": msg})
+
+def build_results(metrics, tickers):
+    """แปลงตารางตัวเลขกลาง (market_scan.compute_metrics) เป็นตารางรายงาน Top Gainer (เฉพาะ Top N + Watchlist)
+
+    ตัวเลขอยู่ในรูป Array จนคัดอันดับเสร็จ แล้วค่อยสร้างข้อความ 🟢/🔴 เฉพาะแถวที่จะส่งจริงในครั้งเดียว
+    """
+    scan = select_rows(metrics, tickers, CUSTOM_WATCHLIST, MIN_PRICE, MIN_DOLLAR_VOLUME)
+    # 🏆 คัด Top N ด้วยตัวเลขก่อน แล้วสร้างแถวเฉพาะ Top N + Watchlist (ไม่ต้องสร้างแถวให้ทั้งตลาด)
+    picked = np.array(list(dict.fromkeys([*top_n(scan['SortVal'], TOP_N), *np.flatnonzero(scan['IsWatchlist'])])),
+                      dtype=np.int64)
+    closes, price = scan['Closes'][picked], scan['Price'][picked]
+
+    # บีบช่องว่างออก และตัดทศนิยมออกเพื่อให้แคบที่สุด เช่น 🟢5🔴4(🟢337)
+    sum10_pct = format_pct(price, closes[:, 1], decimals=0, percent=False)
+    sum10d = [f"🟢{up}🔴{down}({pct})" for up, down, pct in zip(scan['Up'][picked], scan['Down'][picked], sum10_pct)]
+
+    # --- % ย้อนหลัง 10 วันรายวัน (D-1 ก่อน) ตัดทั้ง % และจุดทศนิยมเพื่อประหยัดที่สุด ---
+    history = format_pct(closes[:, 10:0:-1], closes[:, 9::-1], decimals=0, percent=False)
+
+    return pd.DataFrame({
+        'Ticker': [scan['Ticker'][k] for k in picked],
+        'Price': price,
+        # Today ให้ซ่อน % แต่เหลือทศนิยม 1 ตำแหน่ง
+        'Today': format_pct(price, scan['Prev'][picked], decimals=1, percent=False).tolist(),
+        'SortVal': scan['SortVal'][picked],
+        'Sum10D': sum10d,
+        # นำประวัติมาต่อกันโดยไม่ใส่เว้นวรรค
+        'History': ["".join(row) for row in history],
+        'IsWatchlist': scan['IsWatchlist'][picked].astype(bool),
+    })
 
-    if not results:
+def publish(results):
+    """จัดอันดับ ดึง Sector แล้วส่งรายงานเข้า Discord"""
+    if results.empty:
         print("ไม่พบหุ้นที่ผ่านเกณฑ์")
         return
         
-    all_df = pd.DataFrame(results)
+    all_df = results
 
     top_gainers = all_df.sort_values(by='SortVal', ascending=False).head(TOP_N)
     watchlist_df = all_df[all_df['IsWatchlist']].sort_values(by='SortVal', ascending=False)
@@ -220,38 +107,9 @@ def main():
         return
 
     # --- ดึงข้อมูล Sector สำหรับ Top N ---
-    print(f"กำลังดึงข้อมูลอุตสาหกรรม (Sector) สำหรับหุ้น Top {TOP_N} ตัว (ระบบ 3 ชั้น กันบล็อก)...")
-    sp1500_sectors = get_market_sectors()
-    sectors = []
-    
-    session = requests.Session()
-    session.headers.update({
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    })
-    
-    for ticker in top_gainers['Ticker']:
-        sector = 'Unknown'
-        if ticker in sp1500_sectors:
-            sector = sp1500_sectors[ticker]
-        else:
-            try:
-                url = f"[https://query2.finance.yahoo.com/v10/finance/quoteSummary/](https://query2.finance.yahoo.com/v10/finance/quoteSummary/){ticker}?modules=assetProfile"
-                res = session.get(url, timeout=5)
-                if res.status_code == 200:
-                    profile = res.json().get('quoteSummary', {}).get('result', [{}])[0].get('assetProfile', {})
-                    sector = profile.get('sector', profile.get('industry', 'Unknown'))
-            except Exception:
-                pass
-                
-            if sector == 'Unknown':
-                try:
-                    info = yf.Ticker(ticker, session=session).info
-                    sector = info.get('sector', info.get('industry', 'Unknown'))
-                except Exception:
-                    pass
-            time.sleep(0.5) 
-            
-        sectors.append(sector)
+    print(f"กำลังดึงข้อมูลอุตสาหกรรม (Sector) สำหรับหุ้น Top {TOP_N} ตัว (Cache ก่อน ไม่เจอค่อยถามแบบขนาน)...")
+    sector_map = lookup_sectors(top_gainers['Ticker'].tolist())
+    sectors = [sector_map[ticker] for ticker in top_gainers['Ticker']]
         
     top_gainers = top_gainers.copy()
     top_gainers['Sector'] = sectors
@@ -286,9 +144,32 @@ def main():
     send_to_discord(watchlist_df, title_watch, DISCORD_WEBHOOK_URL)
     
     print("ส่งข้อมูล Sector Summary...")
-    requests.post(DISCORD_WEBHOOK_URL, json={"content": sector_msg_content})
+    discord_dispatch.send(DISCORD_WEBHOOK_URL, {"content": sector_msg_content})
         
     print("✅ สแกนทั้งตลาด ดึงกลุ่ม Sector และส่งเข้า Discord เรียบร้อย!")
 
+def main():
+    print("🚀 เริ่มสแกนหุ้นทั้งตลาดสหรัฐฯ (Fully Automatic)...")
+    tickers = get_all_us_tickers()
+    
+    if not tickers:
+        print("ไม่สามารถดึงรายชื่อหุ้นได้")
+        return
+        
+    print(f"พบรายชื่อหุ้นในระบบทั้งหมด {len(tickers)} ตัว")
+    print("กำลังดาวน์โหลดข้อมูล (แบ่งก้อนโหลดขนาน ปรับความเร็วอัตโนมัติเพื่อป้องกัน Yahoo บล็อก)...")
+
+    # 💧 ข้ามหุ้นที่ไม่มีสภาพคล่องมานานแล้ว (ยกเว้น Watchlist + ชุดสุ่มตรวจ)
+    download = liquidity.prefilter(tickers, keep=CUSTOM_WATCHLIST)
+
+    # 📥 โหลดย้อนหลัง 20 วันของทั้งตลาดในครั้งเดียว (market_data แบ่งก้อนให้ Worker หลายตัว และชะลอเองเมื่อ Yahoo จำกัดความถี่)
+    panel, failed = get_panel(download, "20d")
+    metrics = compute_metrics(panel)
+    if metrics is None:
+        print("ดึงข้อมูลจาก Yahoo Finance ไม่สำเร็จ")
+        return
+    liquidity.record(metrics, download, MIN_PRICE, MIN_DOLLAR_VOLUME, failed=failed)
+    publish(build_results(metrics, tickers))
+
 if __name__ == "__main__":
     main()
@@ -1,8 +1,8 @@
-import yfinance as yf
 import pandas as pd
 import requests
 import os
-import time
+import discord_dispatch
+from market_data import get_history
 
 # ดึงค่าจาก GitHub Secrets
 DISCORD_WEBHOOK_URL = 'https://discord.com/api/webhooks/1476755678931456062/LpfG3Eq5jgnOmW8-q2BhfGPAEK3Jd-YEbiaH2oJiEHis0B51mvkYILkKuIKbu3Y3yKc5'
@@ -34,12 +34,12 @@ def main():
         return
 
     # ดึงข้อมูลย้อนหลัง 12 วันเพื่อเผื่อวันหยุด
-    data = yf.download(tickers, period="12d", interval="1d", group_by='ticker', threads=True)
+    history, _ = get_history(tickers, "12d")
     
     results = []
     for ticker in tickers:
         try:
-            h = data[ticker]['Close'].dropna()
+            h = history[ticker]['Close'].dropna()
             if len(h) < 6: continue
             
             # ดึงราคาปิดปัจจุบันและเมื่อวาน
@@ -104,12 +104,9 @@ def main():
         current_msg += f"{cb}"
         messages_to_send.append(current_msg)
 
-    # ยิงข้อความเข้า Discord ทีละก้อน
+    # ยิงข้อความเข้า Discord ทีละก้อน (Dispatcher รอตาม Rate Limit ของ Discord เอง)
     for msg in messages_to_send:
-        response = requests.post(DISCORD_WEBHOOK_URL, json={"content": msg})
-        if response.status_code not in (200, 204):
-            print(f"Error sending to Discord: {response.status_code} - {response.text}")
-        time.sleep(1) # หน่วงเวลา 1 วินาทีกันบอทโดนบล็อก
+        discord_dispatch.send(DISCORD_WEBHOOK_URL, {"content": msg})
         
     print("✅ ส่งข้อมูล 50 อันดับเข้า Discord เรียบร้อย!")
 
@@ -0,0 +1,477 @@
+"""🧪 ตัวแทนบริการภายนอกแบบออฟไลน์สำหรับ Benchmark: Supabase / Yahoo Finance / Discord
+
+ทุกตัวนับจำนวน Round Trip ไว้ใน STATS เพื่อให้วัดผลได้โดยไม่ต้องต่อเน็ต
+"""
+import re
+import sys
+import json
+import types
+import zlib
+import functools
+import datetime
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import requests
+
+STATS = Counter()
+
+
+# ---------------------------------------------------------
+# ⏱️ Virtual Clock (sleep ไม่รอจริง แต่นับเวลาที่ "ควรจะรอ")
+# ---------------------------------------------------------
+class VirtualClock:
+    def __init__(self):
+        self.offset = 0.0
+        self._real_monotonic = __import__('time').monotonic
+
+    def sleep(self, seconds):
+        if seconds and seconds > 0:
+            self.offset += seconds
+            STATS['virtual_sleep_ms'] += int(seconds * 1000)
+
+    def monotonic(self):
+        return self._real_monotonic() + self.offset
+
+
+CLOCK = VirtualClock()
+
+
+# ---------------------------------------------------------
+# 🗄️ Fake Supabase (PostgREST query builder แบบย่อ อยู่ในหน่วยความจำ)
+# ---------------------------------------------------------
+class FakeAPIError(Exception):
+    pass
+
+
+class _Result:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _split_top(expr):
+    parts, depth, cur = [], 0, ''
+    for ch in expr:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        if ch == ',' and depth == 0:
+            parts.append(cur)
+            cur = ''
+        else:
+            cur += ch
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def _like(value, pattern):
+    regex = '^' + '.*'.join(re.escape(p) for p in re.split(r'[%*]', pattern)) + '$'
+    return value is not None and re.match(regex, str(value)) is not None
+
+
+def _compare(op, value, arg):
+    if op == 'eq':
+        return value == arg
+    if op == 'neq':
+        return value != arg
+    if op == 'gt':
+        return value is not None and value > arg
+    if op == 'gte':
+        return value is not None and value >= arg
+    if op == 'lt':
+        return value is not None and value < arg
+    if op == 'lte':
+        return value is not None and value <= arg
+    if op == 'in':
+        return value in arg
+    if op == 'like':
+        return _like(value, arg)
+    if op == 'is':
+        return value is None if arg is None else value == arg
+    raise ValueError(f"unsupported op {op}")
+
+
+def _parse_term(term):
+    """แปลงเงื่อนไขแบบ PostgREST เช่น status.not.in.(sold,signal_sell) เป็นฟังก์ชัน"""
+    col, rest = term.split('.', 1)
+    negate = rest.startswith('not.')
+    if negate:
+        rest = rest[4:]
+    op, raw = rest.split('.', 1)
+    if op == 'in':
+        arg = [v.strip('"') for v in raw.strip('()').split(',')]
+    elif op == 'is':
+        arg = None if raw == 'null' else raw == 'true'
+    else:
+        arg = raw
+    fn = lambda row: _compare(op, row.get(col), arg)
+    return (lambda row: not fn(row)) if negate else fn
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.filters = []
+        self.op = 'select'
+        self.columns = '*'
+        self.count_mode = None
+        self.head = False
+        self.negate = False
+        self.order_by = []
+        self.limit_n = None
+        self.offset = 0
+        self.payload = None
+        self.on_conflict = None
+
+    # --- builders ---
+    def select(self, columns='*', count=None, head=False):
+        self.columns, self.count_mode, self.head = columns, count, head
+        return self
+
+    @property
+    def not_(self):
+        self.negate = True
+        return self
+
+    def _filter(self, op, column, arg):
+        negate, self.negate = self.negate, False
+        fn = lambda row: _compare(op, row.get(column), arg)
+        self.filters.append((lambda row: not fn(row)) if negate else fn)
+        return self
+
+    def eq(self, c, v): return self._filter('eq', c, v)
+    def neq(self, c, v): return self._filter('neq', c, v)
+    def gt(self, c, v): return self._filter('gt', c, v)
+    def gte(self, c, v): return self._filter('gte', c, v)
+    def lt(self, c, v): return self._filter('lt', c, v)
+    def lte(self, c, v): return self._filter('lte', c, v)
+    def like(self, c, v): return self._filter('like', c, v)
+    def in_(self, c, v): return self._filter('in', c, list(v))
+    def is_(self, c, v): return self._filter('is', c, None if v in (None, 'null') else v)
+
+    def or_(self, expr):
+        terms = [_parse_term(t) for t in _split_top(expr)]
+        self.filters.append(lambda row: any(t(row) for t in terms))
+        return self
+
+    def order(self, column, desc=False):
+        self.order_by.append((column, desc))
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    def range(self, start, end):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    def insert(self, rows):
+        self.op, self.payload = 'insert', rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict='id'):
+        self.op, self.payload = 'upsert', rows if isinstance(rows, list) else [rows]
+        self.on_conflict = on_conflict
+        return self
+
+    def update(self, values):
+        self.op, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.op = 'delete'
+        return self
+
+    # --- execute ---
+    def _project(self, row):
+        if self.columns.strip() == '*':
+            return dict(row)
+        return {c.strip(): row.get(c.strip()) for c in self.columns.split(',')}
+
+    def execute(self):
+        STATS['supabase_round_trips'] += 1
+        STATS[f'supabase_{self.op}'] += 1
+        rows = self.db.tables.setdefault(self.table, [])
+        match = [r for r in rows if all(f(r) for f in self.filters)]
+
+        if self.op == 'select':
+            for column, desc in reversed(self.order_by):
+                match.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+            total = len(match)
+            if self.limit_n is not None:
+                match = match[self.offset:self.offset + self.limit_n]
+            data = [] if self.head else [self._project(r) for r in match]
+            return _Result(data, total if self.count_mode else None)
+
+        if self.op == 'insert':
+            out = []
+            for p in self.payload:
+                row = dict(p)
+                row.setdefault('id', self.db.next_id())
+                rows.append(row)
+                out.append(dict(row))
+            return _Result(out)
+
+        if self.op == 'upsert':
+            key = self.on_conflict
+            index = {r.get(key): r for r in rows}
+            out = []
+            for p in self.payload:
+                row = index.get(p.get(key))
+                if row is None:
+                    row = dict(p)
+                    row.setdefault('id', self.db.next_id())
+                    rows.append(row)
+                    index[row.get(key)] = row
+                else:
+                    row.update(p)
+                out.append(dict(row))
+            return _Result(out)
+
+        if self.op == 'update':
+            for r in match:
+                r.update(self.payload)
+            return _Result([dict(r) for r in match])
+
+        if self.op == 'delete':
+            ids = {id(r) for r in match}
+            self.db.tables[self.table] = [r for r in rows if id(r) not in ids]
+            return _Result([dict(r) for r in match])
+        raise ValueError(self.op)
+
+
+class FakeRPC:
+    def __init__(self, db, name, params):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        STATS['supabase_round_trips'] += 1
+        STATS['supabase_rpc'] += 1
+        fn = self.db.functions.get(self.name)
+        if fn is None:
+            raise FakeAPIError(f"Could not find the function public.{self.name}")
+        return _Result(fn(self.db, **(self.params or {})))
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.tables = {}
+        self.functions = {}
+        self._id = 0
+
+    def next_id(self):
+        self._id += 1
+        return self._id
+
+
+class FakeClient:
+    def __init__(self, db):
+        self.db = db
+
+    def table(self, name):
+        return FakeQuery(self.db, name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self.db, name, params)
+
+
+DATABASE = FakeDatabase()
+
+
+def install_supabase():
+    module = types.ModuleType('supabase')
+    module.create_client = lambda url=None, key=None, *a, **k: FakeClient(DATABASE)
+    module.Client = FakeClient
+    sys.modules['supabase'] = module
+    return DATABASE
+
+
+# ---------------------------------------------------------
+# 📈 Fake Yahoo Finance (ราคาสังเคราะห์ที่ทำซ้ำได้ต่อหุ้น)
+# ---------------------------------------------------------
+DEAD_PREFIX = 'DEAD'
+HISTORY_START = pd.Timestamp('2023-01-02')
+
+
+@functools.lru_cache(maxsize=None)
+def _calendar(end):
+    return pd.bdate_range(HISTORY_START, end)
+
+
+def synthetic_bars(ticker, start=None, end=None):
+    """OHLCV รายวันแบบสุ่มที่ seed ด้วยชื่อหุ้น (เรียกซ้ำได้ผลเดิม)"""
+    if ticker.startswith(DEAD_PREFIX):
+        return pd.DataFrame()
+    dates = _calendar(pd.Timestamp(end or datetime.date.today()))
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    drift = rng.normal(0.0005, 0.001)
+    close = (5 + rng.random() * 200) * np.exp(np.cumsum(rng.normal(drift, 0.025, len(dates))))
+    high = close * (1 + rng.random(len(dates)) * 0.02)
+    low = close * (1 - rng.random(len(dates)) * 0.02)
+    volume = rng.lognormal(13.5, 1.5, len(dates)).round()
+    df = pd.DataFrame({'Open': close, 'High': high, 'Low': low, 'Close': close, 'Volume': volume}, index=dates)
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    return df
+
+
+def _period_start(period):
+    match = re.fullmatch(r'(\d+)(d|wk|mo|y)', period or '1mo')
+    n, unit = int(match.group(1)), match.group(2)
+    today = pd.Timestamp(datetime.date.today())
+    if unit == 'd':
+        return pd.bdate_range(end=today, periods=n)[0]
+    if unit == 'wk':
+        return today - pd.Timedelta(weeks=n)
+    if unit == 'mo':
+        return today - pd.DateOffset(months=n)
+    return today - pd.DateOffset(years=n)
+
+
+def fake_download(tickers, period=None, start=None, interval='1d', group_by='column', **kwargs):
+    tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+    # yf.download จริงยิง HTTP ทีละหุ้นอยู่ภายใน -> นับเป็น 1 การเรียก แต่ HTTP จริง ≈ yahoo_symbols
+    STATS['yahoo_calls'] += 1
+    STATS['yahoo_symbols'] += len(tickers)
+    begin = pd.Timestamp(start) if start is not None else _period_start(period)
+    frames = {t: synthetic_bars(t, begin) for t in tickers}
+    frames = {t: df for t, df in frames.items() if not df.empty}
+    if not frames:
+        return pd.DataFrame()
+    data = pd.concat(frames, axis=1)  # columns = (Ticker, Field)
+    if group_by != 'ticker':
+        data = data.swaplevel(axis=1).sort_index(axis=1)
+    return data
+
+
+class FakeTicker:
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    def history(self, period=None, interval='1d', start=None, **kwargs):
+        STATS['yahoo_calls'] += 1
+        STATS['yahoo_symbols'] += 1
+        begin = pd.Timestamp(start) if start is not None else _period_start(period or '1mo')
+        df = synthetic_bars(self.ticker, begin)
+        if interval != '1d' and not df.empty:
+            df = df.tail(1)
+        return df
+
+    @property
+    def info(self):
+        STATS['yahoo_calls'] += 1
+        return {'sector': ['Technology', 'Healthcare', 'Energy', 'Financial Services'][zlib.crc32(self.ticker.encode()) % 4]}
+
+
+def install_yfinance():
+    module = types.ModuleType('yfinance')
+    module.download = fake_download
+    module.Ticker = FakeTicker
+    sys.modules['yfinance'] = module
+    return module
+
+
+# ---------------------------------------------------------
+# 💬 Fake Discord Webhook (บังคับขนาดข้อความ + Rate Limit แบบเดียวกับ Discord)
+# ---------------------------------------------------------
+DISCORD_BUCKET_LIMIT = 5       # ข้อความต่อ Bucket
+DISCORD_BUCKET_WINDOW = 2.0    # วินาที
+CONTENT_LIMIT = 2000
+EMBED_LIMIT = 10
+EMBED_DESCRIPTION_LIMIT = 4096
+EMBED_TOTAL_LIMIT = 6000
+
+
+class FakeDiscord:
+    def __init__(self, clock=CLOCK):
+        self.clock = clock
+        self.window_start = 0.0
+        self.used = 0
+        self.messages = []
+
+    def _validate(self, payload):
+        content = payload.get('content') or ''
+        embeds = payload.get('embeds') or []
+        if not content and not embeds:
+            return 'Cannot send an empty message'
+        if len(content) > CONTENT_LIMIT:
+            return f'content must be {CONTENT_LIMIT} or fewer in length'
+        if len(embeds) > EMBED_LIMIT:
+            return f'embeds must be {EMBED_LIMIT} or fewer'
+        total = 0
+        for emb in embeds:
+            if len(emb.get('description') or '') > EMBED_DESCRIPTION_LIMIT:
+                return 'embed description too long'
+            total += len(emb.get('title') or '') + len(emb.get('description') or '')
+            total += sum(len(f.get('name', '')) + len(str(f.get('value', ''))) for f in emb.get('fields', []))
+        if total > EMBED_TOTAL_LIMIT:
+            return 'embeds exceed 6000 characters'
+        return None
+
+    def handle(self, payload):
+        now = self.clock.monotonic()
+        if now - self.window_start >= DISCORD_BUCKET_WINDOW:
+            self.window_start, self.used = now, 0
+        reset_after = max(0.0, DISCORD_BUCKET_WINDOW - (now - self.window_start))
+        if self.used >= DISCORD_BUCKET_LIMIT:
+            STATS['discord_429'] += 1
+            body = {'message': 'You are being rate limited.', 'retry_after': round(reset_after, 3), 'global': False}
+            return 429, {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset-After': f'{reset_after:.3f}'}, body
+
+        error = self._validate(payload)
+        if error:
+            STATS['discord_rejected'] += 1
+            return 400, {}, {'message': error, 'code': 50035}
+
+        self.used += 1
+        STATS['discord_messages'] += 1
+        self.messages.append(payload)
+        headers = {
+            'X-RateLimit-Limit': str(DISCORD_BUCKET_LIMIT),
+            'X-RateLimit-Remaining': str(DISCORD_BUCKET_LIMIT - self.used),
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+        }
+        return 204, headers, None
+
+
+DISCORD = FakeDiscord()
+
+
+def _fake_send(self, request, **kwargs):
+    """แทน requests.Session.send: Discord -> FakeDiscord, ที่อื่นทั้งหมด -> ออฟไลน์"""
+    STATS['http_requests'] += 1
+    response = requests.Response()
+    response.request = request
+    response.url = request.url
+    if 'discord.com/api/webhooks' in request.url or request.url.startswith('https://discord.test/'):
+        payload = json.loads(request.body or b'{}')
+        status, headers, body = DISCORD.handle(payload)
+    else:
+        STATS['http_blocked'] += 1
+        raise requests.ConnectionError(f"offline benchmark: {request.url}")
+    response.status_code = status
+    response.headers.update(headers)
+    response._content = json.dumps(body).encode() if body is not None else b''
+    return response
+
+
+def install_network():
+    requests.Session.send = _fake_send
+
+
+def install_all():
+    """ติดตั้ง Fake ทั้งหมด (ต้องเรียกก่อน import สคริปต์ของบอท)"""
+    install_network()
+    install_supabase()
+    install_yfinance()
+    # sleep ของทุกสคริปต์ + นาฬิกา Rate Limit ของ Dispatcher ใช้ Virtual Clock (ไม่รอจริง)
+    time_module = __import__('time')
+    time_module.sleep = CLOCK.sleep
+    import discord_dispatch
+    discord_dispatch.time = types.SimpleNamespace(sleep=CLOCK.sleep, monotonic=CLOCK.monotonic)
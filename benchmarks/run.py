@@ -0,0 +1,283 @@
+"""⏱️ Benchmark แบบออฟไลน์ของสคริปต์หลัก (ไม่แตะ Supabase / Yahoo / Discord จริง)
+
+วัด: เวลาจริง (wall), เวลาที่สคริปต์ "ควรจะรอ" (sleep / Rate Limit แบบ Virtual),
+จำนวน Round Trip ของแต่ละบริการ และหน่วยความจำสูงสุด (Peak RSS)
+
+    python -m benchmarks.run                          # ทุกสคริปต์ x 1k / 5k / 10k หุ้น
+    python -m benchmarks.run --cases monitor trader --sizes 1000
+    python -m benchmarks.run --warm                   # วัดรอบที่ 2 (Bar Cache อุ่นแล้ว)
+    python -m benchmarks.run --json bench.json
+
+แต่ละเคสรันใน Process แยก เพื่อให้ Peak RSS และ Cache ไม่ปนกันระหว่างเคส
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import resource
+import tempfile
+import importlib.util
+import subprocess
+from contextlib import redirect_stdout
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1000, 5000, 10000]
+SIGNAL_RATIO = 0.01     # สัดส่วนหุ้นที่มีสัญญาณรอซื้อ/รอขายใน Trader
+DEAD_RATIO = 0.01       # สัดส่วนหุ้นที่ Yahoo ไม่มีข้อมูล (ถูกลบจาก DB)
+THAI_RATIO = 0.10
+
+ENV = {
+    "SUPABASE_URL": "https://fake.supabase.test",
+    "SUPABASE_KEY": "bench",
+    "TEST_MODE": "Off",
+    "DISCORD_WEBHOOK": "https://discord.test/api/webhooks/monitor",
+    "DISCORD_WEBHOOK_TRADER": "https://discord.test/api/webhooks/trader",
+    "DISCORD_WEBHOOK_TOPGAINER": "https://discord.test/api/webhooks/topgainer",
+}
+
+
+# ---------------------------------------------------------
+# 🧬 ข้อมูลสังเคราะห์
+# ---------------------------------------------------------
+def make_tickers(n, thai_ratio=THAI_RATIO, dead_ratio=DEAD_RATIO):
+    tickers = []
+    for i in range(n):
+        if i % 100 < dead_ratio * 100:
+            tickers.append(f"DEAD{i:05d}")
+        elif i % 100 >= 100 - thai_ratio * 100:
+            tickers.append(f"TH{i:05d}.BK")
+        else:
+            tickers.append(f"S{i:05d}")
+    return tickers
+
+
+def seed_watchlist(db, table, tickers):
+    """ตาราง ipo_trades แบบสมจริง: ส่วนใหญ่ watching + มีทั้งรอซื้อ/ถือ/รอขาย/ขายแล้ว"""
+    rng = random.Random(42)
+    types = ["SP500_BASE", "SET_BASE", "AUTO_LONG_US", "AUTO_SHORT_US", "FAVOURITE", "MOONSHOT"]
+    now = datetime.datetime.now().isoformat()
+    rows = []
+    for i, ticker in enumerate(tickers):
+        roll = rng.random()
+        status = ("watching" if roll < 0.80 else "signal_buy" if roll < 0.88 else
+                  "holding" if roll < 0.95 else "signal_sell" if roll < 0.97 else "sold")
+        price = round(rng.uniform(5, 200), 2)
+        rows.append({
+            "id": i + 1, "ticker": ticker, "market_type": rng.choice(types), "status": status,
+            "last_price": price, "base_high": round(price * 1.02, 2), "highest_price": price,
+            "buy_price": price if status in ("holding", "signal_sell") else None,
+            "last_update": now,
+        })
+    db.tables[table] = rows
+    db._id = len(rows)
+    return rows
+
+
+def seed_trader(db, table, tickers):
+    """คิวสัญญาณของ Trader: SIGNAL_RATIO รอซื้อ + SIGNAL_RATIO รอขาย (มี OPEN record ใน trade_history)"""
+    rows = seed_watchlist(db, table, tickers)
+    live = [r for r in rows if not r["ticker"].startswith("DEAD")]
+    signals = max(1, int(len(rows) * SIGNAL_RATIO))
+    for row in rows:
+        if row["status"] in ("signal_buy", "signal_sell"):
+            row["status"] = "watching"
+    buys, sells = live[:signals], live[signals:2 * signals]
+    history = []
+    for row in buys:
+        row["status"] = "signal_buy"
+    for row in sells:
+        row.update(status="signal_sell", buy_price=row["last_price"])
+        history.append({"id": db.next_id(), "ticker": row["ticker"], "buy_price": row["last_price"],
+                        "buy_date": row["last_update"], "status": "OPEN"})
+    db.tables["trade_history"] = history
+
+
+def seed_scraper(db, table, tickers):
+    """90% มีอยู่แล้วในตาราง, 5% เปลี่ยน market_type, 5% เป็นหุ้นใหม่"""
+    known = tickers[: int(len(tickers) * 0.95)]
+    rows = seed_watchlist(db, table, known)
+    for row in rows[: int(len(tickers) * 0.05)]:
+        row["market_type"] = "AUTO_LONG_US"
+    for row in rows[int(len(tickers) * 0.05):]:
+        row["market_type"] = "SP500_BASE"
+
+
+# ---------------------------------------------------------
+# 🎬 เคสที่วัด
+# ---------------------------------------------------------
+def load_script(filename):
+    """import สคริปต์ของบอท (ชื่อไฟล์ขึ้นต้นด้วยตัวเลข import ตรงๆ ไม่ได้)"""
+    name = "bench_" + os.path.splitext(filename)[0]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def case_scraper(db, n):
+    mod = load_script("01_scraper.py")
+    tickers = [t for t in make_tickers(n, dead_ratio=0) if not t.endswith(".BK")]
+    mod.get_external_sp500 = lambda: [{"ticker": t, "market_type": "SP500_BASE"} for t in tickers]
+    return lambda: seed_scraper(db, mod.TABLE_NAME, tickers), mod.main
+
+
+def case_monitor(db, n):
+    mod = load_script("02_monitor.py")
+    tickers = make_tickers(n)
+    return lambda: seed_watchlist(db, mod.TABLE_NAME, tickers), lambda: mod.run_monitor("ALL")
+
+
+def case_trader(db, n):
+    mod = load_script("06_trader.py")
+    tickers = make_tickers(n)
+    return lambda: seed_trader(db, mod.TABLE_TRADES, tickers), mod.execute_trade
+
+
+def case_topgainer(db, n):
+    mod = load_script("Top_gainer_all_v2.py")
+    tickers = list(dict.fromkeys(mod.CUSTOM_WATCHLIST + make_tickers(n, thai_ratio=0)))[:n]
+    mod.get_all_us_tickers = lambda: list(tickers)
+    return lambda: None, mod.main
+
+
+def case_reports(db, n):
+    mod = load_script("Market_reports.py")
+    tickers = set(make_tickers(n, thai_ratio=0))
+    mod.get_sec_tickers = lambda: set(tickers)
+    return lambda: None, mod.main
+
+
+CASES = {
+    "scraper": case_scraper,
+    "monitor": case_monitor,
+    "trader": case_trader,
+    "topgainer": case_topgainer,
+    "reports": case_reports,
+}
+
+
+def run_case(name, n, warm=False):
+    """รันหนึ่งเคสใน Process นี้ (เรียกผ่าน --child) คืนค่า dict ของผลวัด"""
+    from benchmarks import fakes
+    fakes.install_all()
+    db = fakes.DATABASE
+
+    seed, target = CASES[name](db, n)
+    log = open(os.devnull, "w")
+    if warm:
+        seed()
+        with redirect_stdout(log):
+            target()
+
+    seed()
+    fakes.STATS.clear()
+    fakes.DISCORD.messages.clear()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    error = None
+    try:
+        with redirect_stdout(log):
+            target()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    stats = fakes.STATS
+    return {
+        "case": name,
+        "tickers": n,
+        "warm": warm,
+        "wall_s": round(wall, 3),
+        "virtual_wait_s": round(stats["virtual_sleep_ms"] / 1000, 1),
+        "supabase_round_trips": stats["supabase_round_trips"],
+        "yahoo_calls": stats["yahoo_calls"],
+        "yahoo_symbols": stats["yahoo_symbols"],
+        "discord_messages": stats["discord_messages"],
+        "discord_429": stats["discord_429"],
+        "discord_rejected": stats["discord_rejected"],
+        "http_blocked": stats["http_blocked"],
+        "peak_rss_mb": round(peak / 1024, 1),
+        "rss_growth_mb": round((peak - rss_before) / 1024, 1),
+        "error": error,
+    }
+
+
+# ---------------------------------------------------------
+# 📋 รายงาน
+# ---------------------------------------------------------
+COLUMNS = [
+    ("case", "Case", "{}"),
+    ("tickers", "N", "{}"),
+    ("wall_s", "Wall(s)", "{:.2f}"),
+    ("virtual_wait_s", "Wait(s)", "{:.1f}"),
+    ("supabase_round_trips", "DB RT", "{}"),
+    ("yahoo_calls", "Yahoo calls", "{}"),      # จำนวนการเรียก API ฝั่ง Python (yf.download หลายหุ้น = 1)
+    ("yahoo_symbols", "Symbols", "{}"),        # ≈ จำนวน HTTP Request จริงไป Yahoo
+    ("discord_messages", "Discord", "{}"),
+    ("discord_429", "429", "{}"),
+    ("discord_rejected", "Rejected", "{}"),
+    ("peak_rss_mb", "PeakRSS(MB)", "{:.0f}"),
+]
+
+
+def print_table(results):
+    rows = [[fmt.format(r[key]) if r.get(key) is not None else "-" for key, _, fmt in COLUMNS] for r in results]
+    headers = [title for _, title, _ in COLUMNS]
+    widths = [max(len(h), *(len(row[i]) for row in rows)) for i, h in enumerate(headers)]
+    print("  ".join(h.rjust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)))
+    for r in results:
+        if r.get("error"):
+            print(f"❌ {r['case']} @ {r['tickers']}: {r['error']}")
+
+
+def spawn(name, n, warm):
+    """รันเคสใน Process ใหม่ (Cache และ Peak RSS แยกกันต่อเคส)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, **ENV, BAR_CACHE_PATH=os.path.join(tmp, "bars.sqlite"))
+        cmd = [sys.executable, "-m", "benchmarks.run", "--child", name, str(n)] + (["--warm"] if warm else [])
+        proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"case": name, "tickers": n, "warm": warm,
+            "error": f"exit {proc.returncode}: {proc.stderr.strip().splitlines()[-1:] or ''}"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark ของบอท")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--warm", action="store_true", help="รันหนึ่งรอบก่อนวัด (Bar Cache อุ่นแล้ว)")
+    parser.add_argument("--json", help="บันทึกผลเป็นไฟล์ JSON")
+    parser.add_argument("--child", nargs=2, metavar=("CASE", "N"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(args.child[0], int(args.child[1]), args.warm)))
+        return
+
+    results = []
+    for name in args.cases:
+        for n in args.sizes:
+            print(f"⏱️ {name} @ {n} tickers{' (warm)' if args.warm else ''}...", flush=True)
+            results.append(spawn(name, n, args.warm))
+
+    print()
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Saved {args.json}")
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, ROOT)
+    main()
@@ -1,7 +1,7 @@
 import os
 import yfinance as yf
 from supabase import create_client
-import requests
+import discord_dispatch
 from datetime import datetime
 
 # 1. การตั้งค่าการเชื่อมต่อ (ดึงจาก GitHub Secrets)
@@ -14,7 +14,7 @@ supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 def notify(msg):
     """ส่งข้อความแจ้งเตือนเข้า Discord"""
     if DISCORD_URL:
-        requests.post(DISCORD_URL, json={"content": msg})
+        discord_dispatch.send(DISCORD_URL, {"content": msg})
     print(msg)
 
 def run_bot():
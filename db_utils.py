@@ -0,0 +1,99 @@
+"""🧰 ตัวช่วยอ่าน/เขียน Supabase แบบเป็นก้อน (ใช้ร่วมกันทุกสคริปต์)"""
+
+PAGE_SIZE = 1000        # ลิมิตแถวต่อการ select หนึ่งครั้งของ Supabase
+WRITE_CHUNK_SIZE = 500  # จำนวนแถวต่อการ upsert หนึ่งครั้ง
+UPDATE_FUNCTION = "update_rows"  # ฟังก์ชันใน sql/update_rows.sql (อัปเดตหลายแถวโดยไม่ Insert)
+
+
+def is_missing_function(error):
+    """RPC ยังไม่ได้ติดตั้งใน DB (ยังไม่ได้รันไฟล์ใน sql/)"""
+    text = str(error).lower()
+    return "pgrst202" in text or "could not find the function" in text
+
+
+def fetch_all_rows(client, table, columns="*", key="ticker", filters=None):
+    """ดึงทุกแถวของตารางทีละหน้า (1000 แถว) แบบ Keyset (key > ค่าสุดท้ายของหน้าก่อน)
+
+    ไม่ใช้ OFFSET จึงเร็วเท่าเดิมแม้ตารางจะโตขึ้น / filters = ฟังก์ชันรับ query แล้วคืน query
+    ที่เติมเงื่อนไขฝั่ง Server (columns ต้องมีคอลัมน์ key อยู่ด้วย)
+    """
+    rows = []
+    last_key = None
+    while True:
+        query = client.table(table).select(columns)
+        if filters:
+            query = filters(query)
+        if last_key is not None:
+            query = query.gt(key, last_key)
+        data = query.order(key).limit(PAGE_SIZE).execute().data or []
+        rows.extend(data)
+        if len(data) < PAGE_SIZE:
+            break
+        last_key = data[-1][key]
+    return rows
+
+
+def upsert_in_chunks(client, table, rows, on_conflict, chunk_size=WRITE_CHUNK_SIZE):
+    """Upsert ทีละก้อน แทนการยิงทีละแถว คืนค่าจำนวนแถวที่เขียนสำเร็จ"""
+    written = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        try:
+            client.table(table).upsert(chunk, on_conflict=on_conflict).execute()
+            written += len(chunk)
+        except Exception as e:
+            print(f"   ⚠️ Bulk upsert failed ({len(chunk)} rows): {e}")
+    return written
+
+
+def delete_in_chunks(client, table, column, values, chunk_size=WRITE_CHUNK_SIZE):
+    """ลบหลายแถวด้วย in_() ทีละก้อน แทนการ delete ทีละแถว คืนค่าจำนวนแถวที่ลบสำเร็จ"""
+    deleted = 0
+    for i in range(0, len(values), chunk_size):
+        chunk = values[i:i + chunk_size]
+        try:
+            client.table(table).delete().in_(column, chunk).execute()
+            deleted += len(chunk)
+        except Exception as e:
+            print(f"   ⚠️ Bulk delete failed ({len(chunk)} rows): {e}")
+    return deleted
+
+
+def update_rows(client, table, rows, key, chunk_size=WRITE_CHUNK_SIZE):
+    """อัปเดตหลายแถว (ค่าต่างกันแต่ละแถว) เฉพาะคอลัมน์ที่อยู่ในแถวนั้น และเฉพาะแถวที่ยังมีอยู่ (ไม่ Insert แถวใหม่)
+
+    ใช้ RPC update_rows (UPDATE ล้วน) ถ้ายังไม่ได้ติดตั้งค่อยเช็คว่า key ยังอยู่ใน DB แล้ว Upsert แยกก้อนตามชุดคอลัมน์
+    (แถวที่ถูกลบไประหว่างรอบจะไม่ถูกสร้างกลับมา) คืนค่าจำนวนแถวที่จัดการสำเร็จ (แถวที่ไม่มีแล้วนับว่าสำเร็จ)
+    """
+    written = 0
+    use_rpc = True
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        if use_rpc:
+            try:
+                client.rpc(UPDATE_FUNCTION, {"table_name": table, "key_column": key, "rows": chunk}).execute()
+                written += len(chunk)
+                continue
+            except Exception as e:
+                if not is_missing_function(e):
+                    print(f"   ⚠️ Bulk update failed ({len(chunk)} rows): {e}")
+                    continue
+                print(f"   ⚠️ RPC {UPDATE_FUNCTION} not installed -> upsert existing rows only (run sql/update_rows.sql)")
+                use_rpc = False
+
+        try:
+            res = client.table(table).select(key).in_(key, [r[key] for r in chunk]).execute()
+        except Exception as e:
+            print(f"   ⚠️ Bulk update failed ({len(chunk)} rows): {e}")
+            continue
+        existing = {r[key] for r in res.data or []}
+        # Bulk Upsert ต้องมีคีย์ชุดเดียวกันทั้งก้อน -> แยกกลุ่มตามชุดคอลัมน์ที่แถวนั้นแตะจริง
+        groups = {}
+        for row in chunk:
+            if row[key] in existing:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            else:
+                written += 1  # แถวถูกลบไปแล้ว ไม่มีอะไรต้องเขียน (เหมือน UPDATE ที่ไม่เจอแถวใน RPC)
+        for group in groups.values():
+            written += upsert_in_chunks(client, table, group, on_conflict=key, chunk_size=chunk_size)
+    return written
@@ -0,0 +1,126 @@
+"""📨 ส่งข้อความเข้า Discord Webhook แบบรู้ Rate Limit (ใช้ร่วมกันทุกสคริปต์)
+
+อ่าน X-RateLimit-Remaining / X-RateLimit-Reset-After จากทุก Response แล้วรอเท่าที่ Discord กำหนด
+(ไม่ต้อง sleep ตายตัว) โดน 429 จะรอตาม retry_after แล้วส่งซ้ำ ข้อความที่ส่งไม่สำเร็จจะถูกรายงานตอนจบ
+"""
+import time
+import atexit
+import threading
+
+import requests
+
+MAX_RETRIES = 5        # จำนวนครั้งที่ลองส่งซ้ำ (429 / 5xx / Network Error)
+REQUEST_TIMEOUT = 15   # วินาที
+BACKOFF_BASE = 1.0     # วินาที (คูณ 2 ทุกครั้งที่ Error ที่ไม่ใช่ 429)
+
+_session = requests.Session()
+_dispatchers = {}
+_dispatchers_lock = threading.Lock()
+
+
+class WebhookDispatcher:
+    """ตัวส่งของ Webhook หนึ่งอัน (จำสถานะ Rate Limit ของ Bucket นั้นไว้)"""
+
+    def __init__(self, url, session=None):
+        self.url = url
+        self.session = session or _session
+        self.sent = 0
+        self.dropped = []
+        self._ready_at = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_turn(self):
+        delay = self._ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _read_limits(self, res):
+        """ถ้า Bucket หมดโควต้าแล้ว ให้รอจนกว่าจะรีเซ็ต"""
+        remaining = res.headers.get("X-RateLimit-Remaining")
+        reset_after = res.headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None:
+            try:
+                if int(remaining) <= 0:
+                    self._ready_at = max(self._ready_at, time.monotonic() + float(reset_after))
+            except ValueError:
+                pass
+
+    @staticmethod
+    def _retry_after(res):
+        try:
+            return float(res.json().get("retry_after"))
+        except Exception:
+            pass
+        try:
+            return float(res.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return BACKOFF_BASE
+
+    def _drop(self, payload, reason):
+        embeds = payload.get("embeds") or [{}]
+        preview = (payload.get("content") or embeds[0].get("title") or "")[:60]
+        self.dropped.append({"reason": reason, "preview": preview})
+        print(f"❌ Discord message dropped ({reason}): {preview!r}")
+        return False
+
+    def send(self, payload):
+        """ส่ง payload (dict แบบ Discord Webhook) คืนค่า True ถ้าส่งสำเร็จ"""
+        if not self.url:
+            return self._drop(payload, "no webhook url")
+
+        with self._lock:
+            reason = "unknown"
+            for attempt in range(MAX_RETRIES + 1):
+                self._wait_turn()
+                try:
+                    res = self.session.post(self.url, json=payload, timeout=REQUEST_TIMEOUT)
+                except requests.RequestException as e:
+                    reason = f"network: {e}"
+                    time.sleep(BACKOFF_BASE * (2 ** attempt))
+                    continue
+
+                self._read_limits(res)
+                if res.status_code == 429:
+                    wait = self._retry_after(res)
+                    reason = "rate limited"
+                    print(f"⏳ Discord 429 -> retry in {wait:.2f}s")
+                    self._ready_at = max(self._ready_at, time.monotonic() + wait)
+                    continue
+                if res.status_code >= 500:
+                    reason = f"HTTP {res.status_code}"
+                    time.sleep(BACKOFF_BASE * (2 ** attempt))
+                    continue
+                if res.status_code >= 400:
+                    # 4xx อื่นๆ (payload ผิด/ยาวเกิน) ส่งซ้ำก็ไม่ผ่าน
+                    return self._drop(payload, f"HTTP {res.status_code}: {res.text[:200]}")
+
+                self.sent += 1
+                return True
+
+            return self._drop(payload, reason)
+
+
+def get_dispatcher(url):
+    with _dispatchers_lock:
+        if url not in _dispatchers:
+            _dispatchers[url] = WebhookDispatcher(url)
+        return _dispatchers[url]
+
+
+def send(url, payload):
+    """ส่งข้อความเข้า Webhook (ใช้ Dispatcher ของ URL นั้นร่วมกันทั้งโปรแกรม)"""
+    return get_dispatcher(url).send(payload)
+
+
+def report():
+    """สรุปจำนวนข้อความที่ส่งได้/ตกหล่น (เรียกอัตโนมัติตอนจบโปรแกรม)"""
+    sent = sum(d.sent for d in _dispatchers.values())
+    dropped = [item for d in _dispatchers.values() for item in d.dropped]
+    if sent or dropped:
+        print(f"📨 Discord: sent {sent}, dropped {len(dropped)}")
+    for item in dropped:
+        print(f"   - {item['reason']}: {item['preview']!r}")
+    return sent, dropped
+
+
+atexit.register(report)
@@ -0,0 +1,233 @@
+"""📐 สถานะ Indicator รายหุ้น (RSI / SMA) ที่อัปเดตทีละแท่งแบบ O(1) และเก็บไว้ใน Local Cache
+
+แทนการคำนวณ rolling ใหม่จากราคาย้อนหลังทั้งปีทุกรอบ:
+เก็บราคาปิดล่าสุดเท่าที่หน้าต่างยาวที่สุดต้องใช้ + ผลรวมสะสม แล้วบวก/ลบเฉพาะแท่งที่เข้า/ออก
+ถ้าพบแท่งหาย (Gap) หรือ Yahoo ปรับราคาย้อนหลัง (Revision) ให้สร้างใหม่จากราคาย้อนหลังเต็มช่วง
+"""
+import json
+import math
+from collections import deque
+
+import numpy as np
+
+import market_data
+
+RSI_WINDOW = 14
+REBUILD_EVERY = 250         # คำนวณผลรวมใหม่ทั้งหน้าต่างทุกๆ n อัปเดต กันความคลาดเคลื่อนของ float สะสม
+REVISION_TOLERANCE = 1e-4   # ราคาปิดแท่งเก่าเปลี่ยนเกินนี้ = ถูกปรับราคาย้อนหลัง
+
+
+class IndicatorState:
+    """หน้าต่างราคาปิดของหุ้นหนึ่งตัว + ผลรวม SMA ทุกความยาว + ผลรวม Gain/Loss ของ RSI"""
+
+    def __init__(self, windows, dates=(), closes=()):
+        self.windows = tuple(sorted(windows))
+        # +1 เพื่อให้คำนวณค่าของแท่งก่อนหน้า (sma_prev) ได้ด้วย
+        size = max(self.windows + (RSI_WINDOW,)) + 1
+        self.dates = deque(dates, maxlen=size)
+        self.closes = deque((float(c) for c in closes), maxlen=size)
+        self.updates = 0
+        self._rebuild()
+
+    @property
+    def count(self):
+        return len(self.closes)
+
+    @property
+    def last_date(self):
+        return self.dates[-1] if self.dates else None
+
+    def _rebuild(self):
+        closes = list(self.closes)
+        self.sums = {k: sum(closes[-k:]) for k in self.windows}
+        deltas = [b - a for a, b in zip(closes[-(RSI_WINDOW + 1):-1], closes[-RSI_WINDOW:])]
+        self.gain = sum(d for d in deltas if d > 0)
+        self.loss = sum(-d for d in deltas if d < 0)
+        self.updates = 0
+
+    def _rsi_delta(self, delta, sign):
+        if delta > 0:
+            self.gain += sign * delta
+        elif delta < 0:
+            self.loss -= sign * delta
+
+    def push(self, date, close):
+        """เพิ่มแท่งใหม่ (วันเดียวกับแท่งล่าสุด = แก้ราคาแท่งนั้น เช่น แท่งของวันนี้ที่ยังไม่ปิด)"""
+        close = float(close)
+        closes = self.closes
+        m = len(closes)
+        if m and date == self.dates[-1]:
+            old = closes[-1]
+            for k in self.windows:
+                self.sums[k] += close - old
+            if m >= 2:
+                self._rsi_delta(old - closes[-2], -1)
+                self._rsi_delta(close - closes[-2], +1)
+            closes[-1] = close
+        else:
+            for k in self.windows:
+                self.sums[k] += close - (closes[-k] if m >= k else 0.0)
+            if m >= 1:
+                self._rsi_delta(close - closes[-1], +1)
+            if m >= RSI_WINDOW + 1:
+                self._rsi_delta(closes[-RSI_WINDOW] - closes[-(RSI_WINDOW + 1)], -1)
+            closes.append(close)
+            self.dates.append(date)
+        self.updates += 1
+        if self.updates >= REBUILD_EVERY:
+            self._rebuild()
+
+    def sync(self, dates, closes):
+        """ต่อแท่งใหม่จากราคาล่าสุด (เรียงตามวัน) คืนค่า False ถ้าต่อไม่ได้ (Gap/Revision) ต้องสร้างใหม่"""
+        if not self.dates:
+            return False
+        bars = dict(zip(dates, closes))
+        last = self.dates[-1]
+        if last not in bars:
+            return False  # ข้อมูลใหม่ไม่ต่อกับของเดิม
+        if len(self.dates) >= 2:
+            prev = self.dates[-2]
+            if any(prev < d < last for d in bars):
+                return False  # มีแท่งแทรกเข้ามาระหว่างแท่งเดิม
+            if prev in bars and abs(float(bars[prev]) / self.closes[-2] - 1) > REVISION_TOLERANCE:
+                return False  # ราคาย้อนหลังถูกปรับ
+        for date in sorted(d for d in bars if d >= last):
+            self.push(date, bars[date])
+        return True
+
+    def sma(self, k):
+        return self.sums[k] / k if self.count >= k else math.nan
+
+    def sma_prev(self, k):
+        """SMA k แท่ง ณ แท่งก่อนหน้า"""
+        if self.count < k + 1:
+            return math.nan
+        return (self.sums[k] - self.closes[-1] + self.closes[-(k + 1)]) / k
+
+    def rsi(self):
+        """RSI ค่าเฉลี่ยธรรมดา 14 แท่ง (สูตรเดียวกับ calculate_rsi) คำนวณไม่ได้ = NaN"""
+        if self.count < RSI_WINDOW + 1:
+            return math.nan
+        gain = max(self.gain, 0.0) / RSI_WINDOW
+        loss = max(self.loss, 0.0) / RSI_WINDOW
+        if loss == 0:
+            return 100.0 if gain > 0 else math.nan
+        return 100 - (100 / (1 + gain / loss))
+
+    def to_row(self, ticker, name):
+        return (ticker, name, json.dumps(list(self.dates)), json.dumps(list(self.closes)),
+                json.dumps({str(k): v for k, v in self.sums.items()}), self.gain, self.loss, self.updates)
+
+    @classmethod
+    def from_row(cls, windows, dates, closes, sums, gain, loss, updates):
+        state = cls.__new__(cls)
+        state.windows = tuple(sorted(windows))
+        size = max(state.windows + (RSI_WINDOW,)) + 1
+        state.dates = deque(json.loads(dates), maxlen=size)
+        state.closes = deque(json.loads(closes), maxlen=size)
+        state.sums = {int(k): v for k, v in json.loads(sums).items()}
+        state.gain, state.loss, state.updates = gain, loss, updates
+        if set(state.sums) != set(state.windows):
+            state._rebuild()
+        return state
+
+
+def _date_keys(index):
+    return [d.strftime('%Y-%m-%d') for d in index]
+
+
+def from_history(df, windows):
+    """สร้างสถานะจาก DataFrame ราคาย้อนหลัง"""
+    return IndicatorState(windows, _date_keys(df.index), df['Close'].tolist())
+
+
+def _connect():
+    conn = market_data.connect_cache()
+    conn.execute("""CREATE TABLE IF NOT EXISTS indicator_state (
+        ticker TEXT NOT NULL, name TEXT NOT NULL,
+        dates TEXT NOT NULL, closes TEXT NOT NULL, sums TEXT NOT NULL,
+        gain REAL NOT NULL, loss REAL NOT NULL, updates INTEGER NOT NULL,
+        PRIMARY KEY (ticker, name))""")
+    return conn
+
+
+def load_states(tickers, name, windows):
+    """โหลดสถานะที่เคยบันทึกไว้ (name แยกชุดของแต่ละสคริปต์)"""
+    states = {}
+    conn = _connect()
+    try:
+        for i in range(0, len(tickers), 500):
+            chunk = tickers[i:i + 500]
+            rows = conn.execute(
+                f"SELECT ticker, dates, closes, sums, gain, loss, updates FROM indicator_state "
+                f"WHERE name = ? AND ticker IN ({','.join('?' * len(chunk))})", [name, *chunk])
+            for ticker, *row in rows:
+                states[ticker] = IndicatorState.from_row(windows, *row)
+    finally:
+        conn.close()
+    return states
+
+
+def save_states(states, name):
+    conn = _connect()
+    try:
+        conn.executemany("INSERT OR REPLACE INTO indicator_state VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         [state.to_row(ticker, name) for ticker, state in states.items()])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _panel_bars(panel):
+    """{ticker: (วันที่, ราคาปิด)} จาก Panel ของ market_data.get_panel (ข้ามช่องที่ไม่มีแท่ง)"""
+    keys = np.array(np.datetime_as_string(panel.dates, unit='D'), dtype=object)
+    close = panel['Close']
+    bars = {}
+    for j, ticker in enumerate(panel.tickers):
+        ok = ~np.isnan(close[:, j])
+        bars[ticker] = (keys[ok].tolist(), close[ok, j].astype(float).tolist())
+    return bars
+
+
+def update_states(recent, name, windows, full_period):
+    """โหลดสถานะ -> ต่อแท่งใหม่จาก recent (Panel ที่มี Close) -> ตัวไหนต่อไม่ได้ค่อยโหลดย้อนหลังเต็มช่วง
+
+    คืนค่า {ticker: IndicatorState} ของหุ้นที่มีข้อมูล
+    """
+    bars = _panel_bars(recent)
+    tickers = [t for t, (dates, _) in bars.items() if dates]
+    states = load_states(tickers, name, windows)
+    stale = []
+    for ticker in tickers:
+        state = states.get(ticker)
+        if state is None or not state.sync(*bars[ticker]):
+            stale.append(ticker)
+
+    if stale:
+        print(f"   📐 Rebuilding {name} indicators for {len(stale)} tickers from {full_period} history...")
+        history, _ = market_data.get_history(stale, full_period)
+        for ticker in stale:
+            df = history.get(ticker)
+            if df is None or df.empty:
+                states.pop(ticker, None)
+                continue
+            states[ticker] = from_history(df, windows)
+
+    save_states(states, name)
+    return states
+
+
+def snapshot(states, tickers, windows):
+    """ค่าล่าสุดของทุกหุ้นเป็น Array เรียงตาม tickers สำหรับคัดสัญญาณพร้อมกัน (ไม่มีสถานะ = count 0 / NaN)
+
+    คืนค่า dict: count, rsi, sma{k}, sma{k}_prev
+    """
+    got = [states.get(t) for t in tickers]
+    arrays = {
+        'count': np.array([s.count if s else 0 for s in got], dtype=np.int64),
+        'rsi': np.array([s.rsi() if s else math.nan for s in got], dtype=float),
+    }
+    for k in windows:
+        arrays[f'sma{k}'] = np.array([s.sma(k) if s else math.nan for s in got], dtype=float)
+        arrays[f'sma{k}_prev'] = np.array([s.sma_prev(k) if s else math.nan for s in got], dtype=float)
+    return arrays
@@ -4,6 +4,7 @@ import yfinance as yf
 from datetime import datetime
 import pytz
 from playwright.sync_api import sync_playwright
+import discord_dispatch
 
 # --- Settings (ดึงจาก GitHub Secrets) ---
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK")
@@ -106,4 +107,4 @@ if __name__ == "__main__":
         report += "➖ ไม่มีหุ้น IPO สหรัฐฯ เข้าใหม่วันนี้\n"
 
     if DISCORD_WEBHOOK_URL:
-        requests.post(DISCORD_WEBHOOK_URL, json={"content": report})
+        discord_dispatch.send(DISCORD_WEBHOOK_URL, {"content": report})
@@ -0,0 +1,94 @@
+"""💧 ดัชนีสภาพคล่องของหุ้น (SQLite ไฟล์เดียวกับ Bar Cache) ใช้คัดหุ้นออกก่อนโหลดราคา
+
+หุ้นส่วนใหญ่ใน SEC ไม่ผ่าน MIN_PRICE / MIN_DOLLAR_VOLUME อยู่แล้ว จึงจำราคาล่าสุด + มูลค่าซื้อขายเฉลี่ย 5 วันไว้
+- หุ้นที่ต่ำกว่าเกณฑ์มาก (ไม่ถึง LIQUIDITY_MARGIN ของเกณฑ์) ติดกัน SKIP_AFTER_CHECKS รอบที่ตรวจขึ้นไป -> ข้ามการโหลด
+  (นับจากจำนวนครั้งที่ตรวจเจอ ไม่ใช่เวลาที่ผ่านไป / หุ้นที่โหลดไม่สำเร็จไม่นับ)
+- ทุกรอบสุ่มตรวจหุ้นที่ถูกข้าม (เลือกตัวที่ตรวจล่าสุดนานที่สุดก่อน) PROBE_RATIO ของทั้งหมด
+  เพื่อให้หุ้นที่เพิ่งกลับมามีสภาพคล่องถูกจับได้ภายในไม่กี่รอบ
+- หุ้นที่ยังไม่เคยเห็นและหุ้นใน Watchlist โหลดเสมอ
+"""
+import math
+import time
+
+import market_data
+
+LIQUIDITY_MARGIN = 0.5    # "ต่ำกว่าเกณฑ์มาก" = ราคาหรือมูลค่าซื้อขายไม่ถึงครึ่งของเกณฑ์
+SKIP_AFTER_CHECKS = 3     # ต่ำกว่าเกณฑ์มากติดกันกี่รอบที่ตรวจถึงเริ่มข้าม
+PROBE_RATIO = 0.10        # สัดส่วนหุ้นที่ถูกข้ามซึ่งจะถูกตรวจซ้ำในแต่ละรอบ (วนครบทุกตัวใน ~10 รอบ)
+
+
+def _connect():
+    conn = market_data.connect_cache()
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(liquidity)")]
+    if columns and 'below_count' not in columns:
+        # ตารางรุ่นเก่า (นับเป็นเวลา below_since) แปลงเป็นจำนวนรอบไม่ได้ -> เริ่มนับใหม่ (เป็นแค่ Cache)
+        conn.execute("DROP TABLE liquidity")
+    conn.execute("""CREATE TABLE IF NOT EXISTS liquidity (
+        ticker TEXT PRIMARY KEY, price REAL, dollar_volume REAL,
+        checked_at REAL NOT NULL, below_count INTEGER NOT NULL DEFAULT 0)""")
+    return conn
+
+
+def _chunks(items, size=500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def prefilter(tickers, keep=()):
+    """คืนรายชื่อที่ควรโหลดจริง: หุ้นที่มีสภาพคล่อง/ยังไม่รู้จัก + keep (Watchlist) + ชุดสุ่มตรวจ"""
+    tickers = list(dict.fromkeys(tickers))
+    keep = set(keep)
+    skipped = {}
+    conn = _connect()
+    try:
+        for chunk in _chunks(tickers):
+            rows = conn.execute(
+                f"SELECT ticker, checked_at FROM liquidity WHERE below_count >= ? "
+                f"AND ticker IN ({','.join('?' * len(chunk))})", [SKIP_AFTER_CHECKS, *chunk])
+            skipped.update({t: checked for t, checked in rows if t not in keep})
+    finally:
+        conn.close()
+
+    # 🎲 ตรวจซ้ำแบบวน: ตัวที่ไม่ได้ตรวจนานที่สุดก่อน
+    probe_count = math.ceil(len(skipped) * PROBE_RATIO)
+    probes = set(sorted(skipped, key=skipped.get)[:probe_count])
+    selected = [t for t in tickers if t not in skipped or t in probes]
+    print(f"   💧 Liquidity index: {len(selected)} / {len(tickers)} tickers to download "
+          f"({len(skipped) - len(probes)} illiquid skipped, {len(probes)} probes)")
+    return selected
+
+
+def record(metrics, tickers, min_price, min_dollar_volume, failed=()):
+    """บันทึกราคาล่าสุด + มูลค่าซื้อขายเฉลี่ย 5 วันของหุ้นที่เพิ่งโหลด (ไม่มีข้อมูล = ต่ำกว่าเกณฑ์)
+
+    failed = หุ้นที่โหลดไม่สำเร็จ (Error / โดนจำกัดความถี่) ไม่บันทึก เพราะไม่รู้สภาพคล่องจริง
+    """
+    failed = set(failed)
+    tickers = [t for t in dict.fromkeys(tickers) if t not in failed]
+    index = metrics['index'] if metrics else {}
+    now = time.time()
+    rows = []
+    for ticker in tickers:
+        price = dollar_volume = float('nan')
+        if ticker in index:
+            i = index[ticker]
+            price = float(metrics['Price'][i])
+            dollar_volume = price * float(metrics['AvgVol'][i])
+        # NaN เทียบแล้วเป็น False เสมอ -> ไม่มีข้อมูลนับเป็นต่ำกว่าเกณฑ์
+        liquid = price >= min_price * LIQUIDITY_MARGIN and dollar_volume >= min_dollar_volume * LIQUIDITY_MARGIN
+        rows.append((ticker,
+                     None if math.isnan(price) else price,
+                     None if math.isnan(dollar_volume) else dollar_volume,
+                     now, 0 if liquid else 1))
+
+    conn = _connect()
+    try:
+        # below_count = จำนวนรอบที่ตรวจแล้วต่ำกว่าเกณฑ์ติดกัน (ผ่านเกณฑ์เมื่อไหร่กลับเป็น 0)
+        conn.executemany("""INSERT INTO liquidity VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(ticker) DO UPDATE SET price = excluded.price, dollar_volume = excluded.dollar_volume,
+            checked_at = excluded.checked_at,
+            below_count = CASE WHEN excluded.below_count = 0 THEN 0
+                               ELSE liquidity.below_count + 1 END""", rows)
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1,487 @@
+"""📈 ราคาย้อนหลังรายวันจาก Yahoo + Cache บนดิสก์ (ใช้ร่วมกันทุกสแกนเนอร์)
+
+ทุกสคริปต์อ่านผ่าน get_history() ซึ่งเก็บแท่งเทียนไว้ใน SQLite
+แล้วดาวน์โหลดเพิ่มเฉพาะแท่งหลังวันที่ล่าสุดที่มีอยู่ใน Cache
+ส่วนที่ต้องโหลดจะกระจายให้ Worker หลายตัวพร้อมกัน โดยปรับความเร็วตามที่ Yahoo ยอมให้
+"""
+import os
+import re
+import time
+import sqlite3
+import logging
+import threading
+import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+# ปิดการแจ้งเตือนขยะจาก yfinance
+logging.getLogger('yfinance').setLevel(logging.CRITICAL)
+
+# --- ⚙️ ตัวดาวน์โหลดแบบขนาน (ปรับจำนวน Worker / ขนาดก้อนตามการตอบสนองของ Yahoo) ---
+MAX_WORKERS = 16            # เพดานจำนวน Request ที่วิ่งพร้อมกัน
+START_CONCURRENCY = 4
+START_CHUNK_SIZE = 50       # จำนวนหุ้นต่องานของ Worker หนึ่งตัว
+MIN_CHUNK_SIZE = 5
+MAX_CHUNK_SIZE = 200
+CHUNK_SECONDS = 5.0         # ปรับขนาดก้อนให้แต่ละงานใช้เวลาประมาณนี้
+SLOW_LATENCY = 3.0          # วินาทีต่อ Request ช้ากว่านี้ = Yahoo เริ่มตึง ลด Worker ลง
+DOWNLOAD_RETRIES = 2        # Error ทั่วไป ลองใหม่กี่ครั้งก่อนยอมแพ้
+THROTTLE_RETRIES = 6        # โดนจำกัดความถี่ ลองใหม่กี่ครั้งก่อนยอมแพ้
+BACKOFF_BASE = 2.0          # วินาที (คูณ 2 ทุกครั้งที่โดนจำกัดติดกัน)
+MAX_BACKOFF = 60.0
+SUSPECT_EMPTY_RATIO = 0.5   # ก้อนที่ว่างเกินครึ่งพร้อมกัน = น่าจะโดนบล็อกเงียบๆ ไม่ใช่หุ้นหายจริง
+
+CACHE_PATH = os.getenv("BAR_CACHE_PATH", os.path.join(".cache", "bars.sqlite"))
+CACHE_KEEP_DAYS = 800       # ลบแท่งที่เก่ากว่านี้ทิ้ง กันไฟล์โตไม่จำกัด
+REVISION_TOLERANCE = 1e-4   # ราคาปิดย้อนหลังเปลี่ยนเกินนี้ = Yahoo ปรับราคา (ปันผล/แตกพาร์) -> โหลดใหม่ทั้งช่วง
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class DownloadController:
+    """คุมจังหวะการยิง Yahoo ร่วมกันทั้งโปรแกรม (AIMD)
+
+    ตอบไวและไม่มี Error -> เพิ่ม Worker ทีละ 1 / โดนจำกัดความถี่ -> ลด Worker และขนาดก้อนลงครึ่งหนึ่ง
+    แล้วหยุดทุก Worker รอ (Backoff) ก่อนยิงต่อ ขนาดก้อนปรับตาม Latency ให้แต่ละงานใช้เวลาพอๆ กัน
+    """
+
+    def __init__(self):
+        self.concurrency = START_CONCURRENCY
+        self.chunk_size = START_CHUNK_SIZE
+        self.latency = None
+        self.strikes = 0
+        self.resume_at = 0.0
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """รอจนกว่าจะมีช่องว่าง และพ้นช่วง Backoff แล้ว"""
+        with self._cond:
+            while True:
+                delay = self.resume_at - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                elif self.in_flight >= self.concurrency:
+                    self._cond.wait()
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def throttled(self):
+        with self._cond:
+            if time.monotonic() < self.resume_at:
+                return  # Worker อื่นเพิ่งรายงานไปแล้ว กำลังพักอยู่ ไม่ต้องลดซ้ำ
+            self.concurrency = max(1, self.concurrency // 2)
+            self.chunk_size = max(MIN_CHUNK_SIZE, self.chunk_size // 2)
+            backoff = min(MAX_BACKOFF, BACKOFF_BASE * (2 ** self.strikes))
+            self.strikes += 1
+            self.resume_at = max(self.resume_at, time.monotonic() + backoff)
+            print(f"   ⏳ Yahoo throttling -> workers {self.concurrency}, chunk {self.chunk_size}, pause {backoff:.1f}s")
+
+    def record(self, latencies):
+        """ปรับ Worker / ขนาดก้อน จาก Latency ของงานที่เพิ่งเสร็จ (ไม่มี Throttle)"""
+        if not latencies:
+            return
+        avg = sum(latencies) / len(latencies)
+        with self._cond:
+            self.strikes = 0
+            self.latency = avg if self.latency is None else 0.7 * self.latency + 0.3 * avg
+            if self.latency > SLOW_LATENCY:
+                self.concurrency = max(1, self.concurrency - 1)
+            elif self.concurrency < MAX_WORKERS:
+                self.concurrency += 1
+            target = int(CHUNK_SECONDS / max(self.latency, 1e-3))
+            self.chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, target))
+            self._cond.notify_all()
+
+
+CONTROLLER = DownloadController()
+
+
+def _is_throttle(error):
+    text = f"{type(error).__name__} {error}".lower()
+    return any(word in text for word in ("ratelimit", "rate limit", "too many requests", "429"))
+
+
+def _fetch_one(ticker, **kwargs):
+    """ราคาย้อนหลังของหุ้นหนึ่งตัว (Ticker แยก instance จึงเรียกหลาย Thread พร้อมกันได้ ต่างจาก yf.download)"""
+    df = yf.Ticker(ticker).history(auto_adjust=True, **kwargs)
+    if df is None or df.empty or 'Close' not in df.columns:
+        return pd.DataFrame()
+    df = df[[f for f in FIELDS if f in df.columns]].dropna(subset=['Close'])
+    if getattr(df.index, 'tz', None) is not None:
+        df.index = df.index.tz_localize(None)
+    return df
+
+
+def _download_chunk(chunk, controller, **kwargs):
+    """งานของ Worker หนึ่งตัว: โหลดหุ้นในก้อนทีละตัว (ผ่านช่องของ Controller)
+
+    คืนค่า (frames, throttled, errors, latencies)
+    throttled = หุ้นที่ยังไม่ได้โหลดเพราะโดนจำกัดความถี่ (ต้องเข้าคิวใหม่), errors = {ticker: Exception}
+    """
+    frames, errors, latencies = {}, {}, []
+    for idx, ticker in enumerate(chunk):
+        controller.acquire()
+        started = time.monotonic()
+        try:
+            frames[ticker] = _fetch_one(ticker, **kwargs)
+            latencies.append(time.monotonic() - started)
+        except Exception as e:
+            if _is_throttle(e):
+                controller.throttled()
+                return frames, list(chunk[idx:]), errors, latencies
+            errors[ticker] = e
+        finally:
+            controller.release()
+    return frames, [], errors, latencies
+
+
+def download_history(tickers, controller=None, **kwargs):
+    """ดึงราคาย้อนหลังของหุ้นทั้งชุดแบบขนาน (kwargs ส่งต่อให้ Ticker.history เช่น period="6mo" / start=)
+
+    แบ่งเป็นก้อนตามขนาดที่ Controller กำหนด แล้วให้ Worker หลายตัวโหลดพร้อมกัน
+    คืนค่า (history, failed): history = {ticker: DataFrame OHLCV}, failed = หุ้นที่โหลดไม่สำเร็จ
+    (หุ้นที่ Yahoo ตอบว่าง = ไม่มีข้อมูล ได้ DataFrame ว่าง ไม่นับเป็น failed)
+    """
+    controller = controller or CONTROLLER
+    tickers = list(dict.fromkeys(tickers))
+    pending = deque(tickers)
+    attempts, throttles, suspects = {}, {}, set()
+    history, failed = {}, []
+    running = set()
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while pending or running:
+            while pending and len(running) < controller.concurrency:
+                size = min(controller.chunk_size, len(pending))
+                chunk = [pending.popleft() for _ in range(size)]
+                running.add(pool.submit(_download_chunk, chunk, controller, **kwargs))
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                frames, throttled, errors, latencies = future.result()
+                for ticker in throttled:
+                    throttles[ticker] = throttles.get(ticker, 0) + 1
+                    if throttles[ticker] > THROTTLE_RETRIES:
+                        failed.append(ticker)
+                    else:
+                        pending.append(ticker)
+                for ticker, error in errors.items():
+                    attempts[ticker] = attempts.get(ticker, 0) + 1
+                    if attempts[ticker] > DOWNLOAD_RETRIES:
+                        print(f"   ⚠️ Download failed for {ticker}: {error}")
+                        failed.append(ticker)
+                    else:
+                        pending.append(ticker)
+
+                # 🕵️ ว่างพร้อมกันเกินครึ่งก้อน = โดนบล็อกแบบไม่แจ้ง Error -> พักแล้วลองใหม่อีกรอบเดียว
+                empty = [t for t, df in frames.items() if df.empty and t not in suspects]
+                if len(frames) >= 2 * MIN_CHUNK_SIZE and len(empty) > SUSPECT_EMPTY_RATIO * len(frames):
+                    controller.throttled()
+                    suspects.update(empty)
+                    pending.extend(empty)
+                    frames = {t: df for t, df in frames.items() if t not in empty}
+                elif not throttled:
+                    controller.record(latencies)
+                history.update(frames)
+
+            print(f"   ...downloaded {len(history)}/{len(tickers)} "
+                  f"(workers {controller.concurrency}, chunk {controller.chunk_size})")
+    return history, failed
+
+
+# ---------------------------------------------------------
+# 💾 Local Bar Cache (SQLite)
+# ---------------------------------------------------------
+def connect_cache():
+    """เปิด Connection ไปยังไฟล์ Cache (สร้างตารางให้ถ้ายังไม่มี)"""
+    folder = os.path.dirname(CACHE_PATH)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(CACHE_PATH, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""CREATE TABLE IF NOT EXISTS bars (
+        ticker TEXT NOT NULL, date TEXT NOT NULL,
+        open REAL, high REAL, low REAL, close REAL, volume REAL,
+        PRIMARY KEY (ticker, date)) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS bars_date ON bars (date)")
+    # coverage = วันเริ่มต้นที่เคยโหลดครบแล้วของแต่ละหุ้น (ใช้ตัดสินว่าต้องโหลดเต็มช่วงหรือไม่)
+    conn.execute("CREATE TABLE IF NOT EXISTS coverage (ticker TEXT PRIMARY KEY, start TEXT NOT NULL)")
+    return conn
+
+
+def _chunks(items, size=500):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def period_start(period, today=None):
+    """แปลง period แบบ yfinance ("6mo", "1y", "20d") เป็นวันเริ่มต้น (date)
+
+    หน่วย d ของ Yahoo นับเป็นวันทำการ จึงเผื่อวันปฏิทินไว้ แล้วค่อยตัดเหลือ n แท่งตอนอ่าน
+    """
+    today = today or datetime.date.today()
+    match = re.fullmatch(r"(\d+)(d|wk|mo|y)", period)
+    if not match:
+        raise ValueError(f"Unsupported period: {period}")
+    n, unit = int(match.group(1)), match.group(2)
+    if unit == 'd':
+        return today - datetime.timedelta(days=int(n * 1.5) + 7)
+    if unit == 'wk':
+        return today - datetime.timedelta(weeks=n)
+    if unit == 'mo':
+        return (pd.Timestamp(today) - pd.DateOffset(months=n)).date()
+    return (pd.Timestamp(today) - pd.DateOffset(years=n)).date()
+
+
+def _frame_rows(ticker, df):
+    dates = pd.to_datetime(df.index).strftime('%Y-%m-%d')
+    cols = [df[f] if f in df.columns else pd.Series(float('nan'), index=df.index) for f in FIELDS]
+    for date, o, h, l, c, v in zip(dates, *cols):
+        yield (ticker, date, float(o), float(h), float(l), float(c), float(v))
+
+
+def _store(conn, frames, replace=()):
+    """เขียนแท่งใหม่ลง Cache (ทับแท่งวันเดียวกัน เช่น แท่งของวันนี้ที่ยังไม่ปิด)"""
+    for chunk in _chunks(list(replace)):
+        conn.execute(f"DELETE FROM bars WHERE ticker IN ({','.join('?' * len(chunk))})", chunk)
+    for ticker, df in frames.items():
+        if df.empty:
+            continue
+        conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", _frame_rows(ticker, df))
+
+
+def _load(conn, tickers, start):
+    frames = {}
+    for chunk in _chunks(tickers):
+        marks = ','.join('?' * len(chunk))
+        df = pd.read_sql_query(
+            f"SELECT ticker, date, open, high, low, close, volume FROM bars "
+            f"WHERE ticker IN ({marks}) AND date >= ? ORDER BY ticker, date",
+            conn, params=[*chunk, start.isoformat()])
+        df.columns = ['ticker', 'date'] + FIELDS
+        df['date'] = pd.to_datetime(df['date'])
+        for ticker, group in df.groupby('ticker', sort=False):
+            frames[ticker] = group.set_index('date')[FIELDS].rename_axis('Date')
+    return frames
+
+
+def _sync(conn, tickers, start):
+    """ทำให้ Cache มีแท่งของ tickers ตั้งแต่ start จนถึงล่าสุด (โหลดจาก Yahoo เฉพาะส่วนที่ขาด) คืนค่า failed"""
+    # 1. ดูว่าแต่ละหุ้นมีอะไรใน Cache แล้วบ้าง
+    known = {}
+    tails = {}
+    for chunk in _chunks(tickers):
+        marks = ','.join('?' * len(chunk))
+        known.update({row[0]: row[1] for row in conn.execute(
+            f"SELECT ticker, start FROM coverage WHERE ticker IN ({marks})", chunk)})
+        # สองแท่งล่าสุดของแต่ละหุ้น (แท่งก่อนสุดท้ายใช้เป็นจุดเริ่มโหลดต่อ + ตรวจการปรับราคา)
+        for ticker, date, close in conn.execute(
+                f"SELECT ticker, date, close FROM bars b WHERE ticker IN ({marks}) AND date >= "
+                f"(SELECT date FROM bars WHERE ticker = b.ticker ORDER BY date DESC LIMIT 1 OFFSET 1) "
+                f"ORDER BY ticker, date", chunk):
+            tails.setdefault(ticker, []).append((date, close))
+
+    # 2. แบ่งกลุ่ม: โหลดเต็มช่วง (ยังไม่เคยมี) / โหลดต่อจากแท่งก่อนสุดท้าย (เทียบหาการปรับราคา)
+    full, incremental = [], {}
+    for ticker in tickers:
+        tail = tails.get(ticker)
+        if ticker not in known or known[ticker] > start.isoformat() or not tail or len(tail) < 2:
+            full.append(ticker)
+        else:
+            incremental.setdefault(tail[0][0], []).append(ticker)
+
+    failed = []
+    empty = []
+    refetch = []
+    for overlap_date, group in incremental.items():
+        print(f"   🔄 Updating {len(group)} cached tickers since {overlap_date}...")
+        frames, group_failed = download_history(group, start=overlap_date)
+        failed.extend(group_failed)
+        fresh = {}
+        for ticker, df in frames.items():
+            if df.empty:
+                empty.append(ticker)
+                continue
+            # 🔍 ราคาปิดของแท่งที่ซ้อนกันต้องเท่าเดิม ไม่งั้น Yahoo ปรับราคาย้อนหลังแล้ว
+            old_close = tails[ticker][0][1]
+            dates = pd.to_datetime(df.index).strftime('%Y-%m-%d')
+            if overlap_date in dates:
+                new_close = float(df['Close'].iloc[list(dates).index(overlap_date)])
+                if old_close and abs(new_close / old_close - 1) > REVISION_TOLERANCE:
+                    refetch.append(ticker)
+                    continue
+            fresh[ticker] = df
+        _store(conn, fresh)
+        # ปิดธุรกรรมทันทีหลังเขียน ไม่ถือ Write Lock ค้างไว้ระหว่างโหลดก้อนถัดไป (ไฟล์นี้ใช้ร่วมกันหลายโมดูล/หลาย Thread)
+        conn.commit()
+
+    if refetch:
+        print(f"   ♻️ {len(refetch)} tickers were re-adjusted by Yahoo -> full reload")
+        full.extend(refetch)
+
+    if full:
+        full_start = min([start] + [datetime.date.fromisoformat(known[t]) for t in full if t in known])
+        print(f"   📥 Downloading full history for {len(full)} tickers since {full_start}...")
+        frames, full_failed = download_history(full, start=full_start.isoformat())
+        failed.extend(full_failed)
+        _store(conn, frames, replace=[t for t in frames])
+        empty.extend(t for t, df in frames.items() if df.empty)
+        conn.executemany(
+            "INSERT INTO coverage VALUES (?, ?) ON CONFLICT(ticker) DO UPDATE SET start = excluded.start",
+            [(t, full_start.isoformat()) for t, df in frames.items() if not df.empty])
+        conn.commit()
+
+    # หุ้นที่ Yahoo ตอบว่าง = ไม่มีข้อมูลแล้ว ล้าง Cache ทิ้งเพื่อให้ผลเหมือนดึงสด
+    if empty:
+        _store(conn, {}, replace=empty)
+        for chunk in _chunks(empty):
+            conn.execute(f"DELETE FROM coverage WHERE ticker IN ({','.join('?' * len(chunk))})", chunk)
+
+    cutoff = datetime.date.today() - datetime.timedelta(days=CACHE_KEEP_DAYS)
+    conn.execute("DELETE FROM bars WHERE date < ?", (cutoff.isoformat(),))
+    conn.commit()
+    return failed
+
+
+def get_history(tickers, period):
+    """ดึงราคารายวันย้อนหลังตาม period ผ่าน Cache (โหลดจาก Yahoo เฉพาะแท่งที่ยังไม่มี)
+
+    คืนค่าเหมือน download_history: (history, failed)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    start = period_start(period)
+    conn = connect_cache()
+    try:
+        failed = _sync(conn, tickers, start)
+
+        # 3. อ่านกลับจาก Cache เฉพาะช่วงที่ขอ
+        failed_set = set(failed)
+        history = _load(conn, [t for t in tickers if t not in failed_set], start)
+    finally:
+        conn.close()
+
+    if re.fullmatch(r"\d+d", period):
+        # หน่วยวันของ Yahoo = n แท่งล่าสุดของทั้งชุด
+        n = int(period[:-1])
+        all_dates = sorted(set().union(*[df.index for df in history.values()])) if history else []
+        if len(all_dates) > n:
+            first = all_dates[-n]
+            history = {t: df[df.index >= first] for t, df in history.items()}
+
+    for ticker in tickers:
+        if ticker not in failed_set:
+            history.setdefault(ticker, pd.DataFrame(columns=FIELDS))
+    return history, failed
+
+
+class Panel:
+    """ตารางราคาแบบกะทัดรัด วันที่ x หุ้น เก็บเฉพาะฟิลด์ที่ขอเป็น float32 (ไม่มี DataFrame รายหุ้น)
+
+    panel['Close'] -> Array (วัน x หุ้น), panel.tickers = ชื่อคอลัมน์, panel.dates = วันที่ของแต่ละแถว
+    """
+
+    def __init__(self, dates, tickers, data):
+        self.dates = dates
+        self.tickers = tickers
+        self.data = data
+
+    def __getitem__(self, field):
+        return self.data[field]
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def empty(self):
+        return len(self.dates) == 0 or len(self.tickers) == 0
+
+
+def _load_panel(conn, tickers, start, fields, last_n=None):
+    """อ่านจาก Cache ตรงเข้า Array ทีละก้อน (ไม่สร้าง DataFrame รายหุ้น) last_n = เก็บเฉพาะ n วันล่าสุดของทั้งชุด"""
+    columns = ', '.join(f.lower() for f in fields)
+    position = {t: i for i, t in enumerate(tickers)}
+    cols, dates, values = [], [], {f: [] for f in fields}
+    for chunk in _chunks(tickers):
+        rows = conn.execute(
+            f"SELECT ticker, date, {columns} FROM bars WHERE ticker IN ({','.join('?' * len(chunk))}) AND date >= ?",
+            [*chunk, start.isoformat()]).fetchall()
+        if not rows:
+            continue
+        row_tickers, row_dates, *row_values = zip(*rows)
+        cols.append(np.fromiter((position[t] for t in row_tickers), dtype=np.int32, count=len(rows)))
+        dates.append(np.array(row_dates, dtype='datetime64[D]'))
+        for field, v in zip(fields, row_values):
+            values[field].append(np.array(v, dtype=np.float32))
+
+    if not cols:
+        return Panel(np.array([], dtype='datetime64[D]'), [], {f: np.zeros((0, 0), dtype=np.float32) for f in fields})
+    cols, dates = np.concatenate(cols), np.concatenate(dates)
+    all_dates, rows = np.unique(dates, return_inverse=True)
+    keep = slice(None)
+    if last_n is not None and len(all_dates) > last_n:
+        # หน่วยวันของ Yahoo = n แท่งล่าสุดของทั้งชุด
+        keep = rows >= len(all_dates) - last_n
+        all_dates, rows, cols = all_dates[-last_n:], rows[keep] - (len(all_dates) - last_n), cols[keep]
+
+    # เหลือเฉพาะหุ้นที่มีข้อมูลในช่วงนี้ (เหมือน to_panel ที่ข้ามหุ้นที่ว่าง)
+    present = np.unique(cols)
+    remap = np.full(len(tickers), -1, dtype=np.int32)
+    remap[present] = np.arange(len(present), dtype=np.int32)
+    data = {}
+    for field in fields:
+        table = np.full((len(all_dates), len(present)), np.nan, dtype=np.float32)
+        table[rows, remap[cols]] = np.concatenate(values[field])[keep]
+        data[field] = table
+        values[field] = None
+    return Panel(all_dates, [tickers[i] for i in present], data)
+
+
+def get_panel(tickers, period, fields=('Close', 'Volume')):
+    """เหมือน get_history แต่คืนค่าเป็น Panel (float32 เฉพาะ fields) สำหรับสแกนเนอร์ทั้งตลาด
+
+    คืนค่า (panel, failed)
+    """
+    tickers = list(dict.fromkeys(tickers))
+    start = period_start(period)
+    last_n = int(period[:-1]) if re.fullmatch(r"\d+d", period) else None
+    conn = connect_cache()
+    try:
+        failed = _sync(conn, tickers, start)
+        failed_set = set(failed)
+        panel = _load_panel(conn, [t for t in tickers if t not in failed_set], start, list(fields), last_n)
+    finally:
+        conn.close()
+    return panel, failed
+
+
+def forget(tickers):
+    """ล้างแท่งราคาใน Cache ของหุ้นที่ระบุ (เช่น หุ้นที่หลุดออกจาก Universe)"""
+    tickers = list(tickers)
+    if not tickers:
+        return
+    conn = connect_cache()
+    try:
+        _store(conn, {}, replace=tickers)
+        for chunk in _chunks(tickers):
+            conn.execute(f"DELETE FROM coverage WHERE ticker IN ({','.join('?' * len(chunk))})", chunk)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def to_panel(history, field):
+    """รวม history รายหุ้นเป็นตาราง วันที่ x หุ้น ของฟิลด์เดียว (เหมือน data['Close'] ของ yf.download)"""
+    series = {t: df[field] for t, df in history.items() if not df.empty}
+    if not series:
+        return pd.DataFrame()
+    return pd.DataFrame(series).sort_index()
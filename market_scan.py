@@ -0,0 +1,130 @@
+"""📊 คำนวณตัวเลขของรายงาน Top Gainer / Top Mover / Custom List ทั้งตลาดในครั้งเดียวด้วย NumPy
+
+แทนการดึงราคาทีละช่องด้วย close_data.loc[วัน, หุ้น] (~40 ครั้งต่อหุ้น)
+compute_metrics() คำนวณตารางตัวเลขกลางครั้งเดียวจาก Panel (market_data.get_panel) แล้วแต่ละรายงานใช้ select_rows() คัดหุ้นตามเกณฑ์ของตัวเอง
+(การจัดรูปแบบข้อความยังอยู่ในแต่ละสคริปต์)
+"""
+import warnings
+
+import numpy as np
+
+LOOKBACK = 12     # วันนี้ + 11 วันก่อนหน้า (สรุป 10 วัน + % รายวันย้อนหลัง 10 วัน)
+VOLUME_DAYS = 5   # ค่าเฉลี่ย Volume 5 วันล่าสุด
+STALE_SESSIONS = 1  # แท่งล่าสุดของหุ้นช้ากว่าวันล่าสุดของ Panel ได้ไม่เกินกี่แท่ง (เผื่อวันที่แปลกของหุ้นบางตัว)
+
+
+def compute_metrics(panel):
+    """คำนวณทุกหุ้นใน Panel (market_data.get_panel: Close + Volume) พร้อมกัน คืนค่า None ถ้ามีไม่ถึง LOOKBACK วัน
+
+    คืนค่า dict ของ Array เรียงตามคอลัมน์: Price, Prev, AvgVol, SortVal, Up, Down, HasHistory
+    และ Closes (หุ้น x 12 วัน, วันนี้อยู่ท้ายสุด) + index = {ticker: แถว}
+    """
+    if panel.empty or len(panel) < LOOKBACK:
+        return None
+    cols = panel.tickers
+    # นับวันของแต่ละหุ้นจากแท่งของตัวเอง (ไม่ใช่ตำแหน่งในวันที่รวมของทั้ง Panel):
+    # เลื่อนแท่งที่มีราคาปิดของแต่ละหุ้นลงไปชิดแถวล่าง วันที่ที่มีแค่บางหุ้น (เช่น หุ้นต่างประเทศ / วันหยุดครึ่งวัน)
+    # จึงไม่ทำให้หุ้นตัวอื่นทั้งตลาดกลายเป็นประวัติไม่ครบ
+    order = np.argsort(~np.isnan(panel['Close']), axis=0, kind='stable')
+    # Panel เก็บเป็น float32 ส่วนการคำนวณใช้ float64 เฉพาะหน้าต่างที่ใช้ (12 / 5 วันล่าสุด)
+    closes = np.take_along_axis(panel['Close'], order[-LOOKBACK:], axis=0).T.astype(float)
+    volumes = np.take_along_axis(panel['Volume'], order[-VOLUME_DAYS:], axis=0).T.astype(float)
+
+    # แต่หุ้นที่แท่งล่าสุดของตัวเองเก่ากว่าวันล่าสุดของ Panel เกิน STALE_SESSIONS (หยุดซื้อขาย / ถูกถอน)
+    # ไม่นับเป็นราคาวันนี้ (เหมือนเดิมที่ราคาวันนี้เป็น NaN) -> ไม่ติดอันดับด้วยการขยับของวันเก่า
+    has_close = ~np.isnan(panel['Close'])
+    behind = np.argmax(has_close[::-1], axis=0)
+    closes[behind > STALE_SESSIONS, -1] = np.nan
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # หุ้นที่ไม่มี Volume เลย -> NaN
+        avg_vol = np.nanmean(volumes, axis=1)
+
+    curr, prev = closes[:, -1], closes[:, -2]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 🎯 นับวันขึ้น/ลงของ 10 วันล่าสุด (NaN ไม่นับทั้งสองฝั่ง)
+        up = (closes[:, 2:] > closes[:, 1:-1]).sum(axis=1)
+        down = (closes[:, 2:] < closes[:, 1:-1]).sum(axis=1)
+        sort_val = (curr - prev) / prev * 100
+
+    return {
+        'index': {t: i for i, t in enumerate(cols)},
+        'Price': curr,
+        'Prev': prev,
+        'AvgVol': avg_vol,
+        'SortVal': sort_val,
+        'Up': up,
+        'Down': down,
+        # หุ้นต้องมีราคาปิดของตัวเองครบ LOOKBACK แท่ง ไม่งั้นสร้างประวัติรายวันไม่ได้
+        'HasHistory': ~np.isnan(closes).any(axis=1),
+        'Closes': closes,
+    }
+
+
+def select_rows(metrics, tickers, watchlist=(), min_price=0.0, min_dollar_volume=0.0, require_volume=True):
+    """คัดหุ้นใน tickers ตามเกณฑ์ของรายงาน (เรียงตามลำดับใน tickers เดิม)
+
+    กติกาเหมือนลูปเดิม: ต้องมีราคาวันนี้/เมื่อวาน (+ Volume เฉลี่ยถ้า require_volume) และประวัติครบ,
+    หุ้นนอก watchlist ต้องผ่านราคาขั้นต่ำและมูลค่าซื้อขายขั้นต่ำ
+    คืนค่า dict: Ticker, Price, Prev, SortVal, Up, Down, IsWatchlist, Closes
+    """
+    index = metrics['index'] if metrics else {}
+    picked = [t for t in dict.fromkeys(tickers) if t in index]
+    rows = np.array([index[t] for t in picked], dtype=np.int64)
+    if metrics is None or not len(rows):
+        empty = np.zeros(0)
+        return {'Ticker': [], 'Price': empty, 'Prev': empty, 'SortVal': empty,
+                'Up': np.zeros(0, dtype=np.int64), 'Down': np.zeros(0, dtype=np.int64),
+                'IsWatchlist': np.zeros(0, dtype=bool), 'Closes': np.zeros((0, LOOKBACK))}
+
+    curr, avg_vol = metrics['Price'][rows], metrics['AvgVol'][rows]
+    is_watchlist = np.isin(np.array(picked, dtype=object), list(watchlist))
+    with np.errstate(invalid='ignore'):
+        ok = metrics['HasHistory'][rows].copy()
+        if require_volume:
+            ok &= ~np.isnan(avg_vol)
+        ok &= is_watchlist | ((curr >= min_price) & (curr * avg_vol >= min_dollar_volume))
+
+    rows = rows[ok]
+    return {
+        'Ticker': [t for t, keep in zip(picked, ok) if keep],
+        'Price': metrics['Price'][rows],
+        'Prev': metrics['Prev'][rows],
+        'SortVal': metrics['SortVal'][rows],
+        'Up': metrics['Up'][rows],
+        'Down': metrics['Down'][rows],
+        'IsWatchlist': is_watchlist[ok],
+        'Closes': metrics['Closes'][rows],
+    }
+
+
+def top_n(values, n):
+    """ตำแหน่งของค่ามากสุด n ตัว เรียงมาก -> น้อย (NaN ไว้ท้ายสุด, ค่าเท่ากันเรียงตามตำแหน่งเดิม)
+
+    ใช้ argpartition คัดก่อนแล้วเรียงเฉพาะ n ตัว แทนการเรียงทั้งตลาดด้วย sort_values().head(n)
+    """
+    key = np.asarray(values, dtype=float)
+    key = np.where(np.isnan(key), -np.inf, key)
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64)
+    picked = np.argpartition(-key, n - 1)[:n] if n < len(key) else np.arange(len(key))
+    if n < len(key):
+        # รวมตัวที่ค่าเท่ากับตัวสุดท้ายด้วย เพื่อให้ค่าเท่ากันตัดสินด้วยตำแหน่งเดิมเสมอ
+        picked = np.union1d(picked, np.flatnonzero(key == key[picked].min()))
+    return picked[np.lexsort((picked, -key[picked]))][:n]
+
+
+def format_pct(current, previous, decimals=1, percent=True):
+    """% เปลี่ยนแปลงพร้อม 🟢 ขึ้น / 🔴 ลง ของทั้ง Array ในครั้งเดียว (ข้อมูลไม่ครบหรือฐานเป็น 0 = ⚪0.0)
+
+    ใช้แทน format_pct ทีละค่าของแต่ละสคริปต์ ผลลัพธ์ตัวอักษรเหมือนเดิมทุกตัว
+    decimals = จำนวนทศนิยม, percent = ต่อท้ายด้วย % หรือไม่
+    """
+    current = np.asarray(current, dtype=float)
+    previous = np.asarray(previous, dtype=float)
+    invalid = np.isnan(current) | np.isnan(previous) | (previous == 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        diff = np.where(invalid, 0.0, (current - previous) / np.where(invalid, 1.0, previous) * 100)
+    emoji = np.where(invalid, '⚪', np.where(diff >= 0, '🟢', '🔴'))
+    text = np.char.add(emoji, np.char.mod(f'%.{decimals}f', np.abs(diff)))
+    return np.char.add(text, '%') if percent else text
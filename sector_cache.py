@@ -0,0 +1,144 @@
+"""🏷️ Sector ของหุ้นแบบเก็บไว้ใน Local Cache (SQLite ไฟล์เดียวกับ Bar Cache)
+
+ลำดับการหา: Cache ที่ยังไม่หมดอายุ -> รายชื่อ S&P 1500 จาก Wikipedia (โหลดใหม่สัปดาห์ละครั้ง)
+-> ถาม Yahoo ทีละตัวแบบขนาน (จำกัดจำนวน Worker) หาไม่เจอจะจำว่า "Unknown" ไว้สั้นๆ กันถามซ้ำทุกรอบ
+"""
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+import market_data
+
+UNKNOWN = 'Unknown'
+SECTOR_TTL_DAYS = 30      # Sector ที่รู้แล้ว แทบไม่เปลี่ยน
+UNKNOWN_TTL_DAYS = 3      # หาไม่เจอ -> ลองใหม่หลังจากนี้ (Negative Cache)
+INDEX_TTL_DAYS = 7        # รายชื่อ S&P 1500 จาก Wikipedia
+SECTOR_WORKERS = 8        # จำนวนหุ้นที่ถาม Yahoo พร้อมกัน
+REQUEST_TIMEOUT = 5
+
+INDEX_URLS = [
+    'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies',
+    'https://en.wikipedia.org/wiki/List_of_S%26P_400_companies',
+    'https://en.wikipedia.org/wiki/List_of_S%26P_600_companies'
+]
+QUOTE_SUMMARY_URL = "https://query2.finance.yahoo.com/v10/finance/quoteSummary/{ticker}?modules=assetProfile"
+HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
+DAY = 86400
+
+
+def _connect():
+    conn = market_data.connect_cache()
+    conn.execute("""CREATE TABLE IF NOT EXISTS sectors (
+        ticker TEXT PRIMARY KEY, sector TEXT NOT NULL, source TEXT NOT NULL, fetched_at REAL NOT NULL)""")
+    conn.execute("CREATE TABLE IF NOT EXISTS sector_meta (name TEXT PRIMARY KEY, fetched_at REAL NOT NULL)")
+    return conn
+
+
+def _is_fresh(sector, fetched_at, now):
+    ttl = UNKNOWN_TTL_DAYS if sector == UNKNOWN else SECTOR_TTL_DAYS
+    return now - fetched_at < ttl * DAY
+
+
+def get_market_sectors():
+    """ดึงข้อมูล Sector พื้นฐานจาก S&P 500, 400, 600 (ครอบคลุมหุ้นหลัก 1500 ตัว)"""
+    sector_map = {}
+    for url in INDEX_URLS:
+        try:
+            html = requests.get(url, headers=HEADERS, timeout=10).text
+            df = pd.read_html(io.StringIO(html))[0]
+
+            ticker_col = next((col for col in ['Symbol', 'Ticker Symbol', 'Ticker'] if col in df.columns), None)
+            sector_col = next((col for col in ['GICS Sector', 'Sector'] if col in df.columns), None)
+
+            if ticker_col and sector_col:
+                mapping = dict(zip(df[ticker_col].astype(str).str.replace('.', '-', regex=False), df[sector_col]))
+                sector_map.update(mapping)
+        except Exception as e:
+            print(f"Error fetching sectors from {url}: {e}")
+    return sector_map
+
+
+def fetch_sector(ticker, session=None):
+    """ถาม Yahoo หนึ่งตัว: quoteSummary ก่อน ไม่ได้ค่อยใช้ yf.Ticker().info (ไม่เจอ = Unknown)"""
+    session = session or requests
+    try:
+        res = session.get(QUOTE_SUMMARY_URL.format(ticker=ticker), headers=HEADERS, timeout=REQUEST_TIMEOUT)
+        if res.status_code == 200:
+            profile = (res.json().get('quoteSummary', {}).get('result') or [{}])[0].get('assetProfile', {})
+            sector = profile.get('sector') or profile.get('industry')
+            if sector:
+                return sector
+    except Exception:
+        pass
+    try:
+        info = yf.Ticker(ticker).info
+        return info.get('sector') or info.get('industry') or UNKNOWN
+    except Exception:
+        return UNKNOWN
+
+
+def lookup_sectors(tickers):
+    """คืนค่า {ticker: sector} ของทุกตัวใน tickers (หาไม่ได้ = 'Unknown')"""
+    tickers = list(dict.fromkeys(tickers))
+    now = time.time()
+    found = {}
+    conn = _connect()
+    try:
+        # 1. Cache ที่ยังไม่หมดอายุ
+        for i in range(0, len(tickers), 500):
+            chunk = tickers[i:i + 500]
+            rows = conn.execute(
+                f"SELECT ticker, sector, fetched_at FROM sectors WHERE ticker IN ({','.join('?' * len(chunk))})", chunk)
+            found.update({t: s for t, s, at in rows if _is_fresh(s, at, now)})
+        misses = [t for t in tickers if t not in found]
+        print(f"   🏷️ Sector cache: {len(tickers) - len(misses)} hit, {len(misses)} miss")
+
+        # 2. รายชื่อ S&P 1500 (โหลดใหม่เมื่อหมดอายุ และมีตัวที่ยังหาไม่เจอเท่านั้น)
+        if misses:
+            row = conn.execute("SELECT fetched_at FROM sector_meta WHERE name = 'sp1500'").fetchone()
+            if row is None or now - row[0] >= INDEX_TTL_DAYS * DAY:
+                index_map = get_market_sectors()
+                if index_map:
+                    conn.executemany("INSERT OR REPLACE INTO sectors VALUES (?, ?, 'sp1500', ?)",
+                                     [(t, s, now) for t, s in index_map.items()])
+                    conn.execute("INSERT OR REPLACE INTO sector_meta VALUES ('sp1500', ?)", (now,))
+                    conn.commit()
+                    found.update({t: index_map[t] for t in misses if t in index_map})
+                    misses = [t for t in misses if t not in found]
+
+        # 3. ที่เหลือถาม Yahoo พร้อมกันหลายตัว (จำกัด Worker) แทนการวนทีละตัว + sleep
+        if misses:
+            print(f"   🔎 Resolving {len(misses)} sectors from Yahoo ({SECTOR_WORKERS} workers)...")
+            session = requests.Session()
+            with ThreadPoolExecutor(max_workers=SECTOR_WORKERS) as pool:
+                resolved = dict(zip(misses, pool.map(lambda t: fetch_sector(t, session), misses)))
+            conn.executemany("INSERT OR REPLACE INTO sectors VALUES (?, ?, 'yahoo', ?)",
+                             [(t, s, time.time()) for t, s in resolved.items()])
+            conn.commit()
+            found.update(resolved)
+    finally:
+        conn.close()
+    return {t: found.get(t, UNKNOWN) for t in tickers}
+
+
+def forget(tickers, unknown_only=False):
+    """ล้าง Sector ใน Cache ของหุ้นที่ระบุ (unknown_only = ล้างเฉพาะตัวที่จำไว้ว่า Unknown)"""
+    tickers = list(tickers)
+    if not tickers:
+        return
+    conn = _connect()
+    try:
+        for i in range(0, len(tickers), 500):
+            chunk = tickers[i:i + 500]
+            query = f"DELETE FROM sectors WHERE ticker IN ({','.join('?' * len(chunk))})"
+            if unknown_only:
+                query += " AND sector = ?"
+                chunk = chunk + [UNKNOWN]
+            conn.execute(query, chunk)
+        conn.commit()
+    finally:
+        conn.close()
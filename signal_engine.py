@@ -0,0 +1,166 @@
+"""🧮 คำนวณสัญญาณของ 02_monitor ทั้งตลาดในรอบเดียวด้วย NumPy (แทนการวนทีละหุ้น)
+
+ข้อมูลเข้า: ตารางราคา หุ้น x วัน (ชิดขวา แท่งล่าสุดอยู่คอลัมน์สุดท้าย) + สถานะจาก DB
+ข้อมูลออก: Array ของค่าที่คำนวณได้ และ Mask ของแต่ละตะกร้าสัญญาณ
+กติกาทุกข้อเหมือนลูปเดิมใน run_monitor ทุกประการ
+"""
+import warnings
+
+import numpy as np
+
+RSI_WINDOW = 14
+LONG_TYPES = ['LONG', 'BASE', 'MOONSHOT', 'FAVOURITE']
+
+
+def build_panel(history, tickers, fields=('Close', 'High', 'Volume')):
+    """แปลง {ticker: DataFrame} เป็น Array ขนาด (หุ้น, วัน) แบบชิดขวา (ช่องที่ไม่มีข้อมูล = NaN)"""
+    lengths = np.array([len(history[t]) for t in tickers], dtype=np.int64)
+    width = int(lengths.max()) if len(lengths) else 0
+    panel = {'lengths': lengths}
+    for field in fields:
+        arr = np.full((len(tickers), width), np.nan)
+        for i, ticker in enumerate(tickers):
+            n = lengths[i]
+            if n:
+                arr[i, width - n:] = history[ticker][field].to_numpy(dtype=float)
+        panel[field] = arr
+    return panel
+
+
+def _rsi(close, lengths, window=RSI_WINDOW):
+    """RSI แบบเดียวกับ calculate_rsi (ค่าเฉลี่ยธรรมดา 14 แท่งล่าสุด) ข้อมูลไม่พอ/หารไม่ได้ = 50"""
+    rsi = np.full(len(close), 50.0)
+    if close.shape[1] < window + 1:
+        return rsi
+    delta = np.diff(close[:, -(window + 1):], axis=1)
+    gain = np.where(delta > 0, delta, 0.0).mean(axis=1)
+    loss = np.where(delta < 0, -delta, 0.0).mean(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        val = 100 - (100 / (1 + rs))
+    ok = (lengths >= window + 1) & ~np.isnan(val)
+    rsi[ok] = val[ok]
+    return rsi
+
+
+def _nanmax(arr):
+    out = np.full(len(arr), np.nan)
+    if arr.shape[1] == 0:
+        return out
+    has = ~np.all(np.isnan(arr), axis=1)
+    out[has] = np.nanmax(arr[has], axis=1)
+    return out
+
+
+def evaluate(panel, tickers, status, market_type, buy_price, highest_price, last_price):
+    """คำนวณทุกสัญญาณพร้อมกัน
+
+    status / market_type: list ของ str จาก DB
+    buy_price / highest_price / last_price: ค่าจาก DB (None หรือ 0 = ไม่มีค่า เหมือน `or` ในลูปเดิม)
+    """
+    close, high, volume, n = panel['Close'], panel['High'], panel['Volume'], panel['lengths']
+    count = len(tickers)
+    tickers = np.array(tickers, dtype=str)
+    status = np.array([s or '' for s in status], dtype=str)
+    market_type = np.array([m or 'UNKNOWN' for m in market_type], dtype=str)
+
+    def db_float(values):
+        return np.array([float(v or 0) for v in values], dtype=float)
+
+    buy_db = db_float(buy_price)
+    highest_db = db_float(highest_price)
+
+    current = close[:, -1] if count else np.zeros(0)
+    last_db = db_float(last_price)
+    last_db = np.where(last_db == 0, current, last_db)
+
+    rsi = _rsi(close, n)
+
+    # 📊 Volume เทียบค่าเฉลี่ย 20 แท่งก่อนหน้า (เฉพาะหุ้นที่มีมากกว่า 20 แท่ง)
+    vol_ratio = np.full(count, np.nan)
+    if close.shape[1] > 20:
+        with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # หุ้นใหม่ที่ไม่มี Volume เลย -> NaN
+            avg_vol = np.nanmean(volume[:, -21:-1], axis=1)
+            ratio = volume[:, -1] / avg_vol
+        use = (n > 20) & (avg_vol > 0)
+        vol_ratio[use] = ratio[use]
+    vol_alert = vol_ratio >= 1.5
+
+    # 📅 เปลี่ยนแปลงรายวัน
+    prev_close = close[:, -2] if close.shape[1] >= 2 else np.full(count, np.nan)
+    has_prev = n >= 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        daily_pct = np.where(has_prev, (current - prev_close) / prev_close * 100, 0.0)
+    error = has_prev & (prev_close == 0)
+
+    # 🧱 ฐานราคา: High สูงสุดก่อน 5 แท่งล่าสุด (หุ้นใหม่ใช้ทุกแท่งยกเว้นแท่งล่าสุด)
+    base_high = np.where(n > 5, _nanmax(high[:, :-5]),
+                         np.where(n > 1, _nanmax(high[:, :-1]), high[:, -1] if count else np.zeros(0)))
+
+    new_highest = np.maximum(current, highest_db)
+    is_thai = np.char.find(tickers, '.BK') >= 0
+    tp_pct = np.where(is_thai, 0.05, 0.10)
+    sl_pct = np.where(is_thai, 0.03, 0.05)
+
+    # --- 👀 watching ---
+    watching = status == 'watching'
+    reset_buy = watching & (buy_db > 0)
+    is_long = np.zeros(count, dtype=bool)
+    for word in LONG_TYPES:
+        is_long |= np.char.find(market_type, word) >= 0
+    is_short = ~is_long & (np.char.find(market_type, 'SHORT') >= 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        increase_pct = (current - base_high) / base_high * 100
+    breakout = watching & is_long & (base_high > 0) & (current > base_high)
+    breakout_high = breakout & (increase_pct >= 3.0)
+    breakout_medium = breakout & ~breakout_high & (increase_pct >= 1.0)
+    breakout_low = breakout & ~breakout_high & ~breakout_medium
+    momentum = watching & is_long & ~breakout & (daily_pct >= 4.0)
+    oversold = watching & is_short & (rsi < 30)
+
+    # --- 🔔 signal_buy: วิ่งต่อ / เด้งแรง ---
+    pending = status == 'signal_buy'
+    is_new_high = (highest_db > 0) & (current >= highest_db * 1.03)
+    is_rebound = (last_db > 0) & (current >= last_db * 1.05)
+    continuing_up = pending & (is_new_high | is_rebound)
+    error |= continuing_up & (base_high == 0)
+
+    # --- 💼 holding: TP / SL ---
+    holding = (status == 'holding') & (buy_db > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        profit_pct = (current - buy_db) / buy_db * 100
+    tp = holding & (current >= buy_db * (1 + tp_pct))
+    sl = holding & ~tp & (current <= buy_db * (1 - sl_pct))
+
+    new_status = np.full(count, '', dtype=object)
+    new_status[breakout | momentum | oversold] = 'signal_buy'
+    new_status[tp | sl] = 'signal_sell'
+
+    return {
+        'current': current,
+        'rsi': rsi,
+        'vol_ratio': vol_ratio,
+        'vol_alert': vol_alert,
+        'daily_pct': daily_pct,
+        'base_high': base_high,
+        'increase_pct': increase_pct,
+        'is_new_high': is_new_high,
+        'profit_pct': profit_pct,
+        'buy_price': buy_db,
+        'highest_price': new_highest,
+        'reset_buy': reset_buy,
+        'new_status': new_status,
+        'error': error,
+        'baskets': {
+            'breakout_high': breakout_high,
+            'breakout_medium': breakout_medium,
+            'breakout_low': breakout_low,
+            'continuing_up': continuing_up,
+            'momentum': momentum,
+            'oversold': oversold,
+            'tp': tp,
+            'sl': sl,
+        },
+    }
@@ -0,0 +1,69 @@
+-- 💰 บันทึกผลการเทรดทั้งรอบของ 06_trader.py ในธุรกรรมเดียว (รันใน Supabase SQL Editor ครั้งเดียว)
+--
+-- 06_trader.py เรียกผ่าน supabase.rpc("record_trades", {...}) ครั้งเดียวต่อรอบ
+-- ถ้ายังไม่ได้ติดตั้งฟังก์ชันนี้ สคริปต์จะเขียนแบบเป็นก้อนผ่าน REST แทน (ช้ากว่าและไม่เป็นธุรกรรมเดียว)
+
+-- id ของรายการ OPEN ใน trade_history ที่ผูกกับหุ้นที่ถืออยู่ (ตอนขายไม่ต้องค้นหาอีก)
+alter table ipo_trades add column if not exists open_trade_id bigint;
+alter table ipo_trades_uat add column if not exists open_trade_id bigint;
+
+-- buys  = [{"id", "ticker", "market_type", "price", "at"}]
+-- sells = [{"id", "ticker", "buy_price", "price", "profit_amount", "profit_pct", "open_trade_id", "at"}]
+create or replace function record_trades(trades_table text, buys jsonb, sells jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    b jsonb;
+    s jsonb;
+    trade_id bigint;
+    opened jsonb := '[]'::jsonb;
+begin
+    if trades_table not in ('ipo_trades', 'ipo_trades_uat') then
+        raise exception 'record_trades: unknown table %', trades_table;
+    end if;
+
+    -- 🔵 ซื้อ: เปิดรายการใน trade_history แล้วผูก id กลับไปที่แถวใน Watchlist
+    for b in select * from jsonb_array_elements(coalesce(buys, '[]'::jsonb)) loop
+        insert into trade_history (ticker, market_type, buy_price, buy_date, status, note)
+        values (b->>'ticker', b->>'market_type', (b->>'price')::numeric, (b->>'at')::timestamptz,
+                'OPEN', 'Breakout Buy Signal')
+        returning id into trade_id;
+
+        execute format('update %I set status = ''holding'', buy_price = $1, open_trade_id = $2, last_update = $3 where id = $4',
+                       trades_table)
+        using (b->>'price')::numeric, trade_id, (b->>'at')::timestamptz, (b->>'id')::bigint;
+
+        opened := opened || jsonb_build_object('id', (b->>'id')::bigint, 'open_trade_id', trade_id);
+    end loop;
+
+    -- 🔴 ขาย: ปิดรายการที่ผูกไว้ (แถวเก่าที่ยังไม่มี open_trade_id ใช้รายการ OPEN ล่าสุดของหุ้นนั้น)
+    for s in select * from jsonb_array_elements(coalesce(sells, '[]'::jsonb)) loop
+        trade_id := nullif(s->>'open_trade_id', '')::bigint;
+        if trade_id is null then
+            select id into trade_id from trade_history
+            where ticker = s->>'ticker' and status = 'OPEN'
+            order by buy_date desc limit 1;
+        end if;
+
+        if trade_id is not null then
+            update trade_history
+            set sell_price = (s->>'price')::numeric, sell_date = (s->>'at')::timestamptz,
+                profit_amount = (s->>'profit_amount')::numeric, profit_pct = (s->>'profit_pct')::numeric,
+                status = 'CLOSED', note = 'Signal Sell (TP/SL)'
+            where id = trade_id;
+        else
+            -- ไม่เจอประวัติเก่า (อาจจะซื้อก่อนมีระบบนี้) ให้ insert ใหม่แบบจบในตัว
+            insert into trade_history (ticker, buy_price, sell_price, sell_date, profit_pct, status, note)
+            values (s->>'ticker', (s->>'buy_price')::numeric, (s->>'price')::numeric, (s->>'at')::timestamptz,
+                    (s->>'profit_pct')::numeric, 'CLOSED', 'Force Close (No Open Record)');
+        end if;
+
+        execute format('update %I set status = ''sold'', sell_price = $1, open_trade_id = null, last_update = $2 where id = $3',
+                       trades_table)
+        using (s->>'price')::numeric, (s->>'at')::timestamptz, (s->>'id')::bigint;
+    end loop;
+
+    return jsonb_build_object('opened', opened, 'sold', jsonb_array_length(coalesce(sells, '[]'::jsonb)));
+end;
+$$;
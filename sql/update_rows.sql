@@ -0,0 +1,41 @@
+-- ✏️ อัปเดตหลายแถวของ Watchlist ในคำขอเดียว (รันใน Supabase SQL Editor ครั้งเดียว)
+--
+-- db_utils.update_rows() เรียกผ่าน supabase.rpc("update_rows", {...})
+-- แต่ละแถวใน rows เขียนเฉพาะคอลัมน์ที่มีอยู่ในแถวนั้น และเป็น UPDATE ล้วน (แถวที่ถูกลบไปแล้วจะไม่ถูกสร้างใหม่)
+-- ถ้ายังไม่ได้ติดตั้ง สคริปต์จะเช็คแถวที่ยังอยู่แล้ว Upsert แทน
+
+-- rows = [{"<key_column>": ..., "<คอลัมน์>": ค่าใหม่, ...}]
+create or replace function update_rows(table_name text, key_column text, rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    r jsonb;
+    cols text;
+    changed integer;
+    total integer := 0;
+begin
+    if table_name not in ('ipo_trades', 'ipo_trades_uat') then
+        raise exception 'update_rows: unknown table %', table_name;
+    end if;
+    if key_column not in ('id', 'ticker') then
+        raise exception 'update_rows: unknown key %', key_column;
+    end if;
+
+    for r in select * from jsonb_array_elements(coalesce(rows, '[]'::jsonb)) loop
+        select string_agg(format('%I = p.%I', k, k), ', ') into cols
+        from jsonb_object_keys(r) k where k <> key_column;
+        if cols is null then
+            continue;
+        end if;
+
+        execute format('update %I t set %s from jsonb_populate_record(null::%I, $1) p where t.%I = p.%I',
+                       table_name, cols, table_name, key_column, key_column)
+        using r;
+        get diagnostics changed = row_count;
+        total := total + changed;
+    end loop;
+
+    return total;
+end;
+$$;
@@ -0,0 +1,44 @@
+-- 📊 สรุปผลการเทรดรายสัปดาห์ฝั่ง Server (รันใน Supabase SQL Editor ครั้งเดียว)
+--
+-- 05_report.py เรียกผ่าน supabase.rpc("weekly_report", {...}) แล้วได้แค่ตัวเลขสรุปกลับมา
+-- (ไม่ต้องโหลดทุกแถวของ trade_history มานับเองใน Python) ถ้ายังไม่ได้ติดตั้ง สคริปต์จะสรุปเองแทน
+
+-- อ่านเฉพาะรายการที่ปิดแล้วในช่วงเวลาที่ขอ
+create index if not exists trade_history_closed_sell_date on trade_history (sell_date) where status = 'CLOSED';
+
+create or replace function weekly_report(since timestamptz, trades_table text default 'ipo_trades')
+returns jsonb
+language plpgsql
+stable
+as $$
+declare
+    active bigint;
+    result jsonb;
+begin
+    if trades_table not in ('ipo_trades', 'ipo_trades_uat') then
+        raise exception 'weekly_report: unknown table %', trades_table;
+    end if;
+
+    -- หุ้นที่ยังถืออยู่ใน Watchlist
+    execute format('select count(*) from %I where status in (''holding'', ''bought'')', trades_table) into active;
+
+    select jsonb_build_object(
+        'active', active,
+        'completed', count(*),
+        'total_profit', coalesce(sum(pct), 0),
+        'wins', count(*) filter (where pct > 0),
+        'losses', count(*) filter (where pct <= 0),
+        'best_ticker', (array_agg(ticker order by pct desc) filter (where pct is not null))[1],
+        'best_gain', max(pct)
+    )
+    into result
+    from (
+        select ticker,
+               coalesce(profit_pct, case when buy_price > 0 then (sell_price / buy_price - 1) * 100 end) as pct
+        from trade_history
+        where status = 'CLOSED' and sell_date >= since
+    ) closed;
+
+    return result;
+end;
+$$;
@@ -0,0 +1,14 @@
+"""ใช้ Fake ของ benchmarks (Supabase / Yahoo / Discord ออฟไลน์) ให้ทุกเทสต์ รันได้โดยไม่ต่อเน็ต"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("SUPABASE_URL", "https://supabase.test")
+os.environ.setdefault("SUPABASE_KEY", "test")
+os.environ.setdefault("BAR_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "bars.sqlite"))
+
+from benchmarks import fakes  # noqa: E402
+
+fakes.install_all()
@@ -0,0 +1,43 @@
+import pytest
+
+from benchmarks import fakes
+from db_utils import update_rows
+
+
+@pytest.fixture
+def db():
+    fakes.DATABASE.tables.clear()
+    fakes.DATABASE.functions.clear()
+    fakes.DATABASE.tables['ipo_trades'] = [
+        {"id": 1, "ticker": "AAA", "market_type": "LONG", "status": "holding", "buy_price": 10.0, "last_price": 11.0},
+        {"id": 2, "ticker": "BBB", "market_type": "LONG", "status": "watching", "buy_price": 0, "last_price": 5.0},
+    ]
+    yield fakes.DATABASE
+    fakes.DATABASE.tables.clear()
+    fakes.DATABASE.functions.clear()
+
+
+def _client():
+    return fakes.FakeClient(fakes.DATABASE)
+
+
+def test_fallback_updates_only_sent_columns_and_never_inserts(db):
+    rows = [{"ticker": "AAA", "last_price": 12.0},
+            {"ticker": "BBB", "last_price": 6.0, "status": "signal_buy"},
+            {"ticker": "GONE", "last_price": 1.0}]  # ถูกลบไประหว่างรอบ
+    assert update_rows(_client(), "ipo_trades", rows, key="ticker") == 3
+
+    table = {r['ticker']: r for r in db.tables['ipo_trades']}
+    assert set(table) == {"AAA", "BBB"}
+    assert table["AAA"] == {"id": 1, "ticker": "AAA", "market_type": "LONG", "status": "holding",
+                            "buy_price": 10.0, "last_price": 12.0}
+    assert table["BBB"]["status"] == "signal_buy" and table["BBB"]["last_price"] == 6.0
+
+
+def test_uses_rpc_when_installed(db):
+    calls = []
+    db.functions['update_rows'] = lambda db, **params: calls.append(params) or len(params['rows'])
+    rows = [{"id": 1, "status": "sold"}]
+    assert update_rows(_client(), "ipo_trades", rows, key="id") == 1
+    assert calls == [{"table_name": "ipo_trades", "key_column": "id", "rows": rows}]
+    assert db.tables['ipo_trades'][0]['status'] == "holding"  # เขียนผ่าน RPC เท่านั้น
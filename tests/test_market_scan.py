@@ -0,0 +1,54 @@
+import numpy as np
+
+import market_scan
+from market_data import Panel
+
+D, N = 20, 50
+
+
+def _panel(close, volume=None):
+    volume = np.full_like(close, 1e6) if volume is None else volume
+    dates = np.arange(np.datetime64('2026-09-01'), np.datetime64('2026-09-01') + len(close))
+    return Panel(dates, [f"T{i}" for i in range(close.shape[1])], {'Close': close, 'Volume': volume})
+
+
+def _closes(rng):
+    return (50 * np.exp(np.cumsum(rng.normal(0, .02, (D, N)), axis=0))).astype(np.float32)
+
+
+def test_stray_date_row_keeps_history_of_other_tickers():
+    close = _closes(np.random.default_rng(0))
+    clean = market_scan.compute_metrics(_panel(close))
+
+    # หุ้นต่างประเทศตัวเดียวมีแท่งวันที่ที่ตัวอื่นไม่มี (แทรกก่อนแถวสุดท้าย)
+    stray = np.full((D + 1, N + 1), np.nan, dtype=np.float32)
+    stray[:D - 1, :N] = close[:D - 1]
+    stray[D, :N] = close[-1]
+    stray[:, N] = 10
+    metrics = market_scan.compute_metrics(_panel(stray))
+
+    assert metrics['HasHistory'][:N].all()
+    np.testing.assert_allclose(metrics['Closes'][:N], clean['Closes'])
+
+
+def test_stale_ticker_is_not_reported_as_today():
+    close = _closes(np.random.default_rng(1))
+    # T0 หยุดซื้อขายไป 8 แท่ง (แท่งสุดท้ายก่อนหยุดกระโดดแรง)
+    close[-9, 0] = close[-10, 0] * 2.5
+    close[-8:, 0] = np.nan
+    metrics = market_scan.compute_metrics(_panel(close))
+
+    assert not metrics['HasHistory'][0]
+    assert np.isnan(metrics['Price'][0]) and np.isnan(metrics['SortVal'][0])
+    assert metrics['HasHistory'][1:].all()
+    scan = market_scan.select_rows(metrics, [f"T{i}" for i in range(N)])
+    assert "T0" not in scan['Ticker']
+
+
+def test_one_session_behind_is_still_counted():
+    close = _closes(np.random.default_rng(2))
+    close[-1, 0] = np.nan
+    metrics = market_scan.compute_metrics(_panel(close))
+
+    assert metrics['HasHistory'][0]
+    assert metrics['Price'][0] == np.float32(close[-2, 0])
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from benchmarks import fakes, run
+
+
+@pytest.fixture
+def monitor():
+    mod = run.load_script("02_monitor.py")
+    mod.SCAN_CHUNK_SIZE = 10
+    fakes.DATABASE.tables.clear()
+    run.seed_watchlist(fakes.DATABASE, mod.TABLE_NAME, run.make_tickers(120, dead_ratio=0))
+    yield mod
+    fakes.DATABASE.tables.clear()
+
+
+def test_analyzer_error_ends_the_pipeline(monitor):
+    def broken(*args, **kwargs):
+        raise RuntimeError("analyzer exploded")
+
+    monitor.analyze_stocks = broken
+    # ก้อนมากกว่าขนาดคิว: ถ้า Error ไม่ถูกส่งต่อ ตัวโหลดจะค้างที่ put() จนหมดเวลา
+    with pytest.raises(RuntimeError, match="analyzer exploded"):
+        asyncio.run(asyncio.wait_for(monitor.run_monitor_async("ALL", concurrency=2), timeout=60))
+
+
+def test_writer_error_ends_the_pipeline(monitor):
+    def broken(*args, **kwargs):
+        raise RuntimeError("writer exploded")
+
+    monitor.flush_results = broken
+    with pytest.raises(RuntimeError, match="writer exploded"):
+        asyncio.run(asyncio.wait_for(monitor.run_monitor_async("ALL", concurrency=2), timeout=60))
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks import run
+
+DAYS = pd.bdate_range(end='2026-10-16', periods=20)
+
+
+@pytest.fixture
+def moonshot():
+    return run.load_script("04_moonshot_monitor.py")
+
+
+def _history(tickers):
+    df = pd.DataFrame({'Close': 100.0, 'Volume': 1e6}, index=DAYS)
+    return {t: df for t in tickers}
+
+
+def test_session_fraction_follows_the_local_session(moonshot):
+    at = lambda hhmm, tz: pd.Timestamp(f"2026-10-19 {hhmm}", tz=tz)
+    assert moonshot.session_fraction("AAPL", at("09:30", "America/New_York")) == moonshot.MIN_SESSION_FRACTION
+    assert moonshot.session_fraction("AAPL", at("12:44", "America/New_York")) == pytest.approx(0.5)
+    assert moonshot.session_fraction("AAPL", at("15:59", "America/New_York")) == 1.0
+    assert moonshot.session_fraction("PTT.BK", at("13:14", "Asia/Bangkok")) == pytest.approx(0.5)
+
+
+def test_rvol_compares_against_the_elapsed_part_of_the_session(moonshot):
+    stream = moonshot.MoonshotStream(["A", "B"], _history(["A", "B"]))
+    # A: ชั่วโมงแรกซื้อขายไปแล้ว 60% ของวันปกติ / B: ครบวันด้วย Volume ปกติ
+    stream.update({"A": ("2026-10-19", 100.0, 6e5, 60 / 390), "B": ("2026-10-19", 100.0, 1e6, 1.0)})
+    sig = stream.signals()
+    assert sig["rvol"][0] > moonshot.VOLUME_SPIKE_THRESHOLD
+    assert sig["spike"].tolist() == [True, False]
+    assert sig["rvol"][1] == pytest.approx(1.0)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 1.0)
+
+    def strftime(self, fmt):
+        return time.strftime(fmt)
+
+
+def test_stream_reloads_the_list_and_alerts_again_on_a_new_day(moonshot, monkeypatch):
+    clock = Clock()
+    lists = [["A"], ["A"], ["A", "B"]]   # B ถูกเพิ่มเข้า MOONSHOT ระหว่างวัน (โหลดรอบที่ 3)
+    sent = []
+
+    def load():
+        names = lists.pop(0) if len(lists) > 1 else lists[0]
+        return [{"ticker": t} for t in names]
+
+    monkeypatch.setattr(moonshot, "time", clock)
+    monkeypatch.setattr(moonshot, "load_moonshots", load)
+    monkeypatch.setattr(moonshot, "get_history", lambda tickers, period: (_history(tickers), None))
+    monkeypatch.setattr(moonshot, "notify", sent.append)
+
+    def fetch(tickers):
+        # นาทีที่ 0-4 = วันแรก (+10%) / ตั้งแต่นาทีที่ 5 = วันใหม่ (+10% จากปิดวันแรก)
+        day, price = ("2026-10-19", 110.0) if clock.now < 300 else ("2026-10-20", 121.0)
+        return {t: (day, price, 1e6, 1.0) for t in tickers}
+
+    monkeypatch.setattr(moonshot, "fetch_intraday", fetch)
+    moonshot.run_stream(poll_seconds=60, minutes=8, reload_minutes=2)
+
+    alerted = [m.split("MOONSHOT ALERT: ")[1].split("*")[0] for m in sent]
+    assert alerted == ["A", "B", "A", "B"]
@@ -0,0 +1,143 @@
+"""📐 วิเคราะห์ผลการเทรดจาก trade_history แบบ Array (Cache ในเครื่อง = SQLite ไฟล์เดียวกับ Bar Cache)
+
+- sync_trades(): ดึงเฉพาะรายการที่ปิดใหม่ (sell_date ตั้งแต่จุดล่าสุดที่มีใน Cache) มาเก็บต่อท้าย
+- load_trades(): อ่านทุกรายการที่ปิดแล้วเป็น Array รายคอลัมน์ครั้งเดียว
+- compute_analytics(): Equity Curve / Max Drawdown / Sharpe / Sortino / Expectancy / เวลาถือเฉลี่ย
+  + แยกตาม market_type และ note (Breakout Buy / Force Close) คำนวณด้วย NumPy ทั้งหมด
+- get_analytics(): รวมทั้งหมด ถ้าไม่มีรายการใหม่ใช้ผลที่คำนวณไว้แล้ว
+
+ผลตอบแทนคิดเป็น % ต่อเทรด แบบใช้ทุนเท่ากันทุกเทรด (Equity = ผลรวม % สะสมตามลำดับวันขาย)
+Sharpe / Sortino เป็นค่าต่อเทรด (ไม่ Annualize)
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from db_utils import fetch_all_rows
+
+TABLE_HISTORY = "trade_history"
+COLUMNS = ["id", "ticker", "market_type", "note", "buy_price", "sell_price", "profit_pct", "buy_date", "sell_date"]
+BREAKDOWN_LIMIT = 8       # จำนวนกลุ่มสูงสุดที่แสดงในแต่ละตารางแยก
+
+
+def _connect():
+    conn = market_data.connect_cache()
+    conn.execute("""CREATE TABLE IF NOT EXISTS closed_trades (
+        id INTEGER PRIMARY KEY, ticker TEXT, market_type TEXT, note TEXT,
+        buy_price REAL, sell_price REAL, profit_pct REAL, buy_date TEXT, sell_date TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS analytics_cache (
+        name TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, payload TEXT NOT NULL)""")
+    return conn
+
+
+def sync_trades(client, conn):
+    """ดึงรายการที่ปิดตั้งแต่ sell_date ล่าสุดใน Cache (ซ้อนจุดเดิมไว้ กันรายการที่เวลาเท่ากัน) คืนจำนวนแถวที่ได้"""
+    since = conn.execute("SELECT MAX(sell_date) FROM closed_trades").fetchone()[0]
+
+    def filters(query):
+        query = query.eq("status", "CLOSED")
+        return query.gte("sell_date", since) if since else query
+
+    rows = fetch_all_rows(client, TABLE_HISTORY, ", ".join(COLUMNS), key="id", filters=filters)
+    conn.executemany(f"INSERT OR REPLACE INTO closed_trades VALUES ({','.join('?' * len(COLUMNS))})",
+                     [tuple(r.get(c) for c in COLUMNS) for r in rows])
+    conn.commit()
+    return len(rows)
+
+
+def _to_float(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=float)
+
+
+def load_trades(conn):
+    """ทุกรายการที่ปิดแล้วเป็น Array รายคอลัมน์ เรียงตามวันขาย (pct = % ต่อเทรด, hold_days = จำนวนวันที่ถือ)"""
+    rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM closed_trades ORDER BY sell_date, id").fetchall()
+    cols = dict(zip(COLUMNS, zip(*rows))) if rows else {c: () for c in COLUMNS}
+
+    buy, sell, pct = _to_float(cols['buy_price']), _to_float(cols['sell_price']), _to_float(cols['profit_pct'])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # แถวที่ไม่มี profit_pct (เช่น รายการเก่า) คำนวณจากราคาซื้อ/ขายแทน
+        pct = np.where(np.isnan(pct) & (buy > 0), (sell / buy - 1) * 100, pct)
+    bought = pd.to_datetime(pd.Series(cols['buy_date'], dtype=object), errors='coerce', utc=True, format='ISO8601')
+    sold = pd.to_datetime(pd.Series(cols['sell_date'], dtype=object), errors='coerce', utc=True, format='ISO8601')
+    return {
+        'id': np.array(cols['id'], dtype=np.int64),
+        'ticker': np.array(cols['ticker'], dtype=object),
+        'market_type': np.array([v or 'Unknown' for v in cols['market_type']], dtype=object),
+        'note': np.array([v or 'Unknown' for v in cols['note']], dtype=object),
+        'pct': pct,
+        'hold_days': ((sold - bought).dt.total_seconds() / 86400).to_numpy(dtype=float),
+    }
+
+
+def _breakdown(keys, pct):
+    """สรุปแยกกลุ่ม (จำนวน, Win Rate, % เฉลี่ย, % รวม) ด้วย bincount เรียงตามจำนวนเทรดมาก -> น้อย"""
+    if not len(pct):
+        return []
+    labels, group = np.unique(keys.astype(str), return_inverse=True)
+    count = np.bincount(group, minlength=len(labels))
+    total = np.bincount(group, weights=pct, minlength=len(labels))
+    wins = np.bincount(group, weights=(pct > 0), minlength=len(labels))
+    order = np.lexsort((-total, -count))[:BREAKDOWN_LIMIT]
+    return [{"name": str(labels[i]), "trades": int(count[i]), "win_rate": float(wins[i] / count[i] * 100),
+             "avg_pct": float(total[i] / count[i]), "total_pct": float(total[i])} for i in order]
+
+
+def compute_analytics(trades):
+    """ตัวชี้วัดทั้งหมดจาก Array ของ load_trades() คืนค่า dict (ค่าเป็น float ธรรมดา เก็บเป็น JSON ได้)"""
+    valid = ~np.isnan(trades['pct'])
+    pct = trades['pct'][valid]
+    n = len(pct)
+    if n == 0:
+        return {"trades": 0}
+
+    equity = np.cumsum(pct)
+    peak = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:]
+    wins = pct > 0
+    avg_win = float(pct[wins].mean()) if wins.any() else 0.0
+    avg_loss = float(-pct[~wins].mean()) if (~wins).any() else 0.0
+    win_rate = float(wins.mean())
+    std = float(pct.std(ddof=1)) if n > 1 else 0.0
+    downside = float(np.sqrt(np.mean(np.minimum(pct, 0.0) ** 2)))
+    hold = trades['hold_days'][valid]
+    hold = hold[~np.isnan(hold)]
+
+    return {
+        "trades": n,
+        "total_pct": float(equity[-1]),
+        "max_drawdown_pct": float((peak - equity).max()),
+        "sharpe": float(pct.mean() / std) if std > 0 else None,
+        "sortino": float(pct.mean() / downside) if downside > 0 else None,
+        "win_rate": win_rate * 100,
+        "avg_win_pct": avg_win,
+        "avg_loss_pct": avg_loss,
+        "expectancy_pct": win_rate * avg_win - (1 - win_rate) * avg_loss,
+        "avg_hold_days": float(hold.mean()) if len(hold) else None,
+        "by_market_type": _breakdown(trades['market_type'][valid], pct),
+        "by_note": _breakdown(trades['note'][valid], pct),
+    }
+
+
+def get_analytics(client):
+    """ซิงก์รายการปิดใหม่แล้วคืนผลวิเคราะห์ (ไม่มีอะไรเปลี่ยน = ใช้ผลที่คำนวณไว้ในเครื่อง)"""
+    conn = _connect()
+    try:
+        new_rows = sync_trades(client, conn)
+        count, max_id, last_sell = conn.execute(
+            "SELECT COUNT(*), MAX(id), MAX(sell_date) FROM closed_trades").fetchone()
+        fingerprint = f"{count}:{max_id}:{last_sell}"
+        cached = conn.execute("SELECT fingerprint, payload FROM analytics_cache WHERE name = 'trade_history'").fetchone()
+        if cached and cached[0] == fingerprint:
+            print(f"   📐 Analytics cache hit ({count} closed trades)")
+            return json.loads(cached[1])
+
+        print(f"   📐 Recomputing analytics ({count} closed trades, {new_rows} synced)")
+        result = compute_analytics(load_trades(conn))
+        conn.execute("INSERT OR REPLACE INTO analytics_cache VALUES ('trade_history', ?, ?)",
+                     (fingerprint, json.dumps(result)))
+        conn.commit()
+        return result
+    finally:
+        conn.close()
@@ -0,0 +1,125 @@
+"""🌎 รายชื่อหุ้นทั้งตลาดสหรัฐฯ จาก SEC แบบเก็บ Snapshot ไว้ในเครื่อง (SQLite ไฟล์เดียวกับ Bar Cache)
+
+company_tickers.json ใหญ่หลาย MB และเปลี่ยนไม่บ่อย จึง:
+- ภายใน MAX_AGE_HOURS อ่านรายชื่อที่กรองแล้วจาก Cache อย่างเดียว (ไม่แตะเน็ต)
+- เกินกว่านั้นถาม SEC แบบมีเงื่อนไข (ETag / Last-Modified) ถ้าไม่เปลี่ยนได้ 304 ไม่ต้องโหลดไฟล์ใหม่
+- ถ้าเปลี่ยน บันทึกหุ้นที่เพิ่ม/หายไว้ (last_changes) แล้วล้าง Cache ที่เกี่ยวข้องเฉพาะตัวนั้น
+"""
+import time
+
+import requests
+
+import market_data
+import sector_cache
+
+SEC_TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+SEC_HEADERS = {'User-Agent': 'US_Stock_Scanner user@example.com'}
+MAX_AGE_HOURS = 24        # อายุ Snapshot ที่ใช้ได้เลยโดยไม่ต้องถาม SEC
+CHANGES_KEEP_DAYS = 90    # เก็บประวัติหุ้นเข้า/ออกไว้กี่วัน
+REQUEST_TIMEOUT = 30
+
+
+def _connect():
+    conn = market_data.connect_cache()
+    conn.execute("CREATE TABLE IF NOT EXISTS universe (ticker TEXT PRIMARY KEY)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS universe_meta (
+        name TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, fetched_at REAL NOT NULL)""")
+    conn.execute("CREATE TABLE IF NOT EXISTS universe_changes (ticker TEXT NOT NULL, change TEXT NOT NULL, changed_at REAL NOT NULL)")
+    return conn
+
+
+def filter_tickers(payload):
+    """กรองรายชื่อจาก company_tickers.json: ตัดชื่อยาวที่ไม่ใช่หุ้นสามัญออก"""
+    tickers = set()
+    for item in payload.values():
+        ticker = item['ticker'].replace('.', '-')
+        if len(ticker) <= 4 or '-' in ticker:
+            tickers.add(ticker)
+    return tickers
+
+
+def _load_snapshot(conn):
+    return {row[0] for row in conn.execute("SELECT ticker FROM universe")}
+
+
+def _save_snapshot(conn, tickers, previous, now):
+    added = sorted(tickers - previous)
+    removed = sorted(previous - tickers)
+    conn.executemany("DELETE FROM universe WHERE ticker = ?", [(t,) for t in removed])
+    conn.executemany("INSERT OR IGNORE INTO universe VALUES (?)", [(t,) for t in added])
+    if previous:
+        # Snapshot แรกไม่นับเป็นการเปลี่ยนแปลง (ไม่งั้นทุกตัวจะกลายเป็น "หุ้นใหม่")
+        conn.executemany("INSERT INTO universe_changes VALUES (?, ?, ?)",
+                         [(t, 'added', now) for t in added] + [(t, 'removed', now) for t in removed])
+    conn.execute("DELETE FROM universe_changes WHERE changed_at < ?", (now - CHANGES_KEEP_DAYS * 86400,))
+    return added, removed
+
+
+def refresh(force=False):
+    """อัปเดต Snapshot ถ้าหมดอายุ (หรือ force) คืนค่า (tickers, added, removed)"""
+    now = time.time()
+    conn = _connect()
+    try:
+        previous = _load_snapshot(conn)
+        meta = conn.execute("SELECT etag, last_modified, fetched_at FROM universe_meta WHERE name = 'sec'").fetchone()
+        if previous and meta and not force and now - meta[2] < MAX_AGE_HOURS * 3600:
+            return previous, [], []
+
+        headers = dict(SEC_HEADERS)
+        if previous and meta:
+            if meta[0]:
+                headers['If-None-Match'] = meta[0]
+            if meta[1]:
+                headers['If-Modified-Since'] = meta[1]
+        try:
+            response = requests.get(SEC_TICKERS_URL, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304:
+                print("   🌎 SEC universe unchanged (304) -> using local snapshot")
+                conn.execute("UPDATE universe_meta SET fetched_at = ? WHERE name = 'sec'", (now,))
+                conn.commit()
+                return previous, [], []
+            response.raise_for_status()
+            tickers = filter_tickers(response.json())
+        except Exception as e:
+            print(f"SEC Fetch Error: {e}" + (" -> using local snapshot" if previous else ""))
+            return previous, [], []
+
+        added, removed = _save_snapshot(conn, tickers, previous, now)
+        conn.execute("INSERT OR REPLACE INTO universe_meta VALUES ('sec', ?, ?, ?)",
+                     (response.headers.get('ETag'), response.headers.get('Last-Modified'), now))
+        conn.commit()
+    finally:
+        conn.close()
+
+    if previous and (added or removed):
+        print(f"   🌎 SEC universe changed: +{len(added)} / -{len(removed)}")
+        # ล้าง Cache เฉพาะตัวที่เปลี่ยน: หุ้นที่หายไปไม่ต้องเก็บราคา, หุ้นใหม่อาจเคยถูกจำว่า Sector = Unknown
+        market_data.forget(removed)
+        sector_cache.forget(added, unknown_only=True)
+    return tickers, added, removed
+
+
+def get_sec_tickers():
+    """รายชื่อหุ้นทั้งหมดจาก SEC ที่กรองแล้ว (ส่วนใหญ่อ่านจาก Snapshot ในเครื่อง)"""
+    tickers, _, _ = refresh()
+    return set(tickers)
+
+
+def last_changes(since=None):
+    """หุ้นที่เข้า/ออกจาก Universe ตั้งแต่ since (Unix time) ถ้าไม่ระบุ = การเปลี่ยนแปลงครั้งล่าสุด
+
+    คืนค่า {'added': [...], 'removed': [...]}
+    """
+    conn = _connect()
+    try:
+        if since is None:
+            row = conn.execute("SELECT MAX(changed_at) FROM universe_changes").fetchone()
+            since = row[0] if row and row[0] is not None else time.time()
+        rows = conn.execute("SELECT ticker, change FROM universe_changes WHERE changed_at >= ? ORDER BY ticker",
+                            (since,)).fetchall()
+    finally:
+        conn.close()
+    return {
+        'added': [t for t, change in rows if change == 'added'],
+        'removed': [t for t, change in rows if change == 'removed'],
+    }